@@ -0,0 +1,137 @@
+"""
+Benchmark "latest activity" query latency against ActivityLog table size.
+
+Runs against a throwaway test database (SQLite in memory with the default
+settings) and compares the composite (task, -timestamp) / (project, -timestamp)
+indexes with the previous single-column indexes, which leave the database to
+sort every matching row.
+
+Usage:
+    python benchmarks/bench_activity_log.py [row_count ...]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taskManagement.settings')
+
+import django
+django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.utils import timezone
+from tasks.models import ActivityLog, Project, Task, TaskList
+
+TASKS = 200
+PROJECTS = 10
+COMPOSITE_INDEXES = {
+    'tasks_activ_task_id_66b34d_idx': ('task_id', 'timestamp DESC'),
+    'tasks_activ_project_30628b_idx': ('project_id', 'timestamp DESC'),
+}
+SINGLE_COLUMN_INDEXES = {
+    'bench_activity_task_idx': ('task_id',),
+    'bench_activity_project_idx': ('project_id',),
+}
+
+
+def create_fixtures():
+    user = User.objects.create_user(username='bench')
+    projects = [Project.objects.create(name=f'Project {i}', owner=user) for i in range(PROJECTS)]
+    task_lists = [TaskList.objects.create(name='List', project=project) for project in projects]
+    Task.objects.bulk_create([
+        Task(title=f'Task {i}', task_list=task_lists[i % PROJECTS], created_by=user)
+        for i in range(TASKS)
+    ])
+    return user, [project.id for project in projects], list(Task.objects.values_list('id', flat=True))
+
+
+def grow(rows, user, project_ids, task_ids, rng):
+    """Insert rows activity entries spread over the last year"""
+    now = timezone.now()
+    batch = []
+    for _ in range(rows):
+        batch.append(ActivityLog(
+            user=user,
+            task_id=rng.choice(task_ids),
+            project_id=rng.choice(project_ids),
+            action='UPDATE',
+            description='Updated task',
+        ))
+        if len(batch) == 10000:
+            ActivityLog.objects.bulk_create(batch)
+            batch = []
+    ActivityLog.objects.bulk_create(batch)
+    # auto_now_add ignores explicit values, so spread the timestamps afterwards
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE tasks_activitylog SET timestamp = datetime(%s, '-' || (abs(random()) %% 31536000) || ' seconds')",
+            [now.strftime('%Y-%m-%d %H:%M:%S')]
+        )
+
+
+def use_indexes(indexes, drop):
+    with connection.cursor() as cursor:
+        for name in drop:
+            cursor.execute(f'DROP INDEX IF EXISTS {name}')
+        for name, columns in indexes.items():
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON tasks_activitylog ({", ".join(columns)})')
+        cursor.execute('ANALYZE')
+
+
+def measure(query, ids, rng, samples=200):
+    timings = []
+    for _ in range(samples):
+        object_id = rng.choice(ids)
+        start = time.perf_counter()
+        list(query(object_id))
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    sizes = sorted(int(arg) for arg in sys.argv[1:]) or [10000, 100000, 500000]
+    old_config = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        rng = random.Random(42)
+        user, project_ids, task_ids = create_fixtures()
+        queries = {
+            'latest 20 of a task': (
+                lambda task_id: ActivityLog.objects.filter(task_id=task_id).order_by('-timestamp')[:20],
+                task_ids,
+            ),
+            'latest 20 of a project': (
+                lambda project_id: ActivityLog.objects.filter(project_id=project_id).order_by('-timestamp')[:20],
+                project_ids,
+            ),
+        }
+
+        print('median latency (ms)')
+        print(f"  {'rows':>8}  {'query':<24} {'single-column':>14} {'composite':>10}")
+        current = 0
+        for size in sizes:
+            grow(size - current, user, project_ids, task_ids, rng)
+            current = size
+            results = {}
+            for label, indexes, drop in (
+                ('single', SINGLE_COLUMN_INDEXES, COMPOSITE_INDEXES),
+                ('composite', COMPOSITE_INDEXES, SINGLE_COLUMN_INDEXES),
+            ):
+                use_indexes(indexes, drop)
+                for name, (query, ids) in queries.items():
+                    results[(name, label)] = measure(query, ids, rng)
+            for name in queries:
+                print(
+                    f"  {size:>8}  {name:<24} {results[(name, 'single')]:14.3f}"
+                    f" {results[(name, 'composite')]:10.3f}"
+                )
+    finally:
+        connection.creation.destroy_test_db(old_config, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark the in-memory dependency graph on large synthetic projects.
+
+Usage:
+    python benchmarks/bench_dependency_graph.py [task_count ...]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taskManagement.settings')
+
+import django
+django.setup()
+
+from tasks.graph import DependencyGraph
+
+
+def build_edges(task_count, fan_out=3, seed=42):
+    """Random DAG where each task depends on up to fan_out earlier tasks"""
+    rng = random.Random(seed)
+    edges = []
+    for task_id in range(1, task_count):
+        for dependency_id in rng.sample(range(task_id), min(fan_out, task_id)):
+            edges.append((task_id, dependency_id))
+    return edges
+
+
+def timed(label, func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<28} {best * 1000:10.2f} ms")
+    return result
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 50000]
+    for size in sizes:
+        edges = build_edges(size)
+        print(f"{size} tasks, {len(edges)} edges")
+        graph = timed('build adjacency', lambda: DependencyGraph(edges))
+        timed('topological order', graph.topological_order)
+        timed('find cycle (acyclic)', graph.find_cycle)
+        timed('reachable (deepest task)', lambda: graph.reachable(size - 1))
+        timed('cycle check (full scan)', lambda: graph.would_create_cycle(size, size - 1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark the streaming project export: wall time, output size and peak
+Python memory (tracemalloc) for NDJSON and gzip output. For small projects the
+nested ProjectSerializer representation is measured as well, for reference.
+
+Runs against a throwaway test database (SQLite in memory with the default
+settings).
+
+Usage:
+    python benchmarks/bench_export.py [task_count] [comment_count]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taskManagement.settings')
+
+import django
+django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection
+from tasks.exporters import export_project
+from tasks.models import Comment, Project, Task, TaskList
+from tasks.serializers import ProjectSerializer
+
+LISTS = 50
+BATCH_SIZE = 10000
+# ProjectSerializer holds the whole project in memory; skip it above this size
+SERIALIZER_MAX_TASKS = 20000
+
+
+def create_project(tasks, comments):
+    user = User.objects.create_user(username='bench')
+    project = Project.objects.create(name='Bench', owner=user)
+    task_lists = TaskList.objects.bulk_create([
+        TaskList(name=f'List {i}', project=project, position=i) for i in range(LISTS)
+    ])
+    for start in range(0, tasks, BATCH_SIZE):
+        Task.objects.bulk_create([
+            Task(title=f'Task {i}', description='x' * 100, task_list=task_lists[i % LISTS],
+                 created_by=user, assigned_to=user, position=i)
+            for i in range(start, min(start + BATCH_SIZE, tasks))
+        ])
+    task_ids = list(Task.objects.values_list('id', flat=True))
+    through = Task.dependencies.through
+    through.objects.bulk_create([
+        through(from_task_id=task_id, to_task_id=task_ids[i - LISTS])
+        for i, task_id in enumerate(task_ids) if i >= LISTS
+    ], batch_size=BATCH_SIZE)
+    for start in range(0, comments, BATCH_SIZE):
+        Comment.objects.bulk_create([
+            Comment(task_id=task_ids[i % len(task_ids)], author=user, content=f'Comment {i} ' + 'y' * 80)
+            for i in range(start, min(start + BATCH_SIZE, comments))
+        ])
+    return project
+
+
+def measure(produce):
+    """Run produce() and return (seconds, output bytes, peak traced MiB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = produce()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return elapsed, size, peak
+
+
+def main():
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    comments = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+    old_config = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f'creating {tasks} tasks and {comments} comments...')
+        project = create_project(tasks, comments)
+
+        runs = {
+            'export ndjson': lambda: sum(len(line) for line in export_project(project)),
+            'export gzip': lambda: sum(len(chunk) for chunk in export_project(project, compress=True)),
+        }
+        if tasks <= SERIALIZER_MAX_TASKS:
+            from rest_framework.renderers import JSONRenderer
+            runs['ProjectSerializer'] = lambda: len(JSONRenderer().render(ProjectSerializer(project).data))
+
+        print(f"  {'path':<18} {'seconds':>8} {'output MiB':>11} {'peak MiB':>9}")
+        for name, produce in runs.items():
+            elapsed, size, peak = measure(produce)
+            print(f'  {name:<18} {elapsed:8.2f} {size / 2 ** 20:11.1f} {peak:9.1f}')
+    finally:
+        connection.creation.destroy_test_db(old_config, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark the bulk task importer against creating tasks one at a time with
+TaskSerializer, as the API did before.
+
+Runs against a throwaway test database (SQLite in memory with the default
+settings). The serializer path is only timed on the first rows and
+extrapolated, since it is several orders of magnitude slower.
+
+Usage:
+    python benchmarks/bench_import.py [row_count ...]
+"""
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taskManagement.settings')
+
+import django
+django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection
+from rest_framework.test import APIRequestFactory
+from tasks.importers import import_tasks, ndjson_rows
+from tasks.models import Project, Task, TaskList
+from tasks.serializers import TaskSerializer
+
+SERIALIZER_SAMPLE = 500
+LISTS = 20
+
+
+def make_rows(count):
+    """NDJSON lines for count tasks, each depending on the previous task of its list"""
+    lines = io.StringIO()
+    for i in range(count):
+        row = {
+            'ref': str(i), 'title': f'Task {i}', 'task_list': f'List {i % LISTS}',
+            'status': 'TODO', 'priority': 'MEDIUM', 'assigned_to': 'bench',
+        }
+        if i >= LISTS:
+            row['dependencies'] = [str(i - LISTS)]
+        lines.write(json.dumps(row) + '\n')
+    lines.seek(0)
+    return lines
+
+
+def time_serializer(user, project, count):
+    request = APIRequestFactory().post('/api/tasks/')
+    request.user = user
+    task_list = TaskList.objects.create(name='Serializer', project=project)
+    previous = None
+    start = time.perf_counter()
+    for i in range(count):
+        serializer = TaskSerializer(data={
+            'title': f'Task {i}', 'task_list': task_list.id,
+            'dependency_ids': [previous] if previous else [],
+        }, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        previous = serializer.save().id
+    return time.perf_counter() - start
+
+
+def main():
+    sizes = sorted(int(arg) for arg in sys.argv[1:]) or [10000, 100000]
+    old_config = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        user = User.objects.create_user(username='bench')
+        project = Project.objects.create(name='Serializer', owner=user)
+        per_row = time_serializer(user, project, SERIALIZER_SAMPLE) / SERIALIZER_SAMPLE
+
+        print(f"  {'rows':>8}  {'serializer (est.)':>18} {'import_tasks':>13} {'rows/s':>9}")
+        for size in sizes:
+            project = Project.objects.create(name=f'Import {size}', owner=user)
+            lines = make_rows(size)
+            start = time.perf_counter()
+            result = import_tasks(project, user, ndjson_rows(lines))
+            elapsed = time.perf_counter() - start
+            assert result['created'] == size and not result['error_count'], result
+            print(f'  {size:>8}  {per_row * size:17.1f}s {elapsed:12.1f}s {size / elapsed:9.0f}')
+        print(f'  ({Task.objects.count()} tasks in the database)')
+    finally:
+        connection.creation.destroy_test_db(old_config, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark the per-request overhead of RequestValidationMiddleware.
+
+Compares the current single-pass matcher with the previous implementation
+(one re.search per pattern per field) on clean URL-encoded form bodies, and
+measures the JSON scan, at 1 KB, 100 KB and 1 MB payloads. Clean payloads are
+the worst case since no early match cuts the scan short. Form bodies are parsed
+before timing because the view parses them anyway; the JSON timings include
+decoding the body.
+
+Usage:
+    python benchmarks/bench_request_validation.py [iterations]
+"""
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from django.conf import settings
+
+settings.configure(
+    DATA_UPLOAD_MAX_MEMORY_SIZE=None,
+    DATA_UPLOAD_MAX_NUMBER_FIELDS=None,
+    REQUEST_VALIDATION_MAX_BODY_SIZE=2 * 1024 * 1024,
+)
+
+from urllib.parse import urlencode
+from django.test import RequestFactory
+from tasks.middleware import RequestValidationMiddleware
+
+SIZES = [('1 KB', 1024), ('100 KB', 100 * 1024), ('1 MB', 1024 * 1024)]
+FIELD_SIZE = 512
+
+
+class LegacyRequestValidationMiddleware(RequestValidationMiddleware):
+    """The previous implementation, kept here for comparison"""
+    def process_request(self, request):
+        if request.method not in ('POST', 'PUT', 'PATCH'):
+            return None
+        if hasattr(request, 'POST') and request.POST:
+            for key, value in request.POST.items():
+                if isinstance(value, str) and self._is_suspicious(value):
+                    return False
+        return None
+
+    def _is_suspicious(self, value):
+        for pattern in self.SUSPICIOUS_PATTERNS:
+            if re.search(pattern, value, re.IGNORECASE):
+                return True
+        return False
+
+
+def make_fields(size):
+    text = ('Implement the task board drag and drop, then review it. ' * 20)[:FIELD_SIZE]
+    return {f'field_{i}': text for i in range(max(1, size // FIELD_SIZE))}
+
+
+def measure(middleware, make_request, iterations):
+    timings = []
+    for _ in range(iterations):
+        request = make_request()
+        start = time.perf_counter()
+        middleware.process_request(request)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    factory = RequestFactory()
+    current = RequestValidationMiddleware(lambda request: None)
+    legacy = LegacyRequestValidationMiddleware(lambda request: None)
+
+    print(f"median per-request overhead over {iterations} requests (ms)")
+    print(f"  {'payload':<8} {'form legacy':>12} {'form':>10} {'json':>10}")
+    for label, size in SIZES:
+        fields = make_fields(size)
+        form_body = urlencode(fields)
+        json_body = json.dumps(fields)
+
+        def form_request():
+            request = factory.post('/', form_body, content_type='application/x-www-form-urlencoded')
+            request.POST
+            return request
+
+        def json_request():
+            return factory.post('/', json_body, content_type='application/json')
+
+        print(
+            f"  {label:<8} {measure(legacy, form_request, iterations):12.3f}"
+            f" {measure(current, form_request, iterations):10.3f}"
+            f" {measure(current, json_request, iterations):10.3f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark per-request cache latency with and without the in-process near cache.
+
+Each simulated request reads a project version counter, the project board and a
+handful of task keys, which is what a board or task page does. Set REDIS_URL to
+run against a real Redis; otherwise the shared tier is a local-memory cache with
+an artificial round-trip latency (SIMULATED_RTT_MS, default 0.3 ms).
+
+Usage:
+    python benchmarks/bench_two_tier_cache.py [requests]
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+
+SIMULATED_RTT = float(os.environ.get('SIMULATED_RTT_MS', 0.3)) / 1000
+
+
+class SlowLocMemCache(LocMemCache):
+    """Local-memory cache that pays a fixed round trip per call, like a network cache"""
+    def get(self, *args, **kwargs):
+        time.sleep(SIMULATED_RTT)
+        return super().get(*args, **kwargs)
+
+    def get_many(self, *args, **kwargs):
+        time.sleep(SIMULATED_RTT)
+        return super().get_many(*args, **kwargs)
+
+    def set(self, *args, **kwargs):
+        time.sleep(SIMULATED_RTT)
+        return super().set(*args, **kwargs)
+
+    def add(self, *args, **kwargs):
+        time.sleep(SIMULATED_RTT)
+        return super().add(*args, **kwargs)
+
+
+if os.environ.get('REDIS_URL'):
+    SHARED = {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+        'OPTIONS': {'CLIENT_CLASS': 'django_redis.client.DefaultClient'},
+    }
+else:
+    SHARED = {'BACKEND': '__main__.SlowLocMemCache', 'LOCATION': 'bench-shared'}
+
+settings.configure(CACHES={
+    'shared': SHARED,
+    'two_tier': {
+        'BACKEND': 'tasks.cache_backends.TwoTierCache',
+        'OPTIONS': {'SHARED_ALIAS': 'shared', 'NEAR_TIMEOUT': 5},
+    },
+})
+
+from django.core.cache import caches
+
+BOARD = {
+    'task_lists': [
+        {'id': i, 'name': f'List {i}', 'tasks': [{'id': j, 'title': f'Task {j}'} for j in range(50)]}
+        for i in range(5)
+    ]
+}
+
+
+def simulate_request(backend, project_id=1):
+    version = backend.get(f'version:project:{project_id}')
+    backend.get(f'project:{project_id}:1:{version}')
+    for task_id in range(5):
+        backend.get(f'task:{task_id}:1:{version}')
+
+
+def run(alias, requests):
+    backend = caches[alias]
+    backend.set('version:project:1', 1, None)
+    backend.set('project:1:1:1', BOARD, 300)
+    for task_id in range(5):
+        backend.set(f'task:{task_id}:1:1', {'id': task_id}, 300)
+
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        simulate_request(backend)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(
+        f"  {alias:<10} mean {statistics.mean(timings) * 1000:8.3f} ms"
+        f"  p50 {timings[len(timings) // 2] * 1000:8.3f} ms"
+        f"  p99 {timings[int(len(timings) * 0.99)] * 1000:8.3f} ms"
+    )
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"{requests} requests, 7 cache reads each ({'redis' if os.environ.get('REDIS_URL') else 'simulated RTT'})")
+    run('shared', requests)
+    run('two_tier', requests)
+
+
+if __name__ == '__main__':
+    main()
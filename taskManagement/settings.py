@@ -62,9 +62,19 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'tasks.middleware.ActivityLogMiddleware',  # Batch activity log writes per request
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Form and JSON bodies larger than this are not scanned by RequestValidationMiddleware
+REQUEST_VALIDATION_MAX_BODY_SIZE = int(os.environ.get('REQUEST_VALIDATION_MAX_BODY_SIZE', 1024 * 1024))
+
+# Path prefixes skipped by RequestSanitizationMiddleware, e.g. bulk API endpoints
+# that validate their own input (comma separated in the environment)
+REQUEST_SANITIZATION_EXEMPT_PATHS = [
+    path for path in os.environ.get('REQUEST_SANITIZATION_EXEMPT_PATHS', '').split(',') if path
+]
+
 ROOT_URLCONF = 'taskManagement.urls'
 
 TEMPLATES = [
@@ -145,6 +155,18 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Activity log retention: `manage.py archive_activity_log` moves rows older than
+# this many days to gzip-compressed NDJSON files in ACTIVITY_LOG_ARCHIVE_DIR
+ACTIVITY_LOG_RETENTION_DAYS = int(os.environ.get('ACTIVITY_LOG_RETENTION_DAYS', 365))
+ACTIVITY_LOG_ARCHIVE_DIR = os.environ.get('ACTIVITY_LOG_ARCHIVE_DIR', BASE_DIR / 'archive')
+
+# Hand committed activity log batches to a background writer thread instead of
+# inserting them in the request; it merges up to ACTIVITY_LOG_QUEUE_BATCH_SIZE
+# entries per INSERT, waiting at most ACTIVITY_LOG_QUEUE_INTERVAL seconds
+ACTIVITY_LOG_QUEUE = os.environ.get('ACTIVITY_LOG_QUEUE', 'False') == 'True'
+ACTIVITY_LOG_QUEUE_BATCH_SIZE = int(os.environ.get('ACTIVITY_LOG_QUEUE_BATCH_SIZE', 500))
+ACTIVITY_LOG_QUEUE_INTERVAL = float(os.environ.get('ACTIVITY_LOG_QUEUE_INTERVAL', 1.0))
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -248,6 +270,20 @@ if not DEBUG:
         }
     }
 
+    # With a shared backend such as Redis, keep a small in-process LRU in front of
+    # it so that repeated lookups of hot versioned keys skip the network round trip
+    if 'redis' in os.environ.get('CACHE_BACKEND', '') and os.environ.get('NEAR_CACHE_ENABLED', 'True') == 'True':
+        CACHES['shared'] = CACHES['default']
+        CACHES['default'] = {
+            'BACKEND': 'tasks.cache_backends.TwoTierCache',
+            'TIMEOUT': CACHES['shared']['TIMEOUT'],
+            'OPTIONS': {
+                'SHARED_ALIAS': 'shared',
+                'NEAR_MAX_ENTRIES': int(os.environ.get('NEAR_CACHE_MAX_ENTRIES', 1000)),
+                'NEAR_TIMEOUT': int(os.environ.get('NEAR_CACHE_TIMEOUT', 5)),
+            },
+        }
+
 # Key for cache versioning - change when models change
 CACHE_VERSION = 1
 
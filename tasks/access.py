@@ -0,0 +1,98 @@
+from django.core.cache import cache
+from django.db.models import BooleanField, Q, Value
+from .models import Project, Task, TaskList, _get_task_project_id
+from .utils import user_projects_cache_key
+
+# The map is versioned by the user's cache version, which the membership and
+# project signals bump, so the timeout only bounds memory use
+PROJECT_ACCESS_CACHE_TIMEOUT = 3600
+
+# Above this many accessible projects, querysets are scoped with a subquery
+# instead of an inline list of ids
+MAX_INLINE_PROJECT_IDS = 500
+
+class ProjectAccess:
+    """The ids of the projects a user owns and of those they can access"""
+    def __init__(self, owned_ids=(), member_ids=()):
+        self.owned_ids = frozenset(owned_ids)
+        self.project_ids = self.owned_ids | frozenset(member_ids)
+
+    def can_access(self, project_id):
+        return project_id in self.project_ids
+
+    def is_owner(self, project_id):
+        return project_id in self.owned_ids
+
+def _load_project_access(user):
+    """Load the owned and member project ids of a user in one query"""
+    owned = Project.objects.filter(owner=user).annotate(
+        is_owner=Value(True, output_field=BooleanField())
+    ).values_list('id', 'is_owner').order_by()
+    member = Project.members.through.objects.filter(user=user).annotate(
+        is_owner=Value(False, output_field=BooleanField())
+    ).values_list('project_id', 'is_owner').order_by()
+
+    owned_ids, member_ids = [], []
+    for project_id, is_owner in owned.union(member, all=True):
+        (owned_ids if is_owner else member_ids).append(project_id)
+    return owned_ids, member_ids
+
+def accessible_projects_subquery(user):
+    """
+    Return a subquery of the ids of the projects a user owns or is a member of.
+    It is a UNION of an owner_id lookup and a members lookup, which both use an
+    index, instead of an OR across the members join that needs DISTINCT.
+    """
+    owned = Project.objects.filter(owner=user).values('id').order_by()
+    member = Project.members.through.objects.filter(user=user).values('project_id').order_by()
+    return owned.union(member)
+
+def project_scope_q(request, field='project_id'):
+    """Return a Q restricting `field` to the projects the requesting user can access"""
+    project_ids = get_project_access(request).project_ids
+    if len(project_ids) > MAX_INLINE_PROJECT_IDS:
+        return Q(**{f'{field}__in': accessible_projects_subquery(request.user)})
+    return Q(**{f'{field}__in': project_ids})
+
+def scope_to_projects(queryset, request, field='project_id'):
+    """
+    Restrict a queryset to the rows whose `field` refers to a project the
+    requesting user can access. Every view scopes its querysets through here.
+    """
+    return queryset.filter(project_scope_q(request, field))
+
+def get_project_access(request):
+    """
+    Return the ProjectAccess of the requesting user. It is computed at most once
+    per request and cached across requests until the user's version is bumped.
+    """
+    access = getattr(request, '_project_access', None)
+    if access is not None:
+        return access
+
+    user = request.user
+    if not user.is_authenticated:
+        access = ProjectAccess()
+    else:
+        cache_key = user_projects_cache_key(user.id)
+        cached = cache.get(cache_key)
+        if cached is None:
+            cached = _load_project_access(user)
+            cache.set(cache_key, cached, PROJECT_ACCESS_CACHE_TIMEOUT)
+        access = ProjectAccess(*cached)
+    request._project_access = access
+    return access
+
+def get_object_project_id(obj):
+    """Return the id of the project an object belongs to, using already loaded values when possible"""
+    if isinstance(obj, Project):
+        return obj.pk
+    if isinstance(obj, TaskList):
+        return obj.project_id
+    if isinstance(obj, Task):
+        return _get_task_project_id(obj)
+    # Comments and attachments: the viewsets annotate the project id
+    project_id = getattr(obj, 'project_id', None)
+    if project_id is None:
+        project_id = _get_task_project_id(obj.task)
+    return project_id
@@ -0,0 +1,181 @@
+"""
+Buffered activity logging.
+
+Entries are collected per request (see ActivityLogMiddleware) or per
+`activity_batch()` block and written with a single bulk_create once the
+surrounding transaction commits. Each entry joins its batch only when the
+transaction or savepoint it was logged in commits, so entries logged inside a
+rolled-back `atomic()` block are dropped with it. Task titles and project ids
+are resolved for the whole batch in one query, so callers never need to load
+`instance.task`.
+
+With ACTIVITY_LOG_QUEUE enabled, committed batches are handed to a background
+thread that merges them into larger inserts instead of writing in the request.
+"""
+import atexit
+import contextvars
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# Placeholder replaced with the task title when an entry is written
+TASK_TITLE = '{task}'
+
+_batch = contextvars.ContextVar('activity_log_batch', default=None)
+
+def log_activity(user_id, action, description=None, template=None, task_id=None,
+                 project_id=None, old_value=None, new_value=None):
+    """
+    Record an activity log entry. Pass either a ready `description` or a
+    `template` containing TASK_TITLE, formatted when the entry is written.
+    Without an active batch the entry is written on its own when the current
+    transaction commits; either way it is discarded if that transaction or
+    savepoint rolls back.
+    """
+    entry = {
+        'user_id': user_id,
+        'action': action,
+        'description': description,
+        'template': template,
+        'task_id': task_id,
+        'project_id': project_id,
+        'old_value': old_value,
+        'new_value': new_value,
+    }
+    batch = _batch.get()
+    if batch is not None:
+        transaction.on_commit(lambda: batch.append(entry))
+    else:
+        _flush([entry])
+
+@contextmanager
+def activity_batch():
+    """Collect the entries logged inside the block and flush them together at the end"""
+    if _batch.get() is not None:
+        # Nested batches join the outer one
+        yield
+        return
+    entries = []
+    token = _batch.set(entries)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+        # Registered after the entries' own callbacks, so it runs once they have joined
+        _flush(entries)
+
+def _flush(entries):
+    transaction.on_commit(lambda: entries and _dispatch(entries))
+
+def _dispatch(entries):
+    if getattr(settings, 'ACTIVITY_LOG_QUEUE', False):
+        get_writer().put(entries)
+    else:
+        write_entries(entries)
+
+def write_entries(entries):
+    """
+    Resolve task titles and project ids in one query, then insert every entry
+    at once. Entries whose task was deleted before the flush are dropped, as
+    the task's log rows were deleted with it.
+    """
+    from .models import ActivityLog, Task
+
+    task_ids = {entry['task_id'] for entry in entries if entry['task_id']}
+    tasks = {}
+    if task_ids:
+        tasks = {
+            task_id: (title, project_id) for task_id, title, project_id in Task.objects.filter(
+                id__in=task_ids
+            ).values_list('id', 'title', 'task_list__project_id').order_by()
+        }
+
+    logs = []
+    for entry in entries:
+        if entry['task_id'] and entry['task_id'] not in tasks:
+            continue
+        title, project_id = tasks.get(entry['task_id'], ('', None))
+        description = entry['description']
+        if entry['template']:
+            description = entry['template'].replace(TASK_TITLE, title)
+        logs.append(ActivityLog(
+            user_id=entry['user_id'],
+            action=entry['action'],
+            description=description,
+            task_id=entry['task_id'],
+            project_id=entry['project_id'] or project_id,
+            old_value=entry['old_value'],
+            new_value=entry['new_value'],
+        ))
+    if logs:
+        ActivityLog.objects.bulk_create(logs)
+
+class ActivityLogWriter:
+    """
+    Background thread that writes queued batches, merging up to max_batch_size
+    entries per INSERT. Entries still queued at interpreter exit are flushed.
+    """
+    def __init__(self, max_batch_size=500, interval=1.0):
+        self.max_batch_size = max_batch_size
+        self.interval = interval
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def put(self, entries):
+        self._ensure_started()
+        self._queue.put(entries)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='activity-log-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            pending = self._queue.get()
+            try:
+                while len(pending) < self.max_batch_size:
+                    pending.extend(self._queue.get(timeout=self.interval))
+            except queue.Empty:
+                pass
+            self._write(pending)
+
+    def _write(self, entries):
+        try:
+            write_entries(entries)
+        except Exception:
+            logger.exception('Failed to write %d activity log entries', len(entries))
+        finally:
+            close_old_connections()
+
+    def flush(self):
+        """Write every queued entry in the calling thread"""
+        pending = []
+        while True:
+            try:
+                pending.extend(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if pending:
+            self._write(pending)
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ActivityLogWriter(
+                max_batch_size=getattr(settings, 'ACTIVITY_LOG_QUEUE_BATCH_SIZE', 500),
+                interval=getattr(settings, 'ACTIVITY_LOG_QUEUE_INTERVAL', 1.0),
+            )
+            atexit.register(_writer.flush)
+        return _writer
@@ -0,0 +1,158 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+class TwoTierCache(BaseCache):
+    """
+    Cache backend that keeps a bounded in-process LRU in front of a shared backend.
+
+    Only keys starting with one of NEAR_PREFIXES are held in process, and never
+    for longer than NEAR_TIMEOUT seconds. Those keys are expected to embed a
+    version counter (see utils.get_cache_version); the counters themselves live
+    only in the shared tier, so a version bump in any worker makes the stale
+    near entries unreachable. Everything else (counters, locks, throttle
+    history) goes straight to the shared backend.
+
+    OPTIONS:
+        SHARED_ALIAS      alias of the shared backend in CACHES (default 'shared')
+        NEAR_MAX_ENTRIES  maximum number of entries held in process (default 1000)
+        NEAR_TIMEOUT      maximum age in seconds of an in-process entry (default 5)
+        NEAR_PREFIXES     key prefixes eligible for the in-process tier
+    """
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED_ALIAS', 'shared')
+        self._near_max_entries = options.get('NEAR_MAX_ENTRIES', 1000)
+        self._near_timeout = options.get('NEAR_TIMEOUT', 5)
+        self._near_prefixes = tuple(options.get('NEAR_PREFIXES', ('project:', 'task:', 'user:', 'cache:')))
+        self._near = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _is_near(self, key):
+        return key.startswith(self._near_prefixes) and not key.endswith(':lock')
+
+    def _near_get(self, key, version):
+        with self._lock:
+            entry = self._near.get((key, version))
+            if entry is None:
+                return None
+            expires_at, pickled = entry
+            if expires_at <= time.monotonic():
+                del self._near[(key, version)]
+                return None
+            self._near.move_to_end((key, version))
+        return entry
+
+    def _near_set(self, key, value, version, timeout):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        near_timeout = self._near_timeout if timeout is None else min(timeout, self._near_timeout)
+        if near_timeout <= 0:
+            self._near_delete(key, version)
+            return
+        entry = (time.monotonic() + near_timeout, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            self._near[(key, version)] = entry
+            self._near.move_to_end((key, version))
+            while len(self._near) > self._near_max_entries:
+                self._near.popitem(last=False)
+
+    def _near_delete(self, key, version):
+        with self._lock:
+            self._near.pop((key, version), None)
+
+    def get(self, key, default=None, version=None):
+        if not self._is_near(key):
+            return self.shared.get(key, default, version=version)
+
+        entry = self._near_get(key, version)
+        if entry is not None:
+            return pickle.loads(entry[1])
+
+        missing = object()
+        value = self.shared.get(key, missing, version=version)
+        if value is missing:
+            return default
+        # The shared tier does not tell us the remaining TTL, so use the near timeout
+        self._near_set(key, value, version, self._near_timeout)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        if self._is_near(key):
+            self._near_set(key, value, version, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added and self._is_near(key):
+            self._near_set(key, value, version, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._near_delete(key, version)
+        return self.shared.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        if self._is_near(key) and self._near_get(key, version) is not None:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._near_delete(key, version)
+        return self.shared.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self._near_delete(key, version)
+        return self.shared.decr(key, delta, version=version)
+
+    def get_many(self, keys, version=None):
+        found, remote_keys = {}, []
+        for key in keys:
+            entry = self._near_get(key, version) if self._is_near(key) else None
+            if entry is not None:
+                found[key] = pickle.loads(entry[1])
+            else:
+                remote_keys.append(key)
+
+        if remote_keys:
+            remote = self.shared.get_many(remote_keys, version=version)
+            for key, value in remote.items():
+                if self._is_near(key):
+                    self._near_set(key, value, version, self._near_timeout)
+            found.update(remote)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if self._is_near(key) and key not in failed:
+                self._near_set(key, value, version, timeout)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._near_delete(key, version)
+        return self.shared.delete_many(keys, version=version)
+
+    def clear(self):
+        self.clear_near()
+        return self.shared.clear()
+
+    def clear_near(self):
+        """Drop every in-process entry, e.g. between requests in tests"""
+        with self._lock:
+            self._near.clear()
+
+    def close(self, **kwargs):
+        return self.shared.close(**kwargs)
@@ -0,0 +1,101 @@
+import csv
+import zlib
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import Comment, Task
+
+# Rows fetched per database round trip while streaming an export
+EXPORT_CHUNK_SIZE = 2000
+
+ACTIVITY_LOG_EXPORT_FIELDS = [
+    'id', 'timestamp', 'action', 'user_id', 'user__username',
+    'project_id', 'task_id', 'description', 'old_value', 'new_value',
+]
+
+PROJECT_EXPORT_FIELDS = ['id', 'name', 'description', 'created_at', 'owner_id', 'owner__username']
+TASK_LIST_EXPORT_FIELDS = ['id', 'name', 'position', 'created_at']
+TASK_EXPORT_FIELDS = [
+    'id', 'task_list_id', 'title', 'description', 'status', 'priority', 'position',
+    'assigned_to_id', 'assigned_to__username', 'created_by_id', 'created_by__username',
+    'due_date', 'estimated_hours', 'actual_hours', 'created_at', 'updated_at',
+]
+DEPENDENCY_EXPORT_FIELDS = ['from_task_id', 'to_task_id']
+COMMENT_EXPORT_FIELDS = ['id', 'task_id', 'author_id', 'author__username', 'content', 'created_at', 'updated_at']
+
+class _Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer output"""
+    def write(self, value):
+        return value
+
+def ndjson_lines(rows):
+    """Yield one JSON document per row, each terminated by a newline"""
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+def csv_lines(rows, fields):
+    """Yield a CSV header followed by one line per row dict"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([row[field] for field in fields])
+
+def export_activity_log(queryset, output='ndjson', chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Stream the activity log rows of a queryset, newest first, as NDJSON or CSV
+    lines. Rows are read as plain values with a server-side iterator, so memory
+    use does not depend on the number of rows.
+    """
+    rows = queryset.order_by('-timestamp', '-id').values(
+        *ACTIVITY_LOG_EXPORT_FIELDS
+    ).iterator(chunk_size=chunk_size)
+    if output == 'csv':
+        return csv_lines(rows, ACTIVITY_LOG_EXPORT_FIELDS)
+    return ndjson_lines(rows)
+
+def _records(record_type, rows):
+    for row in rows:
+        yield {'type': record_type, **row}
+
+def project_records(project, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield every record of a project as a dict with a `type` key: the project,
+    then its task lists, tasks, dependencies and comments. Each kind is read
+    with one server-side iterator over plain values, so memory use does not
+    depend on the size of the project.
+    """
+    yield from _records('project', type(project).objects.filter(pk=project.pk).values(*PROJECT_EXPORT_FIELDS))
+    yield from _records('task_list', project.task_lists.order_by('position', 'id').values(
+        *TASK_LIST_EXPORT_FIELDS
+    ).iterator(chunk_size=chunk_size))
+    yield from _records('task', Task.objects.filter(task_list__project=project).order_by(
+        'task_list_id', 'position', 'id'
+    ).values(*TASK_EXPORT_FIELDS).iterator(chunk_size=chunk_size))
+    yield from _records('dependency', Task.dependencies.through.objects.filter(
+        from_task__task_list__project=project
+    ).order_by('from_task_id', 'to_task_id').values(*DEPENDENCY_EXPORT_FIELDS).iterator(chunk_size=chunk_size))
+    yield from _records('comment', Comment.objects.filter(task__task_list__project=project).order_by(
+        'task_id', 'created_at', 'id'
+    ).values(*COMMENT_EXPORT_FIELDS).iterator(chunk_size=chunk_size))
+
+def gzip_chunks(lines, level=6, min_size=64 * 1024):
+    """Gzip-compress text lines incrementally, yielding compressed chunks of at least min_size bytes"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    pending = []
+    size = 0
+    for line in lines:
+        data = compressor.compress(line.encode())
+        if data:
+            pending.append(data)
+            size += len(data)
+            if size >= min_size:
+                yield b''.join(pending)
+                pending, size = [], 0
+    pending.append(compressor.flush())
+    yield b''.join(pending)
+
+def export_project(project, compress=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """Stream a project as NDJSON lines, or as gzip-compressed bytes when compress is set"""
+    lines = ndjson_lines(project_records(project, chunk_size))
+    if compress:
+        return gzip_chunks(lines)
+    return lines
@@ -1,7 +1,7 @@
 import django_filters
 from django.contrib.auth.models import User
 from django.db.models import Q
-from .models import Project, TaskList, Task
+from .models import Project, TaskList, Task, ActivityLog
 
 class ProjectFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(lookup_expr='icontains')
@@ -42,4 +42,23 @@ class TaskFilter(django_filters.FilterSet):
         fields = [
             'title', 'description', 'task_list', 'status', 
             'priority', 'assigned_to', 'created_by'
-        ]
\ No newline at end of file
+        ]
+
+class ActivityLogFilter(django_filters.FilterSet):
+    project = django_filters.NumberFilter(method='filter_project')
+    task = django_filters.NumberFilter(field_name='task_id')
+    user = django_filters.NumberFilter(field_name='user_id')
+    action = django_filters.MultipleChoiceFilter(choices=ActivityLog.ACTION_CHOICES)
+    since = django_filters.IsoDateTimeFilter(field_name='timestamp', lookup_expr='gte')
+    until = django_filters.IsoDateTimeFilter(field_name='timestamp', lookup_expr='lt')
+
+    class Meta:
+        model = ActivityLog
+        fields = ['project', 'task', 'user', 'action']
+
+    def filter_project(self, queryset, name, value):
+        # Task activities do not always carry the project, so also match the
+        # project's tasks; both sides use an index instead of joining tasks
+        return queryset.filter(
+            Q(project_id=value) | Q(task_id__in=Task.objects.filter(task_list__project_id=value).values('id'))
+        )
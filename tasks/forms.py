@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.db.models import Q
 from django.utils import timezone
 import os
 from .models import Project, TaskList, Task, Comment, TaskAttachment
@@ -158,7 +159,10 @@ class TaskBulkUpdateForm(forms.Form):
             self.fields['tasks'].queryset = Task.objects.filter(
                 task_list__project=project
             )
-            self.fields['assigned_to'].queryset = project.members.all()
+            # The owner can be assigned tasks as well as the members
+            self.fields['assigned_to'].queryset = User.objects.filter(
+                Q(id=project.owner_id) | Q(project_members=project)
+            ).distinct()
 
 class TaskFilterForm(forms.Form):
     status = forms.MultipleChoiceField(
@@ -0,0 +1,299 @@
+from collections import defaultdict, deque
+from django.core.cache import cache
+from django.db.models import F
+from .models import Task
+from .utils import dependency_graph_cache_key
+
+class DependencyGraph:
+    """
+    In-memory adjacency structure for task dependencies.
+
+    An edge (task_id, dependency_id) means that task_id depends on dependency_id.
+    Edges are loaded in bulk so that cycle detection, ordering and reachability
+    never issue a query per hop.
+    """
+    def __init__(self, edges=()):
+        self.nodes = set()
+        self.dependencies = defaultdict(set)
+        self.dependents = defaultdict(set)
+        for task_id, dependency_id in edges:
+            self.add_edge(task_id, dependency_id)
+
+    @classmethod
+    def for_projects(cls, project_ids, follow_external=True):
+        """
+        Load the dependency edges of the given projects, following edges into
+        other projects so that cross-project chains are complete. Issues one
+        query per ring of newly reached projects (usually a single query).
+        With follow_external=False only the edges leaving the given projects'
+        tasks are loaded, so other projects appear as direct dependencies only.
+        """
+        graph = cls()
+        loaded = set()
+        pending = set(project_ids)
+        while pending:
+            loaded |= pending
+            rows = Task.dependencies.through.objects.filter(
+                from_task__task_list__project_id__in=pending
+            ).values_list('from_task_id', 'to_task_id', 'to_task__task_list__project_id')
+
+            pending = set()
+            for task_id, dependency_id, dependency_project_id in rows:
+                graph.add_edge(task_id, dependency_id)
+                if follow_external and dependency_project_id not in loaded:
+                    pending.add(dependency_project_id)
+        return graph
+
+    @classmethod
+    def for_tasks(cls, task_ids):
+        """Load the graph of every project that the given tasks belong to"""
+        project_ids = Task.objects.filter(
+            id__in=task_ids
+        ).values_list('task_list__project_id', flat=True).distinct()
+        return cls.for_projects(set(project_ids))
+
+    def add_node(self, task_id):
+        self.nodes.add(task_id)
+
+    def add_edge(self, task_id, dependency_id):
+        self.nodes.add(task_id)
+        self.nodes.add(dependency_id)
+        self.dependencies[task_id].add(dependency_id)
+        self.dependents[dependency_id].add(task_id)
+
+    def remove_edge(self, task_id, dependency_id):
+        self.dependencies[task_id].discard(dependency_id)
+        self.dependents[dependency_id].discard(task_id)
+
+    def reachable(self, task_id, reverse=False):
+        """
+        Return every task reachable from task_id, excluding task_id itself.
+        Follows dependencies by default, or dependents when reverse is True.
+        """
+        adjacency = self.dependents if reverse else self.dependencies
+        seen = set()
+        queue = deque(adjacency.get(task_id, ()))
+        while queue:
+            current = queue.popleft()
+            if current in seen:
+                continue
+            seen.add(current)
+            queue.extend(adjacency.get(current, ()))
+        seen.discard(task_id)
+        return seen
+
+    def find_path(self, start_id, end_id):
+        """Return a dependency path from start_id to end_id as a list of ids, or None"""
+        if start_id == end_id:
+            return [start_id]
+        parents = {start_id: None}
+        queue = deque([start_id])
+        while queue:
+            current = queue.popleft()
+            for dependency_id in self.dependencies.get(current, ()):
+                if dependency_id in parents:
+                    continue
+                parents[dependency_id] = current
+                if dependency_id == end_id:
+                    path = [end_id]
+                    while parents[path[-1]] is not None:
+                        path.append(parents[path[-1]])
+                    return path[::-1]
+                queue.append(dependency_id)
+        return None
+
+    def cycle_for_edge(self, task_id, dependency_id):
+        """
+        Return the cycle that adding task_id -> dependency_id would close,
+        as a list of ids starting and ending with task_id, or None.
+        """
+        path = self.find_path(dependency_id, task_id)
+        if path is None:
+            return None
+        return [task_id] + path
+
+    def would_create_cycle(self, task_id, dependency_id):
+        """Check if making task_id depend on dependency_id would create a cycle"""
+        return self.cycle_for_edge(task_id, dependency_id) is not None
+
+    def topological_order(self):
+        """
+        Return all nodes ordered so that every task comes after its dependencies.
+        Raises ValueError if the graph contains a cycle.
+        """
+        remaining = {node: len(self.dependencies.get(node, ())) for node in self.nodes}
+        queue = deque(sorted(node for node, count in remaining.items() if count == 0))
+        order = []
+        while queue:
+            current = queue.popleft()
+            order.append(current)
+            for dependent_id in self.dependents.get(current, ()):
+                remaining[dependent_id] -= 1
+                if remaining[dependent_id] == 0:
+                    queue.append(dependent_id)
+
+        if len(order) != len(self.nodes):
+            raise ValueError("Dependency graph contains a cycle")
+        return order
+
+    def critical_path(self, weights):
+        """
+        Return (path, total) for the heaviest dependency chain, where weights maps
+        task ids to their cost. The path is ordered from the first task to start.
+        """
+        finish, previous = {}, {}
+        for node in self.topological_order():
+            best = max(self.dependencies.get(node, ()), key=lambda dep: finish[dep], default=None)
+            previous[node] = best
+            finish[node] = weights.get(node, 0) + (finish[best] if best is not None else 0)
+
+        if not finish:
+            return [], 0
+        node = max(finish, key=finish.get)
+        total = finish[node]
+        path = []
+        while node is not None:
+            path.append(node)
+            node = previous[node]
+        return path[::-1], total
+
+    def transitive_blockers(self, open_ids):
+        """
+        Map every task to the set of its direct and indirect dependencies that are
+        still open, computed in a single pass in topological order.
+        """
+        blockers = {}
+        for node in self.topological_order():
+            blocked_by = set()
+            for dependency_id in self.dependencies.get(node, ()):
+                blocked_by |= blockers[dependency_id]
+                if dependency_id in open_ids:
+                    blocked_by.add(dependency_id)
+            blockers[node] = blocked_by
+        return blockers
+
+    def find_cycle(self):
+        """Return one cycle in the graph as a list of ids, or None if it is acyclic"""
+        visiting, done = set(), set()
+        for root in self.nodes:
+            if root in done:
+                continue
+            # Iterative DFS so that long chains do not hit the recursion limit
+            stack = [(root, iter(self.dependencies.get(root, ())))]
+            path = [root]
+            visiting.add(root)
+            while stack:
+                node, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    stack.pop()
+                    path.pop()
+                    visiting.discard(node)
+                    done.add(node)
+                elif child in visiting:
+                    return path[path.index(child):] + [child]
+                elif child not in done:
+                    visiting.add(child)
+                    path.append(child)
+                    stack.append((child, iter(self.dependencies.get(child, ()))))
+        return None
+
+# Shown instead of the title, status and hours of an external dependency in a
+# project the requesting user cannot access
+REDACTED_TASK = {'title': None, 'status': None, 'estimated_hours': None}
+
+def resolve_external_tasks(summary, access=None):
+    """
+    Return a copy of a dependency summary with the titles of its external
+    dependencies, which are not cached so that renaming a task never touches
+    other projects. Those in projects outside the given ProjectAccess are
+    redacted to their id instead.
+    """
+    external = [task for task in summary.get('tasks', ()) if task['external']]
+    if not external:
+        return summary
+    visible = {
+        task['id'] for task in external if access is None or access.can_access(task['project_id'])
+    }
+    titles = dict(Task.objects.filter(id__in=visible).values_list('id', 'title').order_by()) if visible else {}
+    tasks = [
+        task if not task['external']
+        else dict(task, title=titles.get(task['id'])) if task['id'] in visible
+        else dict(task, **REDACTED_TASK)
+        for task in summary['tasks']
+    ]
+    return dict(summary, tasks=tasks)
+
+def get_project_dependency_summary(project_id, timeout=3600, access=None):
+    """
+    Return the dependency DAG of a project with its topological order, critical
+    path weighted by estimated hours and the open blockers of every task.
+    Dependencies in other projects are included as external nodes, but not
+    their own dependencies. Cached until a dependency edge, a task of the
+    project or the status or hours of an external dependency change. With a
+    ProjectAccess, external tasks the user cannot see are redacted.
+    """
+    cache_key = dependency_graph_cache_key(project_id)
+    summary = cache.get(cache_key)
+    if summary is None:
+        summary = _build_dependency_summary(project_id)
+        cache.set(cache_key, summary, timeout)
+    return resolve_external_tasks(summary, access)
+
+def _build_dependency_summary(project_id):
+    tasks = {
+        row['id']: row for row in Task.objects.filter(
+            task_list__project_id=project_id
+        ).values('id', 'title', 'status', 'estimated_hours').order_by()
+    }
+    graph = DependencyGraph.for_projects([project_id], follow_external=False)
+    for task_id in tasks:
+        graph.add_node(task_id)
+
+    # Direct dependencies that live in other projects are reported as external nodes
+    external_ids = graph.nodes - tasks.keys()
+    if external_ids:
+        for row in Task.objects.filter(id__in=external_ids).values(
+            'id', 'status', 'estimated_hours', project_id=F('task_list__project_id')
+        ).order_by():
+            tasks[row['id']] = dict(row, title=None, external=True)
+
+    edges = sorted(
+        (task_id, dependency_id)
+        for task_id, dependency_ids in graph.dependencies.items()
+        for dependency_id in dependency_ids
+    )
+    cycle = graph.find_cycle()
+    if cycle:
+        return {'project_id': project_id, 'edges': edges, 'cycle': cycle}
+
+    weights = {
+        task_id: float(row['estimated_hours'] or 0) for task_id, row in tasks.items()
+    }
+    open_ids = {task_id for task_id, row in tasks.items() if row['status'] != 'DONE'}
+    path, total_hours = graph.critical_path(weights)
+    blockers = graph.transitive_blockers(open_ids)
+
+    return {
+        'project_id': project_id,
+        'tasks': [
+            {
+                'id': task_id,
+                'title': row['title'],
+                'status': row['status'],
+                'estimated_hours': weights[task_id],
+                'external': row.get('external', False),
+                'project_id': row.get('project_id', project_id),
+                'is_blocked': bool(blockers[task_id]),
+                'blockers': sorted(blockers[task_id]),
+            }
+            for task_id, row in sorted(tasks.items())
+        ],
+        'edges': edges,
+        'topological_order': graph.topological_order(),
+        'critical_path': {
+            'tasks': path,
+            'total_estimated_hours': total_hours,
+        },
+        'cycle': None,
+    }
@@ -0,0 +1,258 @@
+import csv
+import json
+from itertools import islice
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from .activity import log_activity
+from .graph import DependencyGraph
+from .models import Task, TaskList
+from .ordering import POSITION_GAP, lock_parent
+from .utils import bump_cache_version
+
+# Rows validated and inserted per transaction
+IMPORT_CHUNK_SIZE = 1000
+
+# Errors kept in the result; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+TASK_IMPORT_FIELDS = [
+    'ref', 'title', 'description', 'task_list', 'status', 'priority',
+    'assigned_to', 'due_date', 'estimated_hours', 'actual_hours', 'dependencies',
+]
+
+# Columns copied onto the task after Field.clean()
+_MODEL_FIELDS = ['title', 'description', 'status', 'priority', 'due_date', 'estimated_hours', 'actual_hours']
+
+def csv_rows(lines):
+    """Yield (line number, row, error) for each record of a CSV file with a header"""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row, None
+
+def ndjson_rows(lines):
+    """Yield (line number, row, error) for each non-empty line of an NDJSON file"""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, None, f'Invalid JSON: {exc}'
+            continue
+        if not isinstance(row, dict):
+            yield number, None, 'Expected a JSON object'
+            continue
+        yield number, row, None
+
+def _choice_values(choices):
+    """Map both the stored values and the display labels of a choice list to the stored value"""
+    values = {}
+    for value, label in choices:
+        values[value.lower()] = value
+        values[label.lower()] = value
+    return values
+
+class TaskImporter:
+    """
+    Import tasks into a project from an iterable of (line, row, error) tuples.
+
+    Rows are handled in chunks: the users and task lists a chunk names are
+    resolved with one query each, its valid rows are inserted with a single
+    bulk_create, and invalid rows are reported with their line number instead
+    of aborting the import. Task lists that do not exist yet are created.
+    Dependencies name other rows of the same import by their `ref` and are
+    inserted, checked for cycles, once every task exists. If the file turns
+    out to be unreadable part way, the rows read so far are still imported and
+    the summary reports the problem as `read_error`.
+    """
+    STATUSES = _choice_values(Task.STATUS_CHOICES)
+    PRIORITIES = _choice_values(Task.PRIORITY_CHOICES)
+
+    def __init__(self, project, user, chunk_size=IMPORT_CHUNK_SIZE):
+        self.project = project
+        self.user = user
+        self.chunk_size = chunk_size
+        self.task_lists = dict(project.task_lists.values_list('name', 'id'))
+        self.users = {}
+        self.refs = {}
+        self.pending_dependencies = []
+        self.assignee_ids = set()
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+
+    def run(self, rows):
+        """Import every row and return a summary with the number of tasks created and the row errors"""
+        rows = iter(rows)
+        read_error = None
+        while read_error is None:
+            chunk = []
+            try:
+                chunk.extend(islice(rows, self.chunk_size))
+            except (UnicodeDecodeError, csv.Error) as exc:
+                read_error = f'Unreadable file: {exc}'
+            if not chunk:
+                break
+            self._import_chunk(chunk)
+        self._import_dependencies()
+
+        if self.created:
+            bump_cache_version('project', self.project.id)
+            bump_cache_version('dependency_graph', self.project.id)
+            for user_id in self.assignee_ids:
+                bump_cache_version('user', user_id)
+            log_activity(
+                self.user.id, 'CREATE', project_id=self.project.id,
+                description=f"Imported {self.created} tasks into project '{self.project.name}'"
+            )
+        result = {'created': self.created, 'error_count': self.error_count, 'errors': self.errors}
+        if read_error:
+            result['read_error'] = read_error
+        return result
+
+    def _error(self, line, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def _clean(self, row):
+        """Validate one row, returning (values, errors)"""
+        values, errors = {}, {}
+        row = {key: value for key, value in row.items() if value not in (None, '')}
+        if 'status' in row:
+            row['status'] = self.STATUSES.get(str(row['status']).lower(), row['status'])
+        if 'priority' in row:
+            row['priority'] = self.PRIORITIES.get(str(row['priority']).lower(), row['priority'])
+
+        for name in _MODEL_FIELDS:
+            field = Task._meta.get_field(name)
+            value = row.get(name, field.get_default())
+            try:
+                values[name] = field.clean(value, None)
+            except ValidationError as exc:
+                errors[name] = exc.messages
+        if values.get('due_date') and timezone.is_naive(values['due_date']):
+            values['due_date'] = timezone.make_aware(values['due_date'])
+
+        if not row.get('task_list'):
+            errors['task_list'] = ['This field cannot be blank.']
+        values['task_list'] = str(row.get('task_list', ''))[:200]
+        values['assigned_to'] = row.get('assigned_to')
+        values['ref'] = str(row['ref']) if 'ref' in row else None
+        if values['ref'] is not None and values['ref'] in self.refs:
+            errors['ref'] = [f"Duplicate ref '{values['ref']}'"]
+
+        dependencies = row.get('dependencies', [])
+        if isinstance(dependencies, str):
+            dependencies = dependencies.split('|')
+        values['dependencies'] = [str(ref).strip() for ref in dependencies if str(ref).strip()]
+        return values, errors
+
+    def _resolve_users(self, usernames):
+        missing = usernames - self.users.keys()
+        if missing:
+            self.users.update(User.objects.filter(
+                Q(id=self.project.owner_id) | Q(project_members=self.project),
+                username__in=missing
+            ).distinct().values_list('username', 'id'))
+
+    def _create_task_lists(self, names):
+        missing = [name for name in dict.fromkeys(names) if name not in self.task_lists]
+        if not missing:
+            return
+        lock_parent(self.project)
+        last = self.project.task_lists.aggregate(last=Max('position'))['last'] or 0
+        created = TaskList.objects.bulk_create([
+            TaskList(name=name, project=self.project, position=last + POSITION_GAP * index)
+            for index, name in enumerate(missing, start=1)
+        ])
+        self.task_lists.update((task_list.name, task_list.id) for task_list in created)
+
+    def _import_chunk(self, chunk):
+        cleaned = []
+        for line, row, error in chunk:
+            if error:
+                self._error(line, {'row': [error]})
+                continue
+            values, errors = self._clean(row)
+            if errors:
+                self._error(line, errors)
+            else:
+                cleaned.append((line, values))
+                if values['ref'] is not None:
+                    # Reserve the ref so later duplicates in the chunk are reported
+                    self.refs[values['ref']] = None
+
+        with transaction.atomic():
+            self._resolve_users({values['assigned_to'] for _, values in cleaned if values['assigned_to']})
+            valid = []
+            for line, values in cleaned:
+                if values['assigned_to'] and values['assigned_to'] not in self.users:
+                    self._error(line, {'assigned_to': [f"'{values['assigned_to']}' is not a project member"]})
+                    if values['ref'] is not None:
+                        del self.refs[values['ref']]
+                else:
+                    valid.append((line, values))
+            if not valid:
+                return
+
+            self._create_task_lists(values['task_list'] for _, values in valid)
+            list_ids = {self.task_lists[values['task_list']] for _, values in valid}
+            # Append after the tasks already in each list, with the lists locked
+            list(TaskList.objects.select_for_update().filter(id__in=list_ids).values_list('id', flat=True))
+            next_positions = dict(
+                Task.objects.filter(task_list_id__in=list_ids).values('task_list_id').annotate(
+                    last=Max('position')
+                ).values_list('task_list_id', 'last').order_by()
+            )
+
+            tasks = []
+            for _, values in valid:
+                list_id = self.task_lists[values['task_list']]
+                next_positions[list_id] = next_positions.get(list_id, 0) + POSITION_GAP
+                assigned_to_id = self.users.get(values['assigned_to'])
+                tasks.append(Task(
+                    task_list_id=list_id, created_by=self.user, assigned_to_id=assigned_to_id,
+                    position=next_positions[list_id],
+                    **{name: values[name] for name in _MODEL_FIELDS}
+                ))
+                if assigned_to_id:
+                    self.assignee_ids.add(assigned_to_id)
+            Task.objects.bulk_create(tasks)
+
+        self.created += len(tasks)
+        for (line, values), task in zip(valid, tasks):
+            if values['ref'] is not None:
+                self.refs[values['ref']] = task.id
+            if values['dependencies']:
+                self.pending_dependencies.append((line, task.id, values['dependencies']))
+
+    def _import_dependencies(self):
+        graph = DependencyGraph()
+        through = Task.dependencies.through
+        edges = []
+        for line, task_id, refs in self.pending_dependencies:
+            errors = []
+            for ref in refs:
+                dependency_id = self.refs.get(ref)
+                if dependency_id is None:
+                    errors.append(f"Unknown dependency ref '{ref}'")
+                elif dependency_id == task_id:
+                    errors.append('A task cannot depend on itself')
+                # Only a task that already has dependents can close a cycle
+                elif graph.dependents.get(task_id) and graph.would_create_cycle(task_id, dependency_id):
+                    errors.append(f"Dependency on '{ref}' would create a circular dependency")
+                elif dependency_id not in graph.dependencies.get(task_id, ()):
+                    graph.add_edge(task_id, dependency_id)
+                    edges.append(through(from_task_id=task_id, to_task_id=dependency_id))
+            if errors:
+                self._error(line, {'dependencies': errors})
+        for start in range(0, len(edges), self.chunk_size):
+            through.objects.bulk_create(edges[start:start + self.chunk_size])
+
+def import_tasks(project, user, rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """Import (line, row, error) tuples from csv_rows() or ndjson_rows() into a project"""
+    return TaskImporter(project, user, chunk_size).run(rows)
@@ -0,0 +1,64 @@
+import gzip
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from tasks.exporters import ACTIVITY_LOG_EXPORT_FIELDS, ndjson_lines
+from tasks.models import ActivityLog
+
+
+class Command(BaseCommand):
+    """Django command to move old activity log rows to a compressed archive"""
+
+    help = 'Archives activity log rows older than the retention period to a gzip NDJSON file and deletes them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ACTIVITY_LOG_RETENTION_DAYS,
+            help='Archive rows older than this many days (default: ACTIVITY_LOG_RETENTION_DAYS)'
+        )
+        parser.add_argument(
+            '--output-dir', default=settings.ACTIVITY_LOG_ARCHIVE_DIR,
+            help='Directory the archive file is written to (default: ACTIVITY_LOG_ARCHIVE_DIR)'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows moved per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would be archived')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        if options['days'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--days and --batch-size must be at least 1')
+
+        cutoff = timezone.now() - timezone.timedelta(days=options['days'])
+        expired = ActivityLog.objects.filter(timestamp__lt=cutoff)
+        if options['dry_run']:
+            self.stdout.write(f'{expired.count()} activity log rows older than {cutoff:%Y-%m-%d} would be archived')
+            return
+
+        os.makedirs(options['output_dir'], exist_ok=True)
+        path = os.path.join(
+            options['output_dir'], f'activity-log-{timezone.now():%Y%m%dT%H%M%S}.ndjson.gz'
+        )
+        archived = 0
+        with gzip.open(path, 'wt', encoding='utf-8') as archive:
+            while True:
+                # Oldest first through the timestamp index; each batch is
+                # written and flushed before its rows are deleted
+                batch = list(
+                    expired.order_by('timestamp', 'id').values(*ACTIVITY_LOG_EXPORT_FIELDS)[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                archive.writelines(ndjson_lines(batch))
+                archive.flush()
+                with transaction.atomic():
+                    ActivityLog.objects.filter(id__in=[row['id'] for row in batch]).delete()
+                archived += len(batch)
+                self.stdout.write(f'Archived {archived} rows...')
+
+        if not archived:
+            os.remove(path)
+            self.stdout.write('No activity log rows to archive')
+            return
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} activity log rows to {path}'))
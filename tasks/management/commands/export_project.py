@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from tasks.exporters import EXPORT_CHUNK_SIZE, export_project
+from tasks.models import Project
+
+
+class Command(BaseCommand):
+    """Django command to export a project as NDJSON records"""
+
+    help = 'Writes a project with its task lists, tasks, dependencies and comments as NDJSON (gzip for .gz paths)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('project', type=int, help='Id of the project to export')
+        parser.add_argument('--output', help='File to write; .gz files are gzip-compressed (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help='Rows fetched per query round trip')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        try:
+            project = Project.objects.get(id=options['project'])
+        except Project.DoesNotExist:
+            raise CommandError(f"Project {options['project']} does not exist")
+
+        path = options['output']
+        if not path:
+            for line in export_project(project, chunk_size=options['chunk_size']):
+                self.stdout.write(line, ending='')
+            return
+
+        compress = path.endswith('.gz')
+        chunks = export_project(project, compress=compress, chunk_size=options['chunk_size'])
+        with open(path, 'wb') as output:
+            for chunk in chunks:
+                output.write(chunk if compress else chunk.encode())
+        self.stderr.write(self.style.SUCCESS(f"Exported project '{project.name}' to {path}"))
@@ -0,0 +1,57 @@
+import gzip
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from tasks.importers import IMPORT_CHUNK_SIZE, csv_rows, import_tasks, ndjson_rows
+from tasks.models import Project
+
+
+class Command(BaseCommand):
+    """Django command to bulk import tasks into a project from a CSV or NDJSON file"""
+
+    help = 'Imports tasks from a CSV or NDJSON file (optionally gzip-compressed) into a project'
+
+    def add_arguments(self, parser):
+        parser.add_argument('project', type=int, help='Id of the project to import into')
+        parser.add_argument('path', help='File to import; .gz files are decompressed')
+        parser.add_argument(
+            '--format', choices=['csv', 'ndjson'],
+            help='Input format (default: from the file extension, NDJSON unless .csv)'
+        )
+        parser.add_argument('--user', help='Username recorded as the creator (default: the project owner)')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='Rows inserted per transaction')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        try:
+            project = Project.objects.select_related('owner').get(id=options['project'])
+        except Project.DoesNotExist:
+            raise CommandError(f"Project {options['project']} does not exist")
+        user = project.owner
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist")
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        path = options['path']
+        name = path[:-3] if path.endswith('.gz') else path
+        input_format = options['format'] or ('csv' if name.lower().endswith('.csv') else 'ndjson')
+        reader = csv_rows if input_format == 'csv' else ndjson_rows
+        opener = gzip.open if path.endswith('.gz') else open
+        newline = '' if input_format == 'csv' else None
+        try:
+            with opener(path, 'rt', encoding='utf-8-sig', newline=newline) as lines:
+                result = import_tasks(project, user, reader(lines), chunk_size=options['chunk_size'])
+        except OSError as exc:
+            raise CommandError(f'Cannot read {path}: {exc}')
+
+        for error in result['errors']:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        if result['error_count'] > len(result['errors']):
+            self.stderr.write(f"... and {result['error_count'] - len(result['errors'])} more errors")
+        summary = f"Imported {result['created']} tasks into '{project.name}' ({result['error_count']} rows with errors)"
+        if 'read_error' in result:
+            raise CommandError(f"{result['read_error']}. {summary}")
+        self.stdout.write(self.style.SUCCESS(summary))
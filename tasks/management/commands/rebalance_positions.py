@@ -0,0 +1,68 @@
+from itertools import groupby
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from tasks.models import Project, Task, TaskList
+from tasks.ordering import POSITION_GAP, lock_parent, needs_rebalance, rebalance
+from tasks.utils import bump_cache_version
+
+
+class Command(BaseCommand):
+    """Django command to respace crowded task and task list positions"""
+
+    help = 'Renumbers the tasks of a list, or the lists of a project, whose positions are closer than --min-gap'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-gap', type=int, default=POSITION_GAP // 64,
+            help=f'Rebalance siblings with consecutive positions closer than this (default: {POSITION_GAP // 64})'
+        )
+        parser.add_argument('--project', type=int, help='Only rebalance this project')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be rebalanced')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        if options['min_gap'] < 1:
+            raise CommandError('--min-gap must be at least 1')
+
+        tasks = Task.objects.all()
+        task_lists = TaskList.objects.all()
+        if options['project']:
+            tasks = tasks.filter(task_list__project_id=options['project'])
+            task_lists = task_lists.filter(project_id=options['project'])
+
+        crowded_lists = self._crowded(tasks, 'task_list_id', options['min_gap'])
+        crowded_projects = self._crowded(task_lists, 'project_id', options['min_gap'])
+        if options['dry_run']:
+            self.stdout.write(
+                f'{len(crowded_lists)} task lists and {len(crowded_projects)} projects would be rebalanced'
+            )
+            return
+
+        for task_list in TaskList.objects.filter(id__in=crowded_lists):
+            with transaction.atomic():
+                lock_parent(task_list)
+                changed = rebalance(list(
+                    task_list.tasks.select_for_update().order_by('position', 'id')
+                ))
+                Task.objects.bulk_update_changed(changed, ['position'])
+        for project in Project.objects.filter(id__in=crowded_projects):
+            with transaction.atomic():
+                lock_parent(project)
+                changed = rebalance(list(
+                    project.task_lists.select_for_update().order_by('position', 'id')
+                ))
+                TaskList.objects.bulk_update(changed, ['position'])
+            # bulk_update sends no signals
+            bump_cache_version('project', project.id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebalanced {len(crowded_lists)} task lists and {len(crowded_projects)} projects'
+        ))
+
+    def _crowded(self, queryset, parent_field, min_gap):
+        """Ids of the parents whose children have positions closer than min_gap, in one ordered scan"""
+        rows = queryset.order_by(parent_field, 'position', 'id').values_list(parent_field, 'position').iterator()
+        return [
+            parent_id for parent_id, group in groupby(rows, key=lambda row: row[0])
+            if needs_rebalance([position for _, position in group], min_gap)
+        ]
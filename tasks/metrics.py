@@ -0,0 +1,127 @@
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q
+from django.utils import timezone
+from .access import accessible_projects_subquery
+from .models import Task
+from .serializers import TaskSummarySerializer
+from .utils import cache_result
+
+OPEN_STATUSES = ['TODO', 'IN_PROGRESS', 'REVIEW']
+
+# Overdue and upcoming counts depend on the clock, so even an unchanged project
+# is recomputed after this many seconds
+METRICS_CACHE_TIMEOUT = 300
+
+def get_project_metrics(project_id):
+    """
+    Return the metrics summary of a project. It is recomputed at most once per
+    project version (bumped by the cache invalidation signals) and timeout.
+    """
+    return _compute_project_metrics(project_id)
+
+@cache_result(
+    timeout=METRICS_CACHE_TIMEOUT, prefix='project_metrics',
+    versions=lambda project_id: [('project', project_id)]
+)
+def _compute_project_metrics(project_id):
+    """Compute the metrics summary in one aggregate query plus one assignee breakdown"""
+    now = timezone.now()
+    tasks = Task.objects.filter(task_list__project_id=project_id).order_by()
+
+    aggregates = {
+        'total_tasks': Count('id'),
+        'completed_tasks': Count('id', filter=Q(status='DONE')),
+        'overdue_tasks': Count('id', filter=Q(status__in=OPEN_STATUSES, due_date__lt=now)),
+        'upcoming_tasks': Count(
+            'id', filter=Q(due_date__gte=now, due_date__lte=now + timezone.timedelta(days=7))
+        ),
+        'avg_completion_time': Avg(
+            ExpressionWrapper(F('updated_at') - F('created_at'), output_field=DurationField()),
+            filter=Q(status='DONE')
+        ),
+    }
+    for code, _ in Task.STATUS_CHOICES:
+        aggregates[f'status_{code}'] = Count('id', filter=Q(status=code))
+    for code, _ in Task.PRIORITY_CHOICES:
+        aggregates[f'priority_{code}'] = Count('id', filter=Q(priority=code))
+    totals = tasks.aggregate(**aggregates)
+
+    assigned_counts = list(tasks.values(
+        'assigned_to__username',
+        'assigned_to__id'
+    ).annotate(count=Count('assigned_to')).order_by('assigned_to__id'))
+
+    total_tasks = totals['total_tasks']
+    avg_completion = totals['avg_completion_time']
+    avg_completion_days = avg_completion.total_seconds() / (60 * 60 * 24) if avg_completion else 0
+
+    return {
+        'total_tasks': total_tasks,
+        'status_breakdown': [
+            {'status': code, 'count': totals[f'status_{code}']}
+            for code, _ in Task.STATUS_CHOICES if totals[f'status_{code}']
+        ],
+        'priority_breakdown': [
+            {'priority': code, 'count': totals[f'priority_{code}']}
+            for code, _ in Task.PRIORITY_CHOICES if totals[f'priority_{code}']
+        ],
+        'assigned_user_breakdown': assigned_counts,
+        'overdue_tasks': totals['overdue_tasks'],
+        'completion_rate': (totals['completed_tasks'] / total_tasks) * 100 if total_tasks > 0 else 0,
+        'upcoming_tasks': totals['upcoming_tasks'],
+        'avg_completion_days': round(avg_completion_days, 1),
+    }
+
+# Number of rows returned per bucket of the user task summary; the counts are always exact
+USER_SUMMARY_BUCKET_LIMIT = 10
+USER_SUMMARY_MAX_BUCKET_LIMIT = 50
+
+def get_user_task_summary(user, limit=USER_SUMMARY_BUCKET_LIMIT):
+    """
+    Summarize the tasks assigned to a user in the projects they can access.
+
+    Every count comes from a single conditional aggregate; each bucket then loads
+    at most `limit` compact task instances, so the cost does not grow with the
+    number of assigned tasks. Returns the buckets as {'count', 'tasks'} dicts.
+    """
+    now = timezone.now()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    today_end = today_start + timezone.timedelta(days=1)
+    week_end = today_start + timezone.timedelta(days=7)
+
+    assigned_tasks = Task.objects.filter(
+        assigned_to=user,
+        task_list__project_id__in=accessible_projects_subquery(user)
+    ).order_by()
+
+    buckets = {
+        'overdue_tasks': (Q(status__in=OPEN_STATUSES, due_date__lt=now), 'due_date'),
+        'due_today': (Q(due_date__gte=today_start, due_date__lt=today_end), 'due_date'),
+        'due_this_week': (Q(due_date__gte=today_end, due_date__lt=week_end), 'due_date'),
+        'recently_completed': (
+            Q(status='DONE', updated_at__gte=now - timezone.timedelta(days=7)), '-updated_at'
+        ),
+    }
+
+    aggregates = {'total_assigned': Count('id')}
+    for name, (condition, _) in buckets.items():
+        aggregates[name] = Count('id', filter=condition)
+    for code, _ in Task.STATUS_CHOICES:
+        aggregates[f'status_{code}'] = Count('id', filter=Q(status=code))
+    totals = assigned_tasks.aggregate(**aggregates)
+
+    summary = {
+        'total_assigned': totals['total_assigned'],
+        'status_breakdown': [
+            {'status': code, 'count': totals[f'status_{code}']}
+            for code, _ in Task.STATUS_CHOICES if totals[f'status_{code}']
+        ],
+    }
+    for name, (condition, ordering) in buckets.items():
+        # Skip the row query entirely for empty buckets
+        tasks = []
+        if totals[name]:
+            tasks = list(TaskSummarySerializer.setup_eager_loading(
+                assigned_tasks.filter(condition)
+            ).order_by(ordering, 'id')[:limit])
+        summary[name] = {'count': totals[name], 'tasks': tasks}
+    return summary
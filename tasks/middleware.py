@@ -1,69 +1,160 @@
+import copy
 import re
 import html
+import json
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 from django.http import HttpResponseBadRequest, QueryDict
+from .activity import activity_batch
 
 class RequestSanitizationMiddleware(MiddlewareMixin):
     """
     Middleware to sanitize request inputs to prevent XSS and other injection attacks
+
+    Form data is only copied when at least one value contains a character that
+    html.escape would change, and every value of multi-valued fields is escaped.
+    Paths starting with one of REQUEST_SANITIZATION_EXEMPT_PATHS are skipped.
     """
+    # Exactly the characters html.escape(value, quote=True) replaces
+    ESCAPE_CHARS_RE = re.compile(r"[<>&\"']")
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self.exempt_paths = tuple(getattr(settings, 'REQUEST_SANITIZATION_EXEMPT_PATHS', ()))
+
     def process_request(self, request):
         # Only process POST, PUT, and PATCH requests
         if request.method not in ('POST', 'PUT', 'PATCH'):
             return None
+        if self.exempt_paths and request.path.startswith(self.exempt_paths):
+            return None
             
         # Clean POST data
         if hasattr(request, 'POST') and request.POST:
-            # Create a mutable copy of the QueryDict
-            mutable_post = request.POST.copy()
-            self._sanitize_data(mutable_post)
+            sanitized = self._sanitize_data(request.POST)
             
-            # Replace the original POST with the sanitized version
-            # Note: We can't directly modify request.POST, but we can set request._post
-            request._post = mutable_post
+            # We can't directly modify request.POST, but we can set request._post
+            if sanitized is not request.POST:
+                request._post = sanitized
             
         return None
     
     def _sanitize_data(self, data):
-        """Sanitize the data in-place"""
-        for key in data.keys():
-            if isinstance(data[key], str):
-                # HTML escape the values to prevent XSS
-                data[key] = html.escape(data[key])
+        """
+        Return the data with every string value HTML escaped. The original
+        QueryDict is returned as is when nothing needs escaping.
+        """
+        sanitized = data
+        for key, values in data.lists():
+            if not any(isinstance(value, str) and self.ESCAPE_CHARS_RE.search(value) for value in values):
+                continue
+            if sanitized is data:
+                # Copied only once a value needs escaping (QueryDict copies every value list)
+                sanitized = copy.copy(data)
+            sanitized.setlist(key, [
+                html.escape(value) if isinstance(value, str) else value for value in values
+            ])
+        return sanitized
 
 class RequestValidationMiddleware(MiddlewareMixin):
     """
     Middleware to validate incoming requests to prevent security issues
+
+    Every value of form fields (URL-encoded or multipart, never the uploaded
+    files) and the string keys and values of JSON bodies are checked in a
+    single regex pass. Bodies larger than REQUEST_VALIDATION_MAX_BODY_SIZE are
+    not parsed or scanned, so big uploads are left to the views and never
+    parsed before authentication; Django's own DATA_UPLOAD_MAX_MEMORY_SIZE
+    limit applies to those.
     """
-    # Patterns for common malicious inputs
+    # Patterns for common malicious inputs. They are matched against lowercased
+    # text and each one starts with a literal character, so the combined
+    # alternation can skip straight to candidate positions instead of trying
+    # every pattern at every offset.
     SUSPICIOUS_PATTERNS = [
         # SQL Injection
-        r"['\"]\s*OR\s+['\"]\s*['\"]\s*=\s*['\"]",
-        r";\s*DROP\s+TABLE",
-        r";\s*DELETE\s+FROM",
+        r"'\s*or\s+['\"]\s*['\"]\s*=\s*['\"]",
+        r"\"\s*or\s+['\"]\s*['\"]\s*=\s*['\"]",
+        r";\s*drop\s+table",
+        r";\s*delete\s+from",
         # XSS
         r"<script>",
         r"javascript:",
         # Path traversal
         r"\.\.\/",
     ]
+    # All patterns compiled once into a single alternation
+    SUSPICIOUS_RE = re.compile('|'.join(SUSPICIOUS_PATTERNS))
+    # Joins values for the single pass; no pattern can match across it
+    SEPARATOR = '\x00'
+    DEFAULT_MAX_BODY_SIZE = 1024 * 1024
+    SCANNED_CONTENT_TYPES = ('application/x-www-form-urlencoded', 'multipart/form-data', 'application/json')
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self.max_body_size = getattr(
+            settings, 'REQUEST_VALIDATION_MAX_BODY_SIZE', self.DEFAULT_MAX_BODY_SIZE
+        )
     
     def process_request(self, request):
         # Only validate POST, PUT, and PATCH requests
         if request.method not in ('POST', 'PUT', 'PATCH'):
             return None
-            
-        # Check POST data
-        if hasattr(request, 'POST') and request.POST:
-            for key, value in request.POST.items():
-                if isinstance(value, str) and self._is_suspicious(value):
-                    return HttpResponseBadRequest("Invalid input detected")
-                    
+
+        content_type = request.content_type
+        if content_type not in self.SCANNED_CONTENT_TYPES:
+            return None
+        if self._content_length(request) > self.max_body_size:
+            return None
+        if content_type == 'application/json':
+            values = self._json_strings(request.body)
+        else:
+            # request.POST holds only the non-file fields; lists(), since
+            # values() only returns the last value of each key
+            values = [value for _, field_values in request.POST.lists() for value in field_values]
+
+        if self._is_suspicious(self.SEPARATOR.join(values)):
+            return HttpResponseBadRequest("Invalid input detected")
         return None
+
+    @staticmethod
+    def _content_length(request):
+        try:
+            return int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def _json_strings(body):
+        """Return every string key and value of a JSON body; malformed bodies are left to the view"""
+        try:
+            stack = [json.loads(body)]
+        except ValueError:
+            return []
+        strings = []
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                strings.append(node)
+            elif isinstance(node, dict):
+                strings.extend(key for key in node if isinstance(key, str))
+                stack.extend(node.values())
+            elif isinstance(node, list):
+                stack.extend(node)
+        return strings
     
     def _is_suspicious(self, value):
         """Check if a value matches any suspicious patterns"""
-        for pattern in self.SUSPICIOUS_PATTERNS:
-            if re.search(pattern, value, re.IGNORECASE):
-                return True
-        return False
\ No newline at end of file
+        return self.SUSPICIOUS_RE.search(value.lower()) is not None
+
+class ActivityLogMiddleware:
+    """
+    Middleware to collect the activity log entries of a request and write them
+    with a single INSERT once its transaction commits
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with activity_batch():
+            return self.get_response(request)
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.15 on 2026-10-18 19:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0003_activitylog_emailverification_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="activitylog",
+            index=models.Index(
+                fields=["task", "-timestamp"], name="tasks_activ_task_id_66b34d_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="activitylog",
+            index=models.Index(
+                fields=["project", "-timestamp"], name="tasks_activ_project_30628b_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="activitylog",
+            index=models.Index(
+                fields=["user", "-timestamp"], name="tasks_activ_user_id_cc210f_idx"
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="activitylog",
+            name="tasks_activ_task_id_ff594d_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="activitylog",
+            name="tasks_activ_project_895847_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="activitylog",
+            name="tasks_activ_user_id_b25261_idx",
+        ),
+    ]
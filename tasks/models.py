@@ -1,10 +1,12 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
 import uuid
 from datetime import timedelta
+from .utils import bump_cache_version
+from .activity import TASK_TITLE, log_activity
 
 class Project(models.Model):
     name = models.CharField(max_length=200, db_index=True)
@@ -38,6 +40,43 @@ class TaskList(models.Model):
     def __str__(self):
         return f"{self.project.name} - {self.name}"
 
+class TaskQuerySet(models.QuerySet):
+    def with_blocked_state(self):
+        """Annotate each task with the number of dependencies that are not done yet"""
+        return self.annotate(
+            unfinished_dependency_count=models.Count(
+                'dependencies',
+                filter=~models.Q(dependencies__status='DONE'),
+                distinct=True
+            )
+        )
+
+    def bulk_update_changed(self, objs, fields, batch_size=None):
+        """
+        Write the tasks among `objs` whose `fields` changed since they were
+        loaded with bulk_update(), then do what the save signals would: refresh
+        updated_at, invalidate the affected caches and reset each task's change
+        tracking. Returns the number of rows written.
+        """
+        attnames = {self.model._meta.get_field(name).attname for name in fields}
+        changed = []
+        now = timezone.now()
+        for task in objs:
+            # Tasks that were not loaded from the database are always written
+            changes = task.changed_fields & attnames if hasattr(task, '_loaded_values') else attnames
+            if changes:
+                task.updated_at = now
+                changed.append((task, changes))
+        if not changed:
+            return 0
+
+        fields = set(fields) | {'updated_at'}
+        rows = self.bulk_update([task for task, _ in changed], fields, batch_size=batch_size)
+        _tasks_bulk_updated(changed)
+        for task, _ in changed:
+            task._snapshot(attnames | {'updated_at'})
+        return rows
+
 class Task(models.Model):
     PRIORITY_CHOICES = [
         ('LOW', 'Low'),
@@ -66,6 +105,8 @@ class Task(models.Model):
     dependencies = models.ManyToManyField('self', symmetrical=False, related_name='dependent_tasks', blank=True)
     estimated_hours = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     actual_hours = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+
+    objects = TaskQuerySet.as_manager()
     
     class Meta:
         ordering = ['position']
@@ -79,15 +120,55 @@ class Task(models.Model):
     def __str__(self):
         return self.title
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        # Store original state to detect changes
-        if self.pk:
-            self._previous_assignee = self.assigned_to
-            self._previous_status = self.status
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Snapshot the loaded columns (raw FK ids, so no related rows are
+        # fetched) to detect changes on save without re-reading the row
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # post_save receivers have seen the old values; the saved state is the new baseline
+        update_fields = kwargs.get('update_fields')
+        self._snapshot(update_fields and [self._meta.get_field(name).attname for name in update_fields])
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._snapshot(kwargs.get('fields') and [self._meta.get_field(name).attname for name in kwargs['fields']])
+
+    def _snapshot(self, attnames=None):
+        loaded = getattr(self, '_loaded_values', {})
+        for field in self._meta.concrete_fields:
+            if (attnames is None or field.attname in attnames) and field.attname in self.__dict__:
+                loaded[field.attname] = self.__dict__[field.attname]
+        self._loaded_values = loaded
+
+    def get_loaded_value(self, attname, default=None):
+        """Return the value a field had when the task was loaded or last saved"""
+        return getattr(self, '_loaded_values', {}).get(attname, default)
+
+    @property
+    def changed_fields(self):
+        """Attribute names (e.g. 'assigned_to_id') of loaded fields modified since load or the last save"""
+        loaded = getattr(self, '_loaded_values', {})
+        return {
+            attname for attname, value in loaded.items()
+            if attname in self.__dict__ and self.__dict__[attname] != value
+        }
     
+    def _get_prefetched_dependencies(self):
+        """Return dependencies loaded by prefetch_related, or None if not prefetched"""
+        return getattr(self, '_prefetched_objects_cache', {}).get('dependencies')
+
     def is_blocked(self):
         """Check if this task is blocked by unfinished dependencies"""
+        if hasattr(self, 'unfinished_dependency_count'):
+            return self.unfinished_dependency_count > 0
+        prefetched = self._get_prefetched_dependencies()
+        if prefetched is not None:
+            return any(dep.status != 'DONE' for dep in prefetched)
         return self.dependencies.exclude(status='DONE').exists()
     
     def can_start(self):
@@ -96,6 +177,11 @@ class Task(models.Model):
     
     def get_blocking_tasks(self):
         """Get list of dependencies that are not completed yet"""
+        if getattr(self, 'unfinished_dependency_count', None) == 0:
+            return []
+        prefetched = self._get_prefetched_dependencies()
+        if prefetched is not None:
+            return [dep for dep in prefetched if dep.status != 'DONE']
         return self.dependencies.exclude(status='DONE')
 
 class Comment(models.Model):
@@ -153,55 +239,238 @@ class ActivityLog(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+        # "Latest activity of X" reads these in order, without a sort; the
+        # timestamp index serves the global feed and retention range scans
         indexes = [
-            models.Index(fields=['task']),
-            models.Index(fields=['project']),
-            models.Index(fields=['user']),
+            models.Index(fields=['task', '-timestamp']),
+            models.Index(fields=['project', '-timestamp']),
+            models.Index(fields=['user', '-timestamp']),
             models.Index(fields=['timestamp']),
         ]
     
     def __str__(self):
         return f"{self.user.username} {self.get_action_display()} {self.task or self.project} at {self.timestamp}"
 
-@receiver(pre_save, sender=Task)
-def task_pre_save(sender, instance, **kwargs):
-    """Store the previous state of important task fields before saving"""
-    if instance.pk:
-        try:
-            old_instance = Task.objects.get(pk=instance.pk)
-            instance._previous_assignee = old_instance.assigned_to
-            instance._previous_status = old_instance.status
-            
-            # Store all previous values for activity logging
-            instance._previous_values = {
-                'title': old_instance.title,
-                'description': old_instance.description,
-                'priority': old_instance.priority,
-                'status': old_instance.status,
-                'due_date': old_instance.due_date,
-                'assigned_to': old_instance.assigned_to,
-                'task_list': old_instance.task_list,
-                'estimated_hours': old_instance.estimated_hours,
-                'actual_hours': old_instance.actual_hours,
-            }
-        except Task.DoesNotExist:
-            pass
-
 @receiver(post_save, sender=Task)
 def task_post_save(sender, instance, created, **kwargs):
     """Log task creation and updates"""
     # We need request.user, which is not available in signals
     # Actual logging will be done in the views
 
+# Cache invalidation
+#
+# Cached entries are keyed by per-project, per-task and per-user version counters
+# (see utils.get_cache_version). The receivers below bump those counters whenever
+# the underlying rows change, so keys can live long and still go stale in O(1).
+
+def _get_task_project_id(task):
+    """Return the project id of a task without loading the task list if it is cached"""
+    if Task.task_list.is_cached(task):
+        return task.task_list.project_id
+    return TaskList.objects.filter(pk=task.task_list_id).values_list('project_id', flat=True).first()
+
+def _get_task_project_ids(task_ids):
+    """Return the project ids of the given tasks in one query"""
+    return set(Task.objects.filter(
+        id__in=task_ids
+    ).values_list('task_list__project_id', flat=True).distinct())
+
+def _bump_projects(project_ids, dependency_graph=False):
+    for project_id in project_ids:
+        if project_id is None:
+            continue
+        bump_cache_version('project', project_id)
+        if dependency_graph:
+            bump_cache_version('dependency_graph', project_id)
+
+def _bump_many(scope, object_ids):
+    for object_id in object_ids:
+        if object_id is not None:
+            bump_cache_version(scope, object_id)
+
+# Task fields that dependency graph summaries cache for external dependencies
+DEPENDENCY_SUMMARY_FIELDS = {'status', 'estimated_hours'}
+
+def _bump_dependents(dependents, status_changed=True):
+    """
+    Invalidate what depends on a task through (id, project id) pairs of its
+    dependents: their blocked state, shown by the tasks and their projects'
+    boards, and the dependency graph of their projects, which may list the
+    task as an external dependency
+    """
+    project_ids = {project_id for _, project_id in dependents}
+    if status_changed:
+        _bump_many('task', {task_id for task_id, _ in dependents})
+        _bump_projects(project_ids, dependency_graph=True)
+    else:
+        _bump_many('dependency_graph', project_ids)
+
+def _tasks_bulk_updated(changed):
+    """Invalidate the caches of tasks written by TaskQuerySet.bulk_update_changed, which sends no signals"""
+    task_list_ids, user_ids, summary_changed, status_changed = set(), set(), [], False
+    for task, changes in changed:
+        bump_cache_version('task', task.pk)
+        task_list_ids.update((task.task_list_id, task.get_loaded_value('task_list_id')))
+        user_ids.update((task.assigned_to_id, task.get_loaded_value('assigned_to_id')))
+        if changes & DEPENDENCY_SUMMARY_FIELDS:
+            summary_changed.append(task.pk)
+            status_changed = status_changed or 'status' in changes
+
+    _bump_projects(
+        set(TaskList.objects.filter(id__in=task_list_ids - {None}).values_list('project_id', flat=True).order_by()),
+        dependency_graph=True
+    )
+    _bump_many('user', user_ids)
+    if summary_changed:
+        _bump_dependents(
+            set(Task.objects.filter(
+                dependencies__in=summary_changed
+            ).values_list('id', 'task_list__project_id').order_by()),
+            status_changed
+        )
+
+@receiver(pre_delete, sender=Project)
+@receiver(pre_delete, sender=TaskList)
+def task_container_pre_delete(sender, instance, origin=None, **kwargs):
+    """
+    Collect, in a constant number of queries, what the tasks deleted with a
+    project or task list invalidate. The receivers of the cascaded rows return
+    early, so deleting a big project does not run queries per task or comment.
+    """
+    if isinstance(origin, Project) and sender is TaskList:
+        return
+    if sender is Project:
+        tasks = Task.objects.filter(task_list__project=instance)
+        user_ids = set(instance.members.values_list('id', flat=True))
+    else:
+        tasks = Task.objects.filter(task_list=instance)
+        user_ids = set()
+    user_ids.update(tasks.exclude(assigned_to=None).values_list('assigned_to_id', flat=True).order_by())
+    instance._removed_user_ids = user_ids
+    # Dependents in other projects (or lists) outlive the deleted tasks
+    instance._removed_dependents = set(Task.objects.filter(
+        dependencies__in=tasks.values('id')
+    ).exclude(id__in=tasks.values('id')).values_list('id', 'task_list__project_id').order_by())
+
+def _bump_removed_tasks(instance, project_id):
+    """Invalidate what the tasks deleted with a project or task list were part of"""
+    if not hasattr(instance, '_removed_dependents'):
+        return
+    bump_cache_version('dependency_graph', project_id)
+    _bump_many('user', instance._removed_user_ids)
+    _bump_dependents(instance._removed_dependents)
+
+def _is_cascaded(origin, *models):
+    """Whether a row is deleted by the cascade of an instance of one of models"""
+    return isinstance(origin, models)
+
+@receiver(pre_delete, sender=Task)
+def task_pre_delete(sender, instance, origin=None, **kwargs):
+    """Remember the dependents of a task, whose dependency rows are about to be deleted"""
+    if _is_cascaded(origin, Project, TaskList):
+        return
+    instance._dependents = list(instance.dependent_tasks.values_list('id', 'task_list__project_id').order_by())
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def task_changed(sender, instance, origin=None, **kwargs):
+    """Invalidate the caches of the task, its project(s) and its assignees"""
+    if _is_cascaded(origin, Project, TaskList):
+        # Invalidated in bulk by task_container_pre_delete
+        return
+    project_ids = {_get_task_project_id(instance)}
+    previous_task_list_id = instance.get_loaded_value('task_list_id')
+    if previous_task_list_id and previous_task_list_id != instance.task_list_id:
+        project_ids.add(
+            TaskList.objects.filter(pk=previous_task_list_id).values_list('project_id', flat=True).first()
+        )
+    _bump_projects(project_ids, dependency_graph=True)
+
+    bump_cache_version('task', instance.pk)
+    _bump_many('user', {instance.assigned_to_id, instance.get_loaded_value('assigned_to_id')})
+
+    # Dependents render this task's status as their blocked state, and their
+    # projects' dependency graphs may show it as an external dependency
+    if hasattr(instance, '_dependents'):
+        _bump_dependents(instance._dependents)
+    elif instance.changed_fields & DEPENDENCY_SUMMARY_FIELDS:
+        _bump_dependents(
+            list(instance.dependent_tasks.values_list('id', 'task_list__project_id').order_by()),
+            'status' in instance.changed_fields
+        )
+
+@receiver(post_save, sender=TaskList)
+@receiver(post_delete, sender=TaskList)
+def task_list_changed(sender, instance, origin=None, **kwargs):
+    """Invalidate the caches of the task list's project"""
+    if _is_cascaded(origin, Project):
+        return
+    _bump_projects([instance.project_id])
+    _bump_removed_tasks(instance, instance.project_id)
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def project_changed(sender, instance, **kwargs):
+    """Invalidate the caches of the project and the project access of its owner"""
+    _bump_projects([instance.pk])
+    bump_cache_version('user', instance.owner_id)
+    _bump_removed_tasks(instance, instance.pk)
+
+@receiver(m2m_changed, sender=Project.members.through)
+def project_members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Invalidate the caches of the projects and users whose membership changed"""
+    if action == 'pre_clear':
+        related = instance.project_members if reverse else instance.members
+        instance._cleared_member_ids = set(related.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    related_ids = pk_set or getattr(instance, '_cleared_member_ids', set())
+    if reverse:
+        project_ids, user_ids = related_ids, [instance.pk]
+    else:
+        project_ids, user_ids = [instance.pk], related_ids
+    _bump_projects(project_ids)
+    _bump_many('user', user_ids)
+
+@receiver(m2m_changed, sender=Task.dependencies.through)
+def task_dependencies_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Invalidate the caches of both ends of a dependency edge and their projects"""
+    if action == 'pre_clear':
+        related = instance.dependent_tasks if reverse else instance.dependencies
+        instance._cleared_dependency_ids = set(related.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    task_ids = {instance.pk} | set(pk_set or getattr(instance, '_cleared_dependency_ids', ()))
+    _bump_many('task', task_ids)
+    _bump_projects(_get_task_project_ids(task_ids), dependency_graph=True)
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=TaskAttachment)
+@receiver(post_delete, sender=TaskAttachment)
+def task_content_changed(sender, instance, origin=None, **kwargs):
+    """Invalidate the caches of the task a comment or attachment belongs to"""
+    if _is_cascaded(origin, Project, TaskList, Task):
+        # The receivers of the deleted task, list or project invalidate it
+        return
+    bump_cache_version('task', instance.task_id)
+    if sender.task.is_cached(instance):
+        project_ids = [_get_task_project_id(instance.task)]
+    else:
+        project_ids = _get_task_project_ids([instance.task_id])
+    _bump_projects(project_ids)
+
 @receiver(post_save, sender=Comment)
 def comment_post_save(sender, instance, created, **kwargs):
     """Log comment creation"""
     if created:
-        ActivityLog.objects.create(
-            user=instance.author,
-            task=instance.task,
-            action='COMMENT',
-            description=f"Added comment on task '{instance.task.title}'",
+        log_activity(
+            instance.author_id, 'COMMENT', task_id=instance.task_id,
+            template=f"Added comment on task '{TASK_TITLE}'",
             new_value=instance.content[:100] + ('...' if len(instance.content) > 100 else '')
         )
 
@@ -209,11 +478,9 @@ def comment_post_save(sender, instance, created, **kwargs):
 def attachment_post_save(sender, instance, created, **kwargs):
     """Log attachment creation"""
     if created:
-        ActivityLog.objects.create(
-            user=instance.uploaded_by,
-            task=instance.task,
-            action='ATTACHMENT',
-            description=f"Added attachment to task '{instance.task.title}'",
+        log_activity(
+            instance.uploaded_by_id, 'ATTACHMENT', task_id=instance.task_id,
+            template=f"Added attachment to task '{TASK_TITLE}'",
             new_value=instance.file_name
         )
 
@@ -0,0 +1,88 @@
+"""
+Gap-based ordering for Task.position and TaskList.position.
+
+Siblings (the tasks of a task list, the task lists of a project) are spaced
+POSITION_GAP apart, so an item is inserted or moved by giving it a position
+inside a gap: one row written, whatever the size of the list. When a gap is
+used up the siblings are renumbered (`rebalance`), which the
+`rebalance_positions` command also does ahead of time for crowded lists.
+"""
+from bisect import bisect_left
+from django.db.models import Max
+
+POSITION_GAP = 1024
+
+def lock_parent(parent):
+    """Lock the row that owns a set of siblings, serializing concurrent appends. Call inside a transaction."""
+    list(type(parent).objects.select_for_update().filter(pk=parent.pk).values_list('pk', flat=True))
+
+def append_position(parent, siblings):
+    """Return the position after the last of `siblings`, with `parent` locked for the rest of the transaction"""
+    lock_parent(parent)
+    last = siblings.aggregate(last=Max('position'))['last']
+    return POSITION_GAP if last is None else last + POSITION_GAP
+
+def _kept_indexes(positions):
+    """Indexes of a longest strictly increasing subsequence of positions (None never kept)"""
+    tails, tail_indexes, previous = [], [], {}
+    for index, position in enumerate(positions):
+        if position is None:
+            continue
+        slot = bisect_left(tails, position)
+        if slot == len(tails):
+            tails.append(position)
+            tail_indexes.append(index)
+        else:
+            tails[slot] = position
+            tail_indexes[slot] = index
+        previous[index] = tail_indexes[slot - 1] if slot else None
+    kept = set()
+    index = tail_indexes[-1] if tail_indexes else None
+    while index is not None:
+        kept.add(index)
+        index = previous[index]
+    return kept
+
+def apply_order(items):
+    """
+    Set `position` on `items`, given in their new order, so that they sort in
+    that order. Items already in relative order keep their position and the
+    others are placed in the gaps between them; only when a gap is too small
+    is the whole sequence renumbered. Returns the items whose position changed.
+    """
+    items = list(items)
+    kept = _kept_indexes([item.position for item in items])
+    previous = [item.position for item in items]
+
+    lower, index = 0, 0
+    while index < len(items):
+        if index in kept:
+            lower = items[index].position
+            index += 1
+            continue
+        end = index
+        while end < len(items) and end not in kept:
+            end += 1
+        count = end - index
+        upper = items[end].position if end < len(items) else lower + POSITION_GAP * (count + 1)
+        if upper - lower <= count:
+            rebalance(items)
+            break
+        step = (upper - lower) / (count + 1)
+        for offset in range(count):
+            items[index + offset].position = lower + int(step * (offset + 1))
+        index = end
+    return [item for item, position in zip(items, previous) if item.position != position]
+
+def rebalance(items):
+    """Renumber `items`, given in order, POSITION_GAP apart. Returns the items whose position changed."""
+    changed = []
+    for index, item in enumerate(items, start=1):
+        if item.position != index * POSITION_GAP:
+            item.position = index * POSITION_GAP
+            changed.append(item)
+    return changed
+
+def needs_rebalance(positions, min_gap):
+    """Whether any two consecutive positions (in order) are closer than min_gap"""
+    return any(later - earlier < min_gap for earlier, later in zip(positions, positions[1:]))
@@ -0,0 +1,202 @@
+import base64
+import binascii
+import datetime
+import decimal
+import json
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over the full ordering of a queryset.
+
+    Unlike DRF's CursorPagination, which positions cursors on the first ordering
+    field only, the cursor holds the values of every ordering field plus the
+    primary key, so pages are fetched with an index-friendly
+    WHERE (a, b, id) > (...) condition and no OFFSET, whatever their depth.
+    The ordering is whatever the view applied (OrderingFilter, `ordering` or
+    the model's Meta.ordering); it must consist of local fields. NULLs sort last.
+
+    Query parameters:
+        cursor      opaque position returned in `next` / `previous`
+        page_size   rows per page, capped at max_page_size
+        count       set to true to include the total count (one extra COUNT query)
+    """
+    page_size = api_settings.PAGE_SIZE or 10
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.count = queryset.count() if self.wants_count(request) else None
+
+        self.model = queryset.model
+        self.ordering = self.get_ordering(queryset)
+        values, reverse = self.decode_cursor(request)
+        queryset = queryset.order_by(*self.order_by(reverse))
+        if values is not None:
+            queryset = queryset.filter(self.keyset_filter(values, reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = values is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        response = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            response = {'count': self.count, **response}
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def wants_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def get_ordering(self, queryset):
+        """
+        Return the ordering as (field, descending, nullable) tuples, ending with
+        the primary key so that every row has a unique position.
+        """
+        model = queryset.model
+        ordering = list(queryset.query.order_by or model._meta.ordering)
+        fields, pk_name = [], model._meta.pk.attname
+        for item in ordering:
+            if not isinstance(item, str) or '__' in item or item == '?':
+                raise ImproperlyConfigured(
+                    f'{type(self).__name__} only supports orderings by local fields, got {item!r}'
+                )
+            name = item.lstrip('-')
+            if name == 'pk':
+                name = pk_name
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(f'Cannot paginate {model.__name__} by unknown field {name!r}')
+            fields.append((field.attname, item.startswith('-'), field.null))
+            if field.primary_key:
+                break
+        if not fields or not model._meta.get_field(fields[-1][0]).primary_key:
+            descending = fields[-1][1] if fields else False
+            fields.append((pk_name, descending, False))
+        return fields
+
+    def order_by(self, reverse=False):
+        expressions = []
+        for name, descending, nullable in self.ordering:
+            nulls = {}
+            if nullable:
+                nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+            if descending != reverse:
+                expressions.append(F(name).desc(**nulls))
+            else:
+                expressions.append(F(name).asc(**nulls))
+        return expressions
+
+    def keyset_filter(self, values, reverse=False):
+        """
+        Build (a after va) | (a = va & b after vb) | ... for the cursor values,
+        where "after" follows the direction of each field and NULLs sort last.
+        """
+        condition, equal_so_far = Q(pk__in=[]), Q()
+        for (name, descending, nullable), value in zip(self.ordering, values):
+            condition |= equal_so_far & self._after(name, descending != reverse, nullable, value, reverse)
+            equal_so_far &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+        return condition
+
+    @staticmethod
+    def _after(name, descending, nullable, value, reverse):
+        """Rows strictly after `value` on one field, in the direction being fetched"""
+        if value is None:
+            # NULLs sort last: nothing comes after them going forward,
+            # everything non-null comes after them going backward
+            return Q(**{f'{name}__isnull': False}) if reverse else Q(pk__in=[])
+        after = Q(**{f'{name}__lt' if descending else f'{name}__gt': value})
+        if nullable and not reverse:
+            after |= Q(**{f'{name}__isnull': True})
+        return after
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            values, reverse = cursor['p'], bool(cursor.get('r'))
+            if len(values) != len(self.ordering):
+                raise ValueError
+            values = [
+                None if value is None else self.model._meta.get_field(name).to_python(value)
+                for (name, _, _), value in zip(self.ordering, values)
+            ]
+        except (TypeError, KeyError, ValueError, ValidationError, UnicodeEncodeError, binascii.Error):
+            raise NotFound('Invalid cursor')
+        return values, reverse
+
+    def encode_cursor(self, row, reverse=False):
+        values = [self._encode_value(getattr(row, name)) for name, _, _ in self.ordering]
+        payload = json.dumps({'p': values, 'r': int(reverse)}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    @staticmethod
+    def _encode_value(value):
+        # Keep full precision: microseconds matter for equality on timestamps
+        if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, decimal.Decimal):
+            return str(value)
+        return value
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_results(self, data):
+        return data['results']
@@ -1,4 +1,5 @@
 from rest_framework import permissions
+from .access import get_object_project_id, get_project_access
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
     """
@@ -11,58 +12,67 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
             return True
 
         # Write permissions are only allowed to the owner of the object.
-        return obj.owner == request.user
+        return obj.owner_id == request.user.id
 
-class IsProjectOwnerOrMember(permissions.BasePermission):
+class ProjectMemberPermission(permissions.BasePermission):
+    """
+    Base class for permissions based on the project an object belongs to.
+    Access is checked against the user's project access map, so no members
+    are loaded.
+    """
+    def is_project_member(self, request, obj):
+        return get_project_access(request).can_access(get_object_project_id(obj))
+
+    def is_project_owner(self, request, obj):
+        return get_project_access(request).is_owner(get_object_project_id(obj))
+
+class IsProjectOwnerOrMember(ProjectMemberPermission):
     """
     Custom permission to only allow owners or members of a project to access its details.
     """
     def has_object_permission(self, request, view, obj):
         # Check if user is owner or member of the project
-        return obj.owner == request.user or request.user in obj.members.all()
+        return self.is_project_member(request, obj)
 
-class IsTaskListProjectOwnerOrMember(permissions.BasePermission):
+class IsTaskListProjectOwnerOrMember(ProjectMemberPermission):
     """
     Custom permission to only allow owners or members of a project to access its task lists.
     """
     def has_object_permission(self, request, view, obj):
         # Check if user is owner or member of the project that the task list belongs to
-        return obj.project.owner == request.user or request.user in obj.project.members.all()
+        return self.is_project_member(request, obj)
 
-class IsTaskProjectOwnerOrMember(permissions.BasePermission):
+class IsTaskProjectOwnerOrMember(ProjectMemberPermission):
     """
     Custom permission to only allow owners or members of a project to access its tasks.
     """
     def has_object_permission(self, request, view, obj):
         # Check if user is owner or member of the project that the task belongs to
-        project = obj.task_list.project
-        return project.owner == request.user or request.user in project.members.all()
+        return self.is_project_member(request, obj)
 
-class IsCommentAuthorOrProjectMember(permissions.BasePermission):
+class IsCommentAuthorOrProjectMember(ProjectMemberPermission):
     """
     Custom permission to only allow comment authors to edit their comments,
     and project owners/members to view all comments.
     """
     def has_object_permission(self, request, view, obj):
         # Read permissions are allowed to project owners and members
-        project = obj.task.task_list.project
         if request.method in permissions.SAFE_METHODS:
-            return project.owner == request.user or request.user in project.members.all()
+            return self.is_project_member(request, obj)
 
         # Write permissions are only allowed to the author of the comment
-        return obj.author == request.user
+        return obj.author_id == request.user.id
 
-class IsAttachmentUploaderOrProjectMember(permissions.BasePermission):
+class IsAttachmentUploaderOrProjectMember(ProjectMemberPermission):
     """
     Custom permission to only allow attachment uploaders to delete their attachments,
     and project owners/members to view all attachments.
     """
     def has_object_permission(self, request, view, obj):
         # Read permissions are allowed to project owners and members
-        project = obj.task.task_list.project
         if request.method in permissions.SAFE_METHODS:
-            return project.owner == request.user or request.user in project.members.all()
+            return self.is_project_member(request, obj)
 
         # Write permissions are only allowed to the uploader of the attachment
         # or the project owner
-        return obj.uploaded_by == request.user or project.owner == request.user
\ No newline at end of file
+        return obj.uploaded_by_id == request.user.id or self.is_project_owner(request, obj)
@@ -1,14 +1,88 @@
 # serializers.py
-from rest_framework import serializers
+from rest_framework import permissions, serializers
 from django.contrib.auth.models import User
-from .models import Project, TaskList, Task, Comment, TaskAttachment
+from django.db import transaction
+from django.db.models import Count, Prefetch
+from .models import Project, TaskList, Task, Comment, TaskAttachment, ActivityLog
+from .graph import DependencyGraph
+from .ordering import append_position
 
-class UserSerializer(serializers.ModelSerializer):
+def _split_names(names):
+    """Split dotted field names into the top-level names and the remainders for each nested field"""
+    top, nested = set(), {}
+    for name in names:
+        head, _, rest = name.partition('.')
+        top.add(head)
+        if rest:
+            nested.setdefault(head, []).append(rest)
+    return top, nested
+
+def _query_names(request, param):
+    """Comma-separated names from a query parameter of a read request, or None"""
+    if request is None or request.method not in permissions.SAFE_METHODS:
+        return None
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+class SparseFieldsetMixin:
+    """
+    Sparse fieldsets for model serializers.
+
+    `?fields=id,name,task_lists.name` keeps only the named fields and
+    `?expand=task_lists` adds the fields listed in Meta.expandable_fields,
+    which are left out by default. Dotted names reach into nested serializers.
+    The outermost serializer reads both parameters from a read request and
+    hands nested serializers their part; they can also be passed as the
+    `fields` and `expand` keyword arguments.
+    """
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sparse = None if fields is None and expand is None else (fields, expand)
+
+    def _sparse_names(self):
+        if self._sparse is not None:
+            return self._sparse
+        request = self.context.get('request')
+        return _query_names(request, 'fields'), _query_names(request, 'expand')
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested, expand = self._sparse_names()
+        expand_top, expand_nested = _split_names(expand or [])
+        if requested is None:
+            nested_fields = {}
+            for name in getattr(self.Meta, 'expandable_fields', ()):
+                if name not in expand_top:
+                    fields.pop(name, None)
+        else:
+            top, nested_fields = _split_names(requested)
+            fields = {name: field for name, field in fields.items() if name in top or name in expand_top}
+
+        for name, field in fields.items():
+            child = getattr(field, 'child', field)
+            if isinstance(child, SparseFieldsetMixin):
+                child._sparse = (nested_fields.get(name), expand_nested.get(name, []))
+        return fields
+
+def _wants(fields, *names):
+    """Whether any of names will be rendered, given a serializer's bound fields (None for all)"""
+    return fields is None or any(name in fields for name in names)
+
+def _nested_fields(fields, name):
+    """The bound fields of a nested serializer field, or None for all"""
+    if fields is None:
+        return None
+    field = fields[name]
+    return getattr(field, 'child', field).fields
+
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name']
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     
     class Meta:
@@ -20,7 +94,7 @@ class CommentSerializer(serializers.ModelSerializer):
         validated_data['author'] = self.context['request'].user
         return super().create(validated_data)
 
-class TaskAttachmentSerializer(serializers.ModelSerializer):
+class TaskAttachmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     uploaded_by = UserSerializer(read_only=True)
     
     class Meta:
@@ -32,7 +106,7 @@ class TaskAttachmentSerializer(serializers.ModelSerializer):
         validated_data['uploaded_by'] = self.context['request'].user
         return super().create(validated_data)
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     comments = CommentSerializer(many=True, read_only=True)
     attachments = TaskAttachmentSerializer(many=True, read_only=True)
     assigned_to = UserSerializer(read_only=True)
@@ -57,6 +131,26 @@ class TaskSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_by']
 
+    @staticmethod
+    def setup_eager_loading(queryset, fields=None):
+        """
+        Load every relation rendered by this serializer in a fixed number of
+        queries. Given a serializer's bound `fields`, only the relations those
+        fields render are loaded.
+        """
+        # The project is always needed for the permission checks
+        related = ['task_list__project'] + [
+            name for name in ('assigned_to', 'created_by') if _wants(fields, name)
+        ]
+        prefetches = []
+        if _wants(fields, 'comments'):
+            prefetches.append(Prefetch('comments', queryset=Comment.objects.select_related('author')))
+        if _wants(fields, 'attachments'):
+            prefetches.append(Prefetch('attachments', queryset=TaskAttachment.objects.select_related('uploaded_by')))
+        if _wants(fields, 'dependencies', 'dependency_ids', 'is_blocked', 'blocking_tasks'):
+            prefetches.append('dependencies')
+        return queryset.select_related(*related).prefetch_related(*prefetches)
+
     def get_blocking_tasks(self, obj):
         """Return simplified representation of blocking tasks"""
         blocking = obj.get_blocking_tasks()
@@ -70,18 +164,30 @@ class TaskSerializer(serializers.ModelSerializer):
             for dep in attrs['dependencies']:
                 if dep.id == task_id:
                     raise serializers.ValidationError("A task cannot depend on itself")
-                    
-                # Check if this would create a circular dependency
-                if task_id and dep.dependencies.filter(id=task_id).exists():
-                    raise serializers.ValidationError(
-                        f"Adding dependency on task {dep.id} would create a circular dependency"
-                    )
+
+            # A new task has no dependents yet, so it cannot close a cycle
+            if task_id and attrs['dependencies']:
+                # Load the whole graph once and check every chain in memory
+                graph = DependencyGraph.for_tasks(
+                    [task_id] + [dep.id for dep in attrs['dependencies']]
+                )
+                for dep in attrs['dependencies']:
+                    cycle = graph.cycle_for_edge(task_id, dep.id)
+                    if cycle:
+                        raise serializers.ValidationError(
+                            f"Adding dependency on task {dep.id} would create a circular dependency "
+                            f"({' -> '.join(str(node) for node in cycle)})"
+                        )
                     
         return attrs
 
+    @transaction.atomic
     def create(self, validated_data):
         validated_data['created_by'] = self.context['request'].user
         dependencies = validated_data.pop('dependencies', [])
+        if 'position' not in validated_data:
+            task_list = validated_data['task_list']
+            validated_data['position'] = append_position(task_list, task_list.tasks.all())
         task = super().create(validated_data)
         task.dependencies.set(dependencies)
         return task
@@ -93,14 +199,63 @@ class TaskSerializer(serializers.ModelSerializer):
             task.dependencies.set(dependencies)
         return task
 
-class TaskListSerializer(serializers.ModelSerializer):
+class TaskSummarySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Compact read-only task row for dashboards, without nested relations"""
+    project = serializers.IntegerField(source='task_list.project_id', read_only=True)
+    project_name = serializers.CharField(source='task_list.project.name', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    priority_display = serializers.CharField(source='get_priority_display', read_only=True)
+
+    class Meta:
+        model = Task
+        fields = [
+            'id', 'title', 'status', 'status_display', 'priority', 'priority_display',
+            'due_date', 'updated_at', 'task_list', 'project', 'project_name'
+        ]
+        read_only_fields = fields
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load only the columns the summary row needs, with the project in the same query"""
+        return queryset.select_related('task_list__project').only(
+            'id', 'title', 'status', 'priority', 'due_date', 'updated_at', 'assigned_to',
+            'task_list__id', 'task_list__project__id', 'task_list__project__name'
+        )
+
+class TaskReorderSerializer(serializers.Serializer):
+    """The complete new order of a task list, as task ids"""
+    task_list = serializers.PrimaryKeyRelatedField(queryset=TaskList.objects.all())
+    tasks = serializers.ListField(child=serializers.IntegerField(), allow_empty=True)
+
+    def validate_tasks(self, value):
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError("Task ids must be unique")
+        return value
+
+class TaskListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     tasks = TaskSerializer(many=True, read_only=True)
 
     class Meta:
         model = TaskList
         fields = ['id', 'name', 'project', 'created_at', 'position', 'tasks']
 
-class ProjectSerializer(serializers.ModelSerializer):
+    @staticmethod
+    def setup_eager_loading(queryset, fields=None):
+        """Prefetch the tasks, and what they render, only when the tasks are rendered"""
+        if not _wants(fields, 'tasks'):
+            return queryset
+        return queryset.prefetch_related(Prefetch(
+            'tasks', queryset=TaskSerializer.setup_eager_loading(Task.objects.all(), _nested_fields(fields, 'tasks'))
+        ))
+
+    @transaction.atomic
+    def create(self, validated_data):
+        if 'position' not in validated_data:
+            project = validated_data['project']
+            validated_data['position'] = append_position(project, project.task_lists.all())
+        return super().create(validated_data)
+
+class ProjectSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     task_lists = TaskListSerializer(many=True, read_only=True)
     owner = UserSerializer(read_only=True)
     members = UserSerializer(many=True, read_only=True)
@@ -113,3 +268,47 @@ class ProjectSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data['owner'] = self.context['request'].user
         return super().create(validated_data)
+
+    @staticmethod
+    def setup_eager_loading(queryset, fields=None):
+        """Load the owner, members, counts and task lists only when they are rendered"""
+        if _wants(fields, 'owner'):
+            queryset = queryset.select_related('owner')
+        if _wants(fields, 'members'):
+            queryset = queryset.prefetch_related('members')
+        if _wants(fields, 'task_lists'):
+            queryset = queryset.prefetch_related(Prefetch(
+                'task_lists',
+                queryset=TaskListSerializer.setup_eager_loading(
+                    TaskList.objects.all(), _nested_fields(fields, 'task_lists')
+                )
+            ))
+        if fields is not None and 'member_count' in fields:
+            queryset = queryset.annotate(member_count=Count('members', distinct=True))
+        if fields is not None and 'task_list_count' in fields:
+            queryset = queryset.annotate(task_list_count=Count('task_lists', distinct=True))
+        return queryset
+
+class ProjectListSerializer(ProjectSerializer):
+    """Shallow project row for lists; members and task lists are added with ?expand="""
+    member_count = serializers.IntegerField(read_only=True)
+    task_list_count = serializers.IntegerField(read_only=True)
+
+    class Meta(ProjectSerializer.Meta):
+        fields = [
+            'id', 'name', 'description', 'created_at', 'owner', 'member_count',
+            'task_list_count', 'members', 'task_lists'
+        ]
+        expandable_fields = ['members', 'task_lists']
+
+class ActivityLogSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+    action_display = serializers.CharField(source='get_action_display', read_only=True)
+
+    class Meta:
+        model = ActivityLog
+        fields = [
+            'id', 'timestamp', 'action', 'action_display', 'user', 'username',
+            'project', 'task', 'description', 'old_value', 'new_value'
+        ]
+        read_only_fields = fields
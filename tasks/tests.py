@@ -1,10 +1,33 @@
-from django.test import TestCase
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection, connections, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework.test import APIClient
 from rest_framework import status
+import gzip
+import io
 import json
-from .models import Project, TaskList, Task, Comment, TaskAttachment
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from urllib.parse import urlencode
+from .models import Project, TaskList, Task, Comment, TaskAttachment, ActivityLog
+from .activity import activity_batch, write_entries
+from .access import scope_to_projects
+from .ordering import POSITION_GAP, apply_order
+from .graph import DependencyGraph
+from .middleware import RequestSanitizationMiddleware, RequestValidationMiddleware
+from .views import PROJECTS_PER_PAGE
+from .utils import (
+    bump_cache_version, cache_result, dependency_graph_cache_key, get_cache_version, invalidate_cache,
+    project_cache_key, task_cache_key, user_tasks_cache_key
+)
 
 class ProjectModelTest(TestCase):
     def setUp(self):
@@ -193,3 +216,1686 @@ class ProjectAPITest(TestCase):
         response = self.client.delete(f'/api/projects/{project.id}/')
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Project.objects.count(), 0)
+
+class TaskAPIQueryBudgetTest(TestCase):
+    # keyset page (no COUNT) + prefetches for comments, attachments and dependencies
+    TASK_LIST_QUERY_BUDGET = 4
+    # object lookup + the same three prefetches
+    TASK_DETAIL_QUERY_BUDGET = 4
+    # the user's project access map, loaded once and then cached across requests
+    ACCESS_MAP_QUERIES = 1
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.project.members.add(self.other)
+        self.task_list = TaskList.objects.create(name='Test List', project=self.project)
+
+    def _create_tasks(self, count):
+        previous = None
+        for i in range(count):
+            task = Task.objects.create(
+                title=f'Task {i}',
+                task_list=self.task_list,
+                created_by=self.user,
+                assigned_to=self.other,
+                position=i
+            )
+            Comment.objects.create(task=task, author=self.other, content='A comment')
+            TaskAttachment.objects.create(
+                task=task,
+                uploaded_by=self.user,
+                file='task_attachments/notes.txt',
+                file_name='notes.txt'
+            )
+            if previous:
+                task.dependencies.add(previous)
+            previous = task
+
+    def test_list_query_count_is_constant(self):
+        self._create_tasks(2)
+        with self.assertNumQueries(self.TASK_LIST_QUERY_BUDGET + self.ACCESS_MAP_QUERIES):
+            response = self.client.get('/api/tasks/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self._create_tasks(8)
+        with self.assertNumQueries(self.TASK_LIST_QUERY_BUDGET):
+            response = self.client.get('/api/tasks/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_list_reports_blocked_state_from_prefetch(self):
+        self._create_tasks(2)
+        response = self.client.get('/api/tasks/', {'ordering': 'position'})
+        first, second = response.data['results']
+        self.assertFalse(first['is_blocked'])
+        self.assertTrue(second['is_blocked'])
+        self.assertEqual(second['blocking_tasks'][0]['title'], 'Task 0')
+        self.assertEqual(second['comments'][0]['author']['username'], 'otheruser')
+
+    def test_retrieve_query_budget(self):
+        self._create_tasks(3)
+        task = Task.objects.get(title='Task 2')
+        with self.assertNumQueries(self.TASK_DETAIL_QUERY_BUDGET + self.ACCESS_MAP_QUERIES):
+            response = self.client.get(f'/api/tasks/{task.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['is_blocked'])
+
+class TaskBlockedStateTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.task_list = TaskList.objects.create(name='Test List', project=self.project)
+        self.done = Task.objects.create(
+            title='Done', task_list=self.task_list, created_by=self.user, status='DONE'
+        )
+        self.open = Task.objects.create(
+            title='Open', task_list=self.task_list, created_by=self.user
+        )
+        self.blocked = Task.objects.create(
+            title='Blocked', task_list=self.task_list, created_by=self.user
+        )
+        self.unblocked = Task.objects.create(
+            title='Unblocked', task_list=self.task_list, created_by=self.user
+        )
+        self.blocked.dependencies.add(self.done, self.open)
+        self.unblocked.dependencies.add(self.done)
+
+    def test_with_blocked_state_resolves_in_one_query(self):
+        with self.assertNumQueries(1):
+            tasks = {t.title: t for t in Task.objects.with_blocked_state()}
+            blocked = {title: task.is_blocked() for title, task in tasks.items()}
+            self.assertEqual(tasks['Unblocked'].get_blocking_tasks(), [])
+        self.assertEqual(blocked, {
+            'Done': False, 'Open': False, 'Blocked': True, 'Unblocked': False
+        })
+        self.assertEqual(tasks['Blocked'].unfinished_dependency_count, 1)
+
+    def test_project_board_shows_blocked_badge(self):
+        self.client.force_login(self.user)
+        response = self.client.get(f'/projects/{self.project.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, 'fa-lock', count=1)
+
+class DependencyGraphTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.task_list = TaskList.objects.create(name='Test List', project=self.project)
+        # a depends on b, b depends on c
+        self.a, self.b, self.c = [
+            Task.objects.create(title=title, task_list=self.task_list, created_by=self.user)
+            for title in ('A', 'B', 'C')
+        ]
+        self.a.dependencies.add(self.b)
+        self.b.dependencies.add(self.c)
+
+    def test_serializer_rejects_transitive_cycle(self):
+        response = self.client.patch(
+            f'/api/tasks/{self.c.id}/',
+            {'dependency_ids': [self.a.id]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('circular dependency', str(response.data))
+
+    def test_add_dependency_rejects_transitive_cycle(self):
+        response = self.client.post(
+            f'/api/tasks/{self.c.id}/add_dependency/',
+            {'dependency_id': self.a.id},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['cycle'], [self.c.id, self.a.id, self.b.id, self.c.id])
+
+    def test_dependency_endpoints_only_see_accessible_tasks(self):
+        other = User.objects.create_user(username='other', password='testpass123')
+        hidden = Task.objects.create(
+            title='Hidden', created_by=other,
+            task_list=TaskList.objects.create(name='List', project=Project.objects.create(name='Other', owner=other))
+        )
+        for action in ('add_dependency', 'remove_dependency'):
+            response = self.client.post(
+                f'/api/tasks/{self.a.id}/{action}/', {'dependency_id': hidden.id}, format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+            self.assertEqual(response.data, {'error': 'dependency task not found'})
+        self.assertFalse(self.a.dependencies.filter(id=hidden.id).exists())
+
+    def test_graph_loads_edges_in_bulk(self):
+        with self.assertNumQueries(2):
+            graph = DependencyGraph.for_tasks([self.a.id])
+        self.assertEqual(graph.reachable(self.a.id), {self.b.id, self.c.id})
+        self.assertEqual(graph.reachable(self.c.id, reverse=True), {self.a.id, self.b.id})
+        self.assertEqual(graph.topological_order(), [self.c.id, self.b.id, self.a.id])
+
+    def test_long_chains_are_handled_in_memory(self):
+        size = 10000
+        graph = DependencyGraph((i, i + 1) for i in range(size))
+        self.assertEqual(graph.topological_order()[0], size)
+        self.assertIsNone(graph.find_cycle())
+        self.assertTrue(graph.would_create_cycle(size, 0))
+        graph.add_edge(size, 0)
+        self.assertEqual(len(graph.find_cycle()), size + 2)
+        with self.assertRaises(ValueError):
+            graph.topological_order()
+
+class ProjectDependencyGraphAPITest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.task_list = TaskList.objects.create(name='Test List', project=self.project)
+        # design -> build -> ship, with a short side task also blocking ship
+        self.design, self.build, self.ship, self.docs = [
+            Task.objects.create(
+                title=title, task_list=self.task_list, created_by=self.user,
+                estimated_hours=hours
+            )
+            for title, hours in (('Design', 5), ('Build', 20), ('Ship', 1), ('Docs', 3))
+        ]
+        self.build.dependencies.add(self.design)
+        self.ship.dependencies.add(self.build, self.docs)
+        self.url = f'/api/projects/{self.project.id}/dependency_graph/'
+
+    def test_dependency_graph_summary(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        order = response.data['topological_order']
+        self.assertLess(order.index(self.design.id), order.index(self.build.id))
+        self.assertLess(order.index(self.build.id), order.index(self.ship.id))
+        self.assertEqual(
+            response.data['critical_path'],
+            {'tasks': [self.design.id, self.build.id, self.ship.id], 'total_estimated_hours': 26.0}
+        )
+        ship = next(t for t in response.data['tasks'] if t['id'] == self.ship.id)
+        self.assertEqual(ship['blockers'], sorted([self.design.id, self.build.id, self.docs.id]))
+
+    def test_summary_is_cached_until_status_or_edge_changes(self):
+        self.client.get(self.url)
+        # Only the project lookup runs on a warm cache
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+        self.design.status = 'DONE'
+        self.design.save()
+        response = self.client.get(self.url)
+        ship = next(t for t in response.data['tasks'] if t['id'] == self.ship.id)
+        self.assertNotIn(self.design.id, ship['blockers'])
+
+        self.ship.dependencies.remove(self.docs)
+        response = self.client.get(self.url)
+        self.assertNotIn([self.ship.id, self.docs.id], [list(edge) for edge in response.data['edges']])
+
+    def _external_dependency(self):
+        """Make ship depend on a task of another user's project, which depends on a third project"""
+        other = User.objects.create_user(username='other', password='testpass123')
+        vendor = Project.objects.create(name='Vendor', owner=other)
+        supplier = Project.objects.create(name='Supplier', owner=other)
+        part = Task.objects.create(
+            title='Part', created_by=other, estimated_hours=4,
+            task_list=TaskList.objects.create(name='List', project=vendor)
+        )
+        material = Task.objects.create(
+            title='Material', created_by=other,
+            task_list=TaskList.objects.create(name='List', project=supplier)
+        )
+        part.dependencies.add(material)
+        self.ship.dependencies.add(part)
+        return vendor, part, material
+
+    def test_external_dependencies_are_direct_and_redacted(self):
+        vendor, part, material = self._external_dependency()
+        tasks = {task['id']: task for task in self.client.get(self.url).data['tasks']}
+        self.assertNotIn(material.id, tasks)
+        self.assertTrue(tasks[part.id]['external'])
+        self.assertEqual(tasks[part.id]['project_id'], vendor.id)
+        self.assertEqual(
+            [tasks[part.id][name] for name in ('title', 'status', 'estimated_hours')], [None, None, None]
+        )
+        self.assertIn(part.id, tasks[self.ship.id]['blockers'])
+
+        vendor.members.add(self.user)
+        tasks = {task['id']: task for task in self.client.get(self.url).data['tasks']}
+        self.assertEqual((tasks[part.id]['title'], tasks[part.id]['status']), ('Part', 'TODO'))
+
+    def test_external_status_change_invalidates_the_dependent_board(self):
+        _, part, _ = self._external_dependency()
+        board_key = project_cache_key(self.project.id)
+        part = Task.objects.get(pk=part.pk)
+        part.estimated_hours = 8
+        part.save()
+        self.assertEqual(project_cache_key(self.project.id), board_key)
+        part.status = 'DONE'
+        part.save()
+        self.assertNotEqual(project_cache_key(self.project.id), board_key)
+
+    def test_external_dependency_changes_invalidate_summary(self):
+        _, part, _ = self._external_dependency()
+        self.client.get(self.url)
+
+        part = Task.objects.get(pk=part.pk)
+        part.status = 'DONE'
+        part.save()
+        tasks = {task['id']: task for task in self.client.get(self.url).data['tasks']}
+        self.assertNotIn(part.id, tasks[self.ship.id]['blockers'])
+
+        part.delete()
+        tasks = {task['id']: task for task in self.client.get(self.url).data['tasks']}
+        self.assertNotIn(part.id, tasks)
+
+class ProjectListViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_login(self.user)
+
+    def _create_projects(self, count):
+        for i in range(count):
+            project = Project.objects.create(name=f'Project {i}', owner=self.user)
+            project.members.add(self.user)
+            task_list = TaskList.objects.create(name='List', project=project)
+            for task_status in ('DONE', 'TODO', 'TODO', 'REVIEW'):
+                Task.objects.create(
+                    title='Task', task_list=task_list, created_by=self.user, status=task_status
+                )
+
+    def test_query_count_does_not_grow_with_projects(self):
+        self._create_projects(2)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/projects/')
+        self._create_projects(20)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/projects/')
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(len(response.context['projects']), PROJECTS_PER_PAGE)
+        self.assertTrue(response.context['is_paginated'])
+
+    def test_task_statistics_are_annotated(self):
+        self._create_projects(1)
+        response = self.client.get('/projects/')
+        project = response.context['projects'][0]
+        # the owner is also a member, which must not double the counts
+        self.assertEqual(project.task_count, 4)
+        self.assertEqual(project.completed_tasks, 1)
+        self.assertEqual(project.completion_percentage, 25.0)
+        self.assertContains(response, '25% Complete')
+
+class ProjectDetailViewCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.member = User.objects.create_user(
+            username='member',
+            email='member@example.com',
+            password='testpass123'
+        )
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.task_list = TaskList.objects.create(name='Todo', project=self.project)
+        for i in range(3):
+            Task.objects.create(
+                title=f'Task {i}', task_list=self.task_list, created_by=self.user,
+                assigned_to=self.user, status='DONE' if i == 0 else 'TODO'
+            )
+        self.client.force_login(self.user)
+        self.url = f'/projects/{self.project.id}/'
+
+    def test_board_is_cached_as_plain_data(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        task_list = response.context['task_lists'][0]
+        self.assertEqual((task_list['task_count'], task_list['completed_count']), (3, 1))
+        self.assertEqual(task_list['tasks'][0]['assigned_to']['username'], 'testuser')
+
+        board = cache.get(project_cache_key(self.project.id))
+        self.assertIsInstance(board['task_lists'], list)
+        # A warm cache renders the board without any project queries
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertFalse([q for q in queries if 'tasks_' in q['sql']])
+
+    def test_board_is_invalidated_by_version_bumps(self):
+        self.client.get(self.url)
+        Task.objects.create(title='New Task', task_list=self.task_list, created_by=self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['task_lists'][0]['task_count'], 4)
+
+        self.client.force_login(self.member)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.project.members.add(self.member)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, 'member')
+
+class CacheInvalidationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.project = Project.objects.create(name='Test Project', owner=self.owner)
+        self.task_list = TaskList.objects.create(name='Test List', project=self.project)
+        self.task = Task.objects.create(
+            title='Task', task_list=self.task_list, created_by=self.owner, assigned_to=self.alice
+        )
+
+    def test_comment_invalidates_task_and_project(self):
+        task_key, project_key = task_cache_key(self.task.id), project_cache_key(self.project.id)
+        Comment.objects.create(task=self.task, author=self.owner, content='Hello')
+        self.assertNotEqual(task_cache_key(self.task.id), task_key)
+        self.assertNotEqual(project_cache_key(self.project.id), project_key)
+
+    def test_reassignment_invalidates_both_assignees(self):
+        alice_key, bob_key = user_tasks_cache_key(self.alice.id), user_tasks_cache_key(self.bob.id)
+        owner_key = user_tasks_cache_key(self.owner.id)
+        self.task.assigned_to = self.bob
+        self.task.save()
+        self.assertNotEqual(user_tasks_cache_key(self.alice.id), alice_key)
+        self.assertNotEqual(user_tasks_cache_key(self.bob.id), bob_key)
+        self.assertEqual(user_tasks_cache_key(self.owner.id), owner_key)
+
+    def test_membership_invalidates_user_and_project(self):
+        user_key, project_key = user_tasks_cache_key(self.bob.id), project_cache_key(self.project.id)
+        self.project.members.add(self.bob)
+        self.assertNotEqual(user_tasks_cache_key(self.bob.id), user_key)
+        self.assertNotEqual(project_cache_key(self.project.id), project_key)
+
+    def test_status_change_invalidates_dependents(self):
+        dependent = Task.objects.create(title='Dependent', task_list=self.task_list, created_by=self.owner)
+        dependent.dependencies.add(self.task)
+        dependent_key = task_cache_key(dependent.id)
+        self.task.title = 'Renamed'
+        self.task.save()
+        self.assertEqual(task_cache_key(dependent.id), dependent_key)
+        self.task.status = 'DONE'
+        self.task.save()
+        self.assertNotEqual(task_cache_key(dependent.id), dependent_key)
+
+    def _project_with_tasks(self, name, tasks, comments):
+        project = Project.objects.create(name=name, owner=self.owner)
+        project.members.add(self.bob)
+        task_list = TaskList.objects.create(name='List', project=project)
+        for i in range(tasks):
+            task = Task.objects.create(
+                title=f'Task {i}', task_list=task_list, created_by=self.owner, assigned_to=self.alice
+            )
+            for j in range(comments):
+                Comment.objects.create(task=task, author=self.owner, content=f'Comment {j}')
+        return project
+
+    def test_deleting_a_project_runs_a_constant_number_of_queries(self):
+        small = self._project_with_tasks('Small', 5, 1)
+        with self.assertNumQueries(15):
+            small.delete()
+        # Django deletes the comments in batches of 100 on SQLite; stay within one
+        large = self._project_with_tasks('Large', 20, 5)
+        with self.assertNumQueries(15):
+            large.delete()
+
+    def test_deleting_a_project_invalidates_users_and_dependents(self):
+        doomed = self._project_with_tasks('Doomed', 2, 1)
+        self.task.dependencies.add(doomed.task_lists.get().tasks.first())
+        keys = [user_tasks_cache_key(user.id) for user in (self.alice, self.bob)]
+        task_key, graph_key = task_cache_key(self.task.id), dependency_graph_cache_key(self.project.id)
+        doomed.delete()
+        self.assertTrue(all(
+            user_tasks_cache_key(user.id) != key for user, key in zip((self.alice, self.bob), keys)
+        ))
+        self.assertNotEqual(task_cache_key(self.task.id), task_key)
+        self.assertNotEqual(dependency_graph_cache_key(self.project.id), graph_key)
+
+    def test_deleting_a_task_list_invalidates_its_project_and_assignees(self):
+        graph_key, alice_key = dependency_graph_cache_key(self.project.id), user_tasks_cache_key(self.alice.id)
+        Comment.objects.create(task=self.task, author=self.owner, content='Hello')
+        self.task_list.delete()
+        self.assertNotEqual(dependency_graph_cache_key(self.project.id), graph_key)
+        self.assertNotEqual(user_tasks_cache_key(self.alice.id), alice_key)
+
+    def test_invalidate_cache_works_without_pattern_deletes(self):
+        calls = []
+
+        @cache_result(prefix='test:invalidate')
+        def compute(value):
+            calls.append(value)
+            return value * 2
+
+        self.assertEqual(compute(2), 4)
+        self.assertEqual(compute(2), 4)
+        invalidate_cache('test:invalidate')
+        self.assertEqual(compute(2), 4)
+        self.assertEqual(calls, [2, 2])
+
+class CacheResultDecoratorTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+
+    def _decorate(self, result=None, **options):
+        @cache_result(prefix='test:cache_result', **options)
+        def compute(value):
+            self.calls.append(value)
+            return result
+        return compute
+
+    def test_none_results_are_cached(self):
+        compute = self._decorate(result=None)
+        self.assertIsNone(compute(1))
+        self.assertIsNone(compute(1))
+        self.assertEqual(self.calls, [1])
+        self.assertEqual(compute.cache_stats['hits'], 1)
+        self.assertEqual(compute.cache_stats['misses'], 1)
+
+    def test_model_arguments_use_their_primary_key(self):
+        compute = self._decorate(result='ok')
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        same_user = User.objects.get(pk=user.pk)
+        same_user.username = 'renamed'
+        self.assertEqual(compute.cache_key(user), compute.cache_key(same_user))
+
+    def test_stale_entry_is_served_while_another_worker_refreshes(self):
+        compute = self._decorate(result='fresh', timeout=0, stale_ttl=60)
+        compute(1)
+        # Simulate another worker holding the refresh lock
+        cache.add(f"{compute.cache_key(1)}:lock", 1, 60)
+        self.assertEqual(compute(1), 'fresh')
+        self.assertEqual(self.calls, [1])
+        self.assertEqual(compute.cache_stats['stale_hits'], 1)
+
+    def test_miss_waits_for_the_lock_holder(self):
+        compute = self._decorate(result='computed', lock_timeout=0.2)
+        cache.add(f"{compute.cache_key(1)}:lock", 1, 60)
+        # The lock holder never finishes, so the waiting worker computes the value itself
+        self.assertEqual(compute(1), 'computed')
+        self.assertEqual(compute.cache_stats['lock_waits'], 1)
+        self.assertEqual(self.calls, [1])
+
+    def test_hit_reads_every_version_in_one_round_trip(self):
+        compute = self._decorate(result='ok', versions=lambda value: [('project', value)])
+        compute(1)
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many, \
+                mock.patch('tasks.utils.get_cache_version') as get_cache_version:
+            self.assertEqual(compute(1), 'ok')
+        get_many.assert_called_once_with(['version:prefix:test:cache_result', 'version:project:1'])
+        get_cache_version.assert_not_called()
+        self.assertEqual(self.calls, [1])
+
+        bump_cache_version('project', 1)
+        compute(1)
+        self.assertEqual(self.calls, [1, 1])
+
+TWO_TIER_CACHES = {
+    'default': {
+        'BACKEND': 'tasks.cache_backends.TwoTierCache',
+        'OPTIONS': {'SHARED_ALIAS': 'shared', 'NEAR_MAX_ENTRIES': 2, 'NEAR_TIMEOUT': 60},
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'two-tier-shared',
+    },
+}
+
+@override_settings(CACHES=TWO_TIER_CACHES)
+class TwoTierCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.shared = caches['shared']
+
+    def test_hot_keys_are_served_from_process_memory(self):
+        cache.set('project:1:board', {'tasks': [1, 2]})
+        self.shared.set('project:1:board', 'changed elsewhere')
+        self.assertEqual(cache.get('project:1:board'), {'tasks': [1, 2]})
+
+        # Callers cannot mutate the in-process copy
+        cache.get('project:1:board')['tasks'].append(3)
+        self.assertEqual(cache.get('project:1:board'), {'tasks': [1, 2]})
+
+    def test_version_counters_always_come_from_the_shared_tier(self):
+        old_key = project_cache_key(1)
+        cache.set(old_key, 'old board')
+        self.shared.incr('version:project:1')
+        self.assertNotEqual(project_cache_key(1), old_key)
+        self.assertIsNone(cache.get(project_cache_key(1)))
+
+    def test_near_tier_is_bounded(self):
+        for i in range(3):
+            cache.set(f'task:{i}', i)
+        self.shared.clear()
+        self.assertIsNone(cache.get('task:0'))
+        self.assertEqual(cache.get_many(['task:1', 'task:2']), {'task:1': 1, 'task:2': 2})
+
+    def test_delete_evicts_both_tiers(self):
+        cache.set('user:1:tasks', 'summary')
+        cache.delete('user:1:tasks')
+        self.assertIsNone(cache.get('user:1:tasks'))
+        self.assertIsNone(self.shared.get('user:1:tasks'))
+
+class ProjectMetricsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.task_list = TaskList.objects.create(name='Test List', project=self.project)
+        now = timezone.now()
+        for task_status, priority, due_date in (
+            ('DONE', 'HIGH', None),
+            ('TODO', 'HIGH', now - timezone.timedelta(days=1)),
+            ('IN_PROGRESS', 'LOW', now + timezone.timedelta(days=2)),
+            ('TODO', 'MEDIUM', None),
+        ):
+            Task.objects.create(
+                title='Task', task_list=self.task_list, created_by=self.user,
+                assigned_to=self.user, status=task_status, priority=priority, due_date=due_date
+            )
+        self.url = f'/api/projects/{self.project.id}/metrics/'
+
+    def test_metrics_summary(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_tasks'], 4)
+        self.assertEqual(response.data['completion_rate'], 25.0)
+        self.assertEqual(response.data['overdue_tasks'], 1)
+        self.assertEqual(response.data['upcoming_tasks'], 1)
+        self.assertIn({'status': 'TODO', 'count': 2}, response.data['status_breakdown'])
+        self.assertIn({'priority': 'HIGH', 'count': 2}, response.data['priority_breakdown'])
+        self.assertEqual(response.data['assigned_user_breakdown'][0]['count'], 4)
+
+    def test_metrics_are_recomputed_once_per_version(self):
+        # access map + project name + one aggregate + assignee breakdown
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+        Task.objects.filter(status='TODO').first().delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['total_tasks'], 3)
+
+class UserTaskSummaryTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.task_list = TaskList.objects.create(name='Test List', project=self.project)
+        yesterday = timezone.now() - timezone.timedelta(days=1)
+        for i in range(15):
+            Task.objects.create(
+                title=f'Overdue {i}', task_list=self.task_list, created_by=self.user,
+                assigned_to=self.user, due_date=yesterday
+            )
+        Task.objects.create(
+            title='Done', task_list=self.task_list, created_by=self.user,
+            assigned_to=self.user, status='DONE'
+        )
+        self.url = '/api/user/task-summary/'
+
+    def test_summary_counts_and_caps_buckets(self):
+        # one aggregate plus one row query per non-empty bucket
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'limit': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_assigned'], 16)
+        self.assertEqual(response.data['overdue_tasks']['count'], 15)
+        self.assertEqual(len(response.data['overdue_tasks']['tasks']), 5)
+        self.assertEqual(response.data['due_today']['count'], 0)
+        self.assertEqual(response.data['recently_completed']['count'], 1)
+        self.assertIn({'status': 'TODO', 'count': 15}, response.data['status_breakdown'])
+
+        row = response.data['recently_completed']['tasks'][0]
+        self.assertEqual(row['project_name'], 'Test Project')
+        self.assertEqual(row['status_display'], 'Done')
+        self.assertNotIn('comments', row)
+
+    def test_summary_excludes_inaccessible_projects(self):
+        other = User.objects.create_user(username='other', password='testpass123')
+        project = Project.objects.create(name='Other Project', owner=other)
+        Task.objects.create(
+            title='Hidden', task_list=TaskList.objects.create(name='List', project=project),
+            created_by=other, assigned_to=self.user
+        )
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['total_assigned'], 16)
+
+    def test_html_view_reuses_summary(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/user/task-summary/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, 'Overdue 0')
+        self.assertContains(response, 'Test Project')
+
+class RequestValidationMiddlewareTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = RequestValidationMiddleware(lambda request: None)
+
+    def _form_post(self, data):
+        return self.factory.post('/', urlencode(data, doseq=True), content_type='application/x-www-form-urlencoded')
+
+    def test_form_fields_are_scanned(self):
+        request = self._form_post({'title': 'ok', 'description': "x'; DROP TABLE tasks"})
+        self.assertEqual(self.middleware.process_request(request).status_code, 400)
+        self.assertIsNone(self.middleware.process_request(self._form_post({'title': 'ok'})))
+
+    def test_json_keys_and_nested_values_are_scanned(self):
+        for payload in (
+            {'title': 'ok', 'tags': [{'name': '<SCRIPT>alert(1)</SCRIPT>'}]},
+            {'../../etc/passwd': 1},
+        ):
+            request = self.factory.post('/', json.dumps(payload), content_type='application/json')
+            self.assertEqual(self.middleware.process_request(request).status_code, 400)
+
+        request = self.factory.post('/', json.dumps({'title': 'ok', 'n': 1}), content_type='application/json')
+        self.assertIsNone(self.middleware.process_request(request))
+
+    def test_every_value_of_multi_valued_fields_is_scanned(self):
+        request = self._form_post({'a': ["x'; DROP TABLE tasks", 'ok']})
+        self.assertEqual(self.middleware.process_request(request).status_code, 400)
+
+    def test_multipart_text_fields_are_scanned(self):
+        request = self.factory.post('/', {
+            'title': '<script>', 'file': SimpleUploadedFile('notes.txt', b'contents'),
+        })
+        self.assertEqual(self.middleware.process_request(request).status_code, 400)
+        request = self.factory.post('/', {
+            'title': 'ok', 'file': SimpleUploadedFile('notes.txt', b'<script>'),
+        })
+        self.assertIsNone(self.middleware.process_request(request))
+
+    @override_settings(REQUEST_VALIDATION_MAX_BODY_SIZE=100)
+    def test_large_uploads_are_left_to_the_views(self):
+        middleware = RequestValidationMiddleware(lambda request: None)
+        request = self.factory.post('/', {
+            'title': '<script>', 'file': SimpleUploadedFile('notes.txt', b'x' * 200),
+        })
+        self.assertIsNone(middleware.process_request(request))
+        self.assertFalse(hasattr(request, '_post'))
+
+    def test_values_are_not_matched_across_fields(self):
+        request = self._form_post({'a': 'java', 'b': 'script:'})
+        self.assertIsNone(self.middleware.process_request(request))
+
+    @override_settings(REQUEST_VALIDATION_MAX_BODY_SIZE=100)
+    def test_bodies_over_the_cap_are_not_parsed(self):
+        middleware = RequestValidationMiddleware(lambda request: None)
+        request = self.factory.post(
+            '/', json.dumps({'title': '<script>', 'padding': 'x' * 200}), content_type='application/json'
+        )
+        self.assertIsNone(middleware.process_request(request))
+        self.assertFalse(hasattr(request, '_body'))
+
+class RequestSanitizationMiddlewareTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = RequestSanitizationMiddleware(lambda request: None)
+
+    def test_clean_data_is_not_copied(self):
+        request = self.factory.post('/', {'title': 'Plain title', 'tags': ['a', 'b']})
+        original = request.POST
+        self.middleware.process_request(request)
+        self.assertIs(request.POST, original)
+
+    def test_every_value_of_multi_valued_fields_is_escaped(self):
+        request = self.factory.post('/', {'title': 'Plain', 'tags': ['<b>', 'ok', 'a & b']})
+        self.middleware.process_request(request)
+        self.assertEqual(request.POST.getlist('tags'), ['&lt;b&gt;', 'ok', 'a &amp; b'])
+        self.assertEqual(request.POST['title'], 'Plain')
+
+    @override_settings(REQUEST_SANITIZATION_EXEMPT_PATHS=['/api/tasks/bulk/'])
+    def test_exempt_paths_are_skipped(self):
+        middleware = RequestSanitizationMiddleware(lambda request: None)
+        request = self.factory.post('/api/tasks/bulk/', {'title': '<b>'})
+        middleware.process_request(request)
+        self.assertEqual(request.POST['title'], '<b>')
+
+class ProjectAccessMapTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.member = User.objects.create_user(username='member', password='testpass123')
+        self.project = Project.objects.create(name='Test Project', owner=self.owner)
+        self.project.members.add(self.member, *[
+            User.objects.create_user(username=f'user{i}', password='testpass123') for i in range(20)
+        ])
+        self.task = Task.objects.create(
+            title='Task',
+            task_list=TaskList.objects.create(name='Test List', project=self.project),
+            created_by=self.owner
+        )
+        self.comment = Comment.objects.create(task=self.task, author=self.owner, content='A comment')
+        self.client.force_authenticate(user=self.member)
+
+    def test_object_checks_do_not_load_members(self):
+        url = f'/api/comments/{self.comment.id}/'
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        self.assertFalse(any('tasks_project_members' in query['sql'] for query in queries))
+
+    def test_only_the_owner_or_uploader_can_write(self):
+        response = self.client.delete(f'/api/comments/{self.comment.id}/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.owner)
+        response = self.client.delete(f'/api/comments/{self.comment.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_membership_changes_invalidate_the_map(self):
+        url = f'/api/tasks/{self.task.id}/'
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.project.members.remove(self.member)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+        project = Project.objects.create(name='New Project', owner=self.member)
+        response = self.client.get(f'/api/projects/{project.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+class ProjectScopingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.other = User.objects.create_user(username='otheruser', password='testpass123')
+        owned = Project.objects.create(name='Owned', owner=self.user)
+        owned.members.add(self.user, self.other)
+        shared = Project.objects.create(name='Shared', owner=self.other)
+        shared.members.add(self.user)
+        hidden = Project.objects.create(name='Hidden', owner=self.other)
+        for project in (owned, shared, hidden):
+            Task.objects.create(
+                title=f'{project.name} task',
+                task_list=TaskList.objects.create(name='List', project=project),
+                created_by=project.owner
+            )
+
+    def _request(self):
+        request = self.factory.get('/')
+        request.user = self.user
+        return request
+
+    def _scoped_tasks(self):
+        return scope_to_projects(Task.objects.all(), self._request(), 'task_list__project_id')
+
+    def test_owned_and_member_projects_without_duplicates(self):
+        for max_inline in (500, 0):
+            with mock.patch('tasks.access.MAX_INLINE_PROJECT_IDS', max_inline):
+                titles = sorted(self._scoped_tasks().values_list('title', flat=True))
+                self.assertEqual(titles, ['Owned task', 'Shared task'])
+
+    def test_scoping_avoids_the_members_join(self):
+        for max_inline in (500, 0):
+            with mock.patch('tasks.access.MAX_INLINE_PROJECT_IDS', max_inline):
+                sql = str(self._scoped_tasks().query).upper()
+                self.assertNotIn('DISTINCT', sql)
+                self.assertNotIn(' OR ', sql)
+
+    def test_subquery_plan_uses_indexes(self):
+        with mock.patch('tasks.access.MAX_INLINE_PROJECT_IDS', 0):
+            plan = self._scoped_tasks().explain()
+        self.assertIn('tasks_project_owner_id', plan)
+        self.assertIn('tasks_project_members_user_id', plan)
+        self.assertNotIn('SCAN tasks_task', plan)
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        now = timezone.now()
+        for list_index in range(2):
+            task_list = TaskList.objects.create(name=f'List {list_index}', project=self.project)
+            for position in (2, 1, 1, 0):
+                Task.objects.create(
+                    title=f'Task {list_index}-{position}', task_list=task_list, created_by=self.user,
+                    position=position, due_date=now if position else None
+                )
+        self.task = Task.objects.first()
+        self.comments = [
+            Comment.objects.create(task=self.task, author=self.user, content=f'Comment {i}')
+            for i in range(5)
+        ]
+
+    def _walk(self, url, params):
+        ids, previous = [], None
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(row['id'] for row in response.data['results'])
+            previous = response.data['previous']
+            if not response.data['next']:
+                return ids, previous
+            response = self.client.get(response.data['next'])
+
+    def test_tasks_follow_the_composite_ordering(self):
+        ids, _ = self._walk('/api/tasks/', {'page_size': 3})
+        expected = list(Task.objects.order_by('task_list_id', 'position', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_nullable_client_ordering(self):
+        ids, _ = self._walk('/api/tasks/', {'page_size': 3, 'ordering': '-due_date'})
+        self.assertEqual(len(ids), 8)
+        self.assertEqual(len(set(ids)), 8)
+        nulls = set(Task.objects.filter(due_date__isnull=True).values_list('id', flat=True))
+        self.assertEqual(set(ids[-2:]), nulls)
+
+    def test_walking_back_over_nulls(self):
+        params = {'page_size': 3, 'ordering': '-due_date'}
+        forward, previous = self._walk('/api/tasks/', params)
+        backward = []
+        while previous:
+            response = self.client.get(previous)
+            backward = [row['id'] for row in response.data['results']] + backward
+            previous = response.data['previous']
+        self.assertEqual(backward, forward[:len(backward)])
+        self.assertEqual(len(backward), 6)
+
+    def test_previous_link_returns_the_previous_page(self):
+        first = self.client.get('/api/tasks/', {'page_size': 3})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [row['id'] for row in back.data['results']],
+            [row['id'] for row in first.data['results']]
+        )
+        self.assertIsNone(back.data['previous'])
+
+    def test_comments_newest_first_for_a_task(self):
+        ids, _ = self._walk('/api/comments/', {'task': self.task.id, 'page_size': 2})
+        self.assertEqual(ids, [comment.id for comment in reversed(self.comments)])
+
+    def test_count_is_optional_and_page_size_capped(self):
+        response = self.client.get('/api/tasks/')
+        self.assertNotIn('count', response.data)
+        response = self.client.get('/api/tasks/', {'count': 'true', 'page_size': 1000})
+        self.assertEqual(response.data['count'], 8)
+        self.assertEqual(len(response.data['results']), 8)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/tasks/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class ActivityLogAPITest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.other = User.objects.create_user(username='otheruser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.task = Task.objects.create(
+            title='Task', created_by=self.user,
+            task_list=TaskList.objects.create(name='List', project=self.project)
+        )
+        hidden = Project.objects.create(name='Hidden', owner=self.other)
+        # Task activity without the project set, as the signals write it
+        self.task_log = ActivityLog.objects.create(
+            user=self.user, task=self.task, action='STATUS', description='Status changed'
+        )
+        self.project_log = ActivityLog.objects.create(
+            user=self.other, project=self.project, action='UPDATE', description='Project updated'
+        )
+        ActivityLog.objects.create(user=self.other, project=hidden, action='UPDATE', description='Hidden')
+        ActivityLog.objects.filter(pk=self.task_log.pk).update(
+            timestamp=timezone.now() - timezone.timedelta(days=10)
+        )
+
+    def _ids(self, params=None):
+        response = self.client.get('/api/activity/', params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in response.data['results']]
+
+    def test_only_accessible_activity_newest_first(self):
+        self.assertEqual(self._ids(), [self.project_log.id, self.task_log.id])
+        self.assertEqual(self._ids({'project': self.project.id}), [self.project_log.id, self.task_log.id])
+
+    def test_filters(self):
+        self.assertEqual(self._ids({'task': self.task.id}), [self.task_log.id])
+        self.assertEqual(self._ids({'user': self.other.id}), [self.project_log.id])
+        self.assertEqual(self._ids({'action': ['STATUS', 'ASSIGN']}), [self.task_log.id])
+        since = (timezone.now() - timezone.timedelta(days=1)).isoformat()
+        self.assertEqual(self._ids({'since': since}), [self.project_log.id])
+
+    def test_streaming_export(self):
+        response = self.client.get('/api/activity/export/', {'project': self.project.id})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.project_log.id, self.task_log.id])
+        self.assertEqual(rows[0]['user__username'], 'otheruser')
+
+        response = self.client.get('/api/activity/export/', {'output': 'csv'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith('id,timestamp,action'))
+        self.assertEqual(len(lines), 3)
+
+class ArchiveActivityLogCommandTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        for i in range(5):
+            ActivityLog.objects.create(
+                user=self.user, project=self.project, action='UPDATE', description=f'Change {i}'
+            )
+        self.recent = ActivityLog.objects.create(
+            user=self.user, project=self.project, action='UPDATE', description='Recent'
+        )
+        ActivityLog.objects.exclude(pk=self.recent.pk).update(
+            timestamp=timezone.now() - timezone.timedelta(days=400)
+        )
+
+    def test_old_rows_are_moved_to_a_compressed_archive(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            call_command(
+                'archive_activity_log', days=365, output_dir=output_dir, batch_size=2, stdout=io.StringIO()
+            )
+            (name,) = os.listdir(output_dir)
+            with gzip.open(os.path.join(output_dir, name), 'rt') as archive:
+                rows = [json.loads(line) for line in archive]
+
+        self.assertEqual([row['description'] for row in rows], [f'Change {i}' for i in range(5)])
+        self.assertEqual(list(ActivityLog.objects.values_list('id', flat=True)), [self.recent.id])
+
+    def test_latest_activity_reads_the_composite_index_without_sorting(self):
+        composite = {index.fields[0]: index.name for index in ActivityLog._meta.indexes}
+        for field, value in (('task', 1), ('project', self.project.id), ('user', self.user.id)):
+            plan = ActivityLog.objects.filter(**{field: value}).order_by('-timestamp')[:20].explain()
+            self.assertIn(f'USING INDEX {composite[field]}', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_dry_run_keeps_rows(self):
+        output = io.StringIO()
+        call_command('archive_activity_log', days=365, dry_run=True, stdout=output)
+        self.assertIn('5 activity log rows', output.getvalue())
+        self.assertEqual(ActivityLog.objects.count(), 6)
+
+    def test_zero_days_is_rejected(self):
+        with self.assertRaises(CommandError):
+            call_command('archive_activity_log', days=0, stdout=io.StringIO())
+        self.assertEqual(ActivityLog.objects.count(), 6)
+
+class ActivityBatchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.member = User.objects.create_user(username='member', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.project.members.add(self.member)
+        self.task_list = TaskList.objects.create(name='List', project=self.project)
+        self.task = Task.objects.create(title='Task', created_by=self.user, task_list=self.task_list)
+
+    def _activity_inserts(self, queries):
+        return [q for q in queries if q['sql'].startswith('INSERT INTO "tasks_activitylog"')]
+
+    def test_comment_logged_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/api/comments/', {'task': self.task.id, 'content': 'Hello'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(ActivityLog.objects.exists())
+
+        for callback in callbacks:
+            callback()
+        log = ActivityLog.objects.get()
+        self.assertEqual(log.action, 'COMMENT')
+        self.assertEqual(log.description, "Added comment on task 'Task'")
+        self.assertEqual(log.task_id, self.task.id)
+        self.assertEqual(log.project_id, self.project.id)
+
+    def test_request_entries_written_in_one_insert(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(f'/api/tasks/{self.task.id}/update/', {
+                    'title': 'Task', 'status': self.task.status, 'priority': self.task.priority,
+                    'task_list': self.task_list.id, 'assigned_to': self.member.id,
+                })
+        self.assertEqual(
+            set(ActivityLog.objects.values_list('action', flat=True)), {'UPDATE', 'ASSIGN'}
+        )
+        self.assertEqual(len(self._activity_inserts(queries.captured_queries)), 1)
+
+    def test_batch_outside_request(self):
+        comments = []
+        with self.captureOnCommitCallbacks(execute=True):
+            with activity_batch():
+                for i in range(3):
+                    comments.append(Comment.objects.create(task=self.task, author=self.user, content=f'Comment {i}'))
+                self.assertFalse(ActivityLog.objects.exists())
+        self.assertEqual(ActivityLog.objects.filter(action='COMMENT', project=self.project).count(), 3)
+
+    def test_rolled_back_entries_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with activity_batch():
+                Comment.objects.create(task=self.task, author=self.user, content='Kept')
+                with self.assertRaises(ValueError):
+                    with transaction.atomic():
+                        Comment.objects.create(task=self.task, author=self.user, content='Rolled back')
+                        raise ValueError
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(ActivityLog.objects.filter(action='COMMENT').count(), 1)
+
+    def test_rolled_back_entries_without_batch_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError):
+                with transaction.atomic():
+                    Comment.objects.create(task=self.task, author=self.user, content='Rolled back')
+                    raise ValueError
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(ActivityLog.objects.exists())
+
+    def test_entries_of_tasks_deleted_before_the_flush_are_dropped(self):
+        doomed = Task.objects.create(title='Doomed', created_by=self.user, task_list=self.task_list)
+        with self.captureOnCommitCallbacks(execute=True):
+            with activity_batch():
+                Comment.objects.create(task=self.task, author=self.user, content='Kept')
+                Comment.objects.create(task=doomed, author=self.user, content='Dropped')
+                doomed.delete()
+        self.assertEqual(list(ActivityLog.objects.values_list('task_id', flat=True)), [self.task.id])
+
+    @override_settings(ACTIVITY_LOG_QUEUE=True)
+    def test_queue_mode_hands_batches_to_writer(self):
+        with mock.patch('tasks.activity.get_writer') as get_writer:
+            with self.captureOnCommitCallbacks(execute=True):
+                Comment.objects.create(task=self.task, author=self.user, content='Queued')
+        self.assertFalse(ActivityLog.objects.exists())
+        (entries,), _ = get_writer.return_value.put.call_args
+        self.assertEqual(entries[0]['action'], 'COMMENT')
+
+        write_entries(entries)
+        self.assertEqual(ActivityLog.objects.get().description, "Added comment on task 'Task'")
+
+class TaskChangeTrackingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.member = User.objects.create_user(username='member', password='testpass123')
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.project.members.add(self.member)
+        self.task_list = TaskList.objects.create(name='List', project=self.project)
+        self.task = Task.objects.create(
+            title='Task', created_by=self.user, task_list=self.task_list, assigned_to=self.user
+        )
+
+    def test_changed_fields(self):
+        task = Task.objects.get(pk=self.task.pk)
+        self.assertEqual(task.changed_fields, set())
+        task.assigned_to = self.member
+        task.status = 'DONE'
+        self.assertEqual(task.changed_fields, {'assigned_to_id', 'status'})
+        self.assertEqual(task.get_loaded_value('assigned_to_id'), self.user.id)
+
+        task.save()
+        self.assertEqual(task.changed_fields, set())
+        self.assertEqual(task.get_loaded_value('status'), 'DONE')
+
+    def test_save_reads_no_task_row(self):
+        # The views load the task list with the task, so saving is a single UPDATE
+        task = Task.objects.select_related('task_list').get(pk=self.task.pk)
+        task.title = 'Renamed'
+        old_version = get_cache_version('project', self.project.id)
+        with self.assertNumQueries(1):
+            task.save()
+        self.assertGreater(get_cache_version('project', self.project.id), old_version)
+
+        # Otherwise only the task list's project id is looked up
+        task = Task.objects.get(pk=self.task.pk)
+        task.title = 'Renamed again'
+        with CaptureQueriesContext(connection) as queries:
+            task.save()
+        self.assertEqual(len(queries), 2)
+        self.assertIn('"tasks_tasklist"', queries[1]['sql'])
+
+    def test_task_queries_do_not_join_task_lists(self):
+        with CaptureQueriesContext(connection) as queries:
+            Task.objects.filter(assigned_to=self.user).count()
+        self.assertNotIn('JOIN', queries[0]['sql'])
+        self.assertNotIn('project_id', Task.objects.values().first())
+
+    def test_bulk_update_changed_skips_unchanged_tasks(self):
+        other = Task.objects.create(title='Other', created_by=self.user, task_list=self.task_list)
+        tasks = list(Task.objects.filter(pk__in=[self.task.pk, other.pk]))
+        tasks[0].status = 'DONE'
+        old_version = get_cache_version('task', tasks[0].pk)
+        self.assertEqual(Task.objects.bulk_update_changed(tasks, ['status']), 1)
+        self.assertGreater(get_cache_version('task', tasks[0].pk), old_version)
+        self.assertEqual(tasks[0].changed_fields, set())
+        # The stock bulk_update keeps its meaning
+        self.assertEqual(Task.objects.bulk_update(tasks, ['status']), 2)
+
+    def test_moving_task_invalidates_both_projects(self):
+        other = Project.objects.create(name='Other', owner=self.user)
+        other_list = TaskList.objects.create(name='List', project=other)
+        task = Task.objects.get(pk=self.task.pk)
+        old_versions = [get_cache_version('project', project.id) for project in (self.project, other)]
+        task.task_list = other_list
+        task.save()
+        new_versions = [get_cache_version('project', project.id) for project in (self.project, other)]
+        self.assertTrue(all(new > old for new, old in zip(new_versions, old_versions)))
+
+        # The annotated project id is dropped with the move, so the next save uses the new list
+        task.title = 'Renamed'
+        old_version = get_cache_version('project', other.id)
+        task.save()
+        self.assertGreater(get_cache_version('project', other.id), old_version)
+
+    def test_loading_tasks_does_not_load_assignees(self):
+        with self.assertNumQueries(1):
+            tasks = list(Task.objects.all())
+        self.assertFalse(Task.assigned_to.is_cached(tasks[0]))
+
+    def test_reassignment_invalidates_both_assignees(self):
+        task = Task.objects.get(pk=self.task.pk)
+        old_version = get_cache_version('user', self.user.id)
+        new_version = get_cache_version('user', self.member.id)
+        task.assigned_to = self.member
+        task.save()
+        self.assertNotEqual(get_cache_version('user', self.user.id), old_version)
+        self.assertNotEqual(get_cache_version('user', self.member.id), new_version)
+
+    def test_update_view_logs_field_and_status_changes(self):
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/tasks/{self.task.id}/update/', {
+                'title': 'Renamed', 'status': 'DONE', 'priority': self.task.priority,
+                'task_list': self.task_list.id, 'assigned_to': self.user.id,
+            })
+        update = ActivityLog.objects.get(action='UPDATE')
+        self.assertIn("changed title from 'Task' to 'Renamed'", update.description)
+        status_log = ActivityLog.objects.get(action='STATUS')
+        self.assertEqual((status_log.old_value, status_log.new_value), ('TODO', 'DONE'))
+
+class TaskBulkAPITest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.member = User.objects.create_user(username='member', password='testpass123')
+        self.other = User.objects.create_user(username='otheruser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.project.members.add(self.member)
+        self.task_list = TaskList.objects.create(name='List', project=self.project)
+        self.other_list = TaskList.objects.create(name='Other list', project=self.project, position=1)
+        self.tasks = [
+            Task.objects.create(
+                title=f'Task {i}', created_by=self.user, task_list=self.task_list,
+                position=(i + 1) * POSITION_GAP
+            )
+            for i in range(4)
+        ]
+
+    def _bulk_update(self, task_ids, **changes):
+        return self.client.post('/api/tasks/bulk-update/', {
+            'project': self.project.id, 'tasks': task_ids, **changes
+        }, format='json')
+
+    def test_bulk_update_in_one_statement(self):
+        task_ids = [task.id for task in self.tasks[:3]]
+        member_version = get_cache_version('user', self.member.id)
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self._bulk_update(task_ids, status='DONE', assigned_to=self.member.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 3)
+
+        self.assertEqual(
+            set(Task.objects.filter(id__in=task_ids).values_list('status', 'assigned_to')),
+            {('DONE', self.member.id)}
+        )
+        self.assertEqual(Task.objects.get(id=self.tasks[3].id).status, 'TODO')
+        self.assertNotEqual(get_cache_version('user', self.member.id), member_version)
+
+        sql = [q['sql'] for q in queries.captured_queries]
+        self.assertEqual(len([q for q in sql if q.startswith('UPDATE "tasks_task"')]), 1)
+        self.assertEqual(len([q for q in sql if q.startswith('INSERT INTO "tasks_activitylog"')]), 1)
+        self.assertEqual(ActivityLog.objects.filter(action='STATUS').count(), 3)
+        self.assertEqual(ActivityLog.objects.filter(action='ASSIGN', project=self.project).count(), 3)
+
+    def test_bulk_update_query_count_does_not_grow(self):
+        def count(task_ids, value):
+            with CaptureQueriesContext(connection) as queries:
+                self._bulk_update(task_ids, priority=value)
+            return len(queries)
+
+        count([self.tasks[0].id], 'LOW')  # warm the project access map
+        few = count([self.tasks[0].id], 'HIGH')
+        more = Task.objects.bulk_create([
+            Task(title=f'Bulk {i}', created_by=self.user, task_list=self.task_list) for i in range(20)
+        ])
+        self.assertEqual(count([task.id for task in more], 'HIGH'), few)
+
+    def test_bulk_update_validation(self):
+        foreign = Project.objects.create(name='Foreign', owner=self.other)
+        foreign_task = Task.objects.create(
+            title='Foreign', created_by=self.other,
+            task_list=TaskList.objects.create(name='List', project=foreign)
+        )
+        response = self.client.post('/api/tasks/bulk-update/', {
+            'project': foreign.id, 'tasks': [foreign_task.id], 'status': 'DONE'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self._bulk_update([self.tasks[0].id, foreign_task.id], status='DONE')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tasks', response.data)
+        self.assertEqual(self._bulk_update([self.tasks[0].id], assigned_to=self.other.id).status_code, 400)
+        self.assertEqual(self._bulk_update([self.tasks[0].id]).status_code, 400)
+        self.assertFalse(Task.objects.filter(status='DONE').exists())
+
+    def test_reorder_writes_only_moved_tasks(self):
+        order = [self.tasks[0].id, self.tasks[2].id, self.tasks[1].id, self.tasks[3].id]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/tasks/reorder/', {
+                'task_list': self.task_list.id, 'tasks': order
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data['positions']], order)
+        self.assertEqual(list(self.task_list.tasks.values_list('id', flat=True)), order)
+
+        # Only the moved task is written, into the gap before its new successor
+        update = next(q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "tasks_task"'))
+        self.assertIn(f'IN ({self.tasks[2].id})', update)
+        self.assertEqual(response.data['positions'][1]['position'], POSITION_GAP + POSITION_GAP // 2)
+
+    def test_reorder_moves_tasks_between_lists(self):
+        moved = Task.objects.create(title='Moved', created_by=self.user, task_list=self.other_list)
+        order = [moved.id] + [task.id for task in self.tasks]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/tasks/reorder/', {
+                'task_list': self.task_list.id, 'tasks': order
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(self.task_list.tasks.values_list('id', flat=True)), order)
+        self.assertEqual(ActivityLog.objects.get(task=moved).description, "Moved task 'Moved' to list 'List'")
+
+    def test_reorder_requires_the_whole_list(self):
+        response = self.client.post('/api/tasks/reorder/', {
+            'task_list': self.task_list.id, 'tasks': [task.id for task in self.tasks[1:]]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['missing'], [self.tasks[0].id])
+        response = self.client.post('/api/tasks/reorder/', {
+            'task_list': self.task_list.id, 'tasks': [self.tasks[0].id, self.tasks[0].id]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class GapOrderingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.task_list = TaskList.objects.create(name='List', project=self.project)
+
+    def _items(self, positions):
+        return [Task(id=i, position=position) for i, position in enumerate(positions)]
+
+    def test_apply_order_moves_one_item_into_a_gap(self):
+        a, b, c, d = self._items([1024, 2048, 3072, 4096])
+        self.assertEqual(apply_order([d, a, b, c]), [d])
+        self.assertEqual(d.position, 512)
+        a, b, c, d = self._items([1024, 2048, 3072, 4096])
+        self.assertEqual(len(apply_order([a, c, b, d])), 1)
+        self.assertTrue(a.position < c.position < b.position < d.position)
+
+    def test_apply_order_rebalances_when_the_gap_is_used_up(self):
+        a, b, c = self._items([1, 2, 3])
+        apply_order([a, c, b])
+        self.assertEqual([a.position, c.position, b.position], [POSITION_GAP, 2 * POSITION_GAP, 3 * POSITION_GAP])
+
+    def test_created_tasks_and_lists_are_appended(self):
+        ids = [
+            self.client.post('/api/tasks/', {'title': f'Task {i}', 'task_list': self.task_list.id}).data['id']
+            for i in range(2)
+        ]
+        self.assertEqual(
+            list(Task.objects.filter(id__in=ids).values_list('position', flat=True)),
+            [POSITION_GAP, 2 * POSITION_GAP]
+        )
+        response = self.client.post('/api/tasklists/', {'name': 'Second', 'project': self.project.id})
+        self.assertEqual(response.data['position'], POSITION_GAP)
+
+    def test_rebalance_command(self):
+        crowded = [
+            Task.objects.create(title=f'Task {i}', created_by=self.user, task_list=self.task_list, position=i)
+            for i in range(3)
+        ]
+        spaced = TaskList.objects.create(name='Spaced', project=self.project, position=POSITION_GAP)
+        Task.objects.create(title='Alone', created_by=self.user, task_list=spaced, position=5)
+        version = get_cache_version('project', self.project.id)
+
+        output = io.StringIO()
+        call_command('rebalance_positions', dry_run=True, stdout=output)
+        self.assertIn('1 task lists and 0 projects would be rebalanced', output.getvalue())
+
+        call_command('rebalance_positions', stdout=io.StringIO())
+        self.assertEqual(
+            list(self.task_list.tasks.values_list('id', 'position')),
+            [(task.id, (i + 1) * POSITION_GAP) for i, task in enumerate(crowded)]
+        )
+        self.assertEqual(spaced.tasks.get().position, 5)
+        self.assertNotEqual(get_cache_version('project', self.project.id), version)
+
+@unittest.skipUnless(connection.features.has_select_for_update, 'needs SELECT ... FOR UPDATE')
+class ConcurrentAppendTest(TransactionTestCase):
+    WORKERS = 8
+
+    def test_concurrent_appends_get_distinct_positions(self):
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        project = Project.objects.create(name='Test Project', owner=user)
+        task_list = TaskList.objects.create(name='List', project=project)
+        barrier = threading.Barrier(self.WORKERS)
+        errors = []
+
+        def worker(i):
+            client = APIClient()
+            client.force_authenticate(user=user)
+            try:
+                barrier.wait()
+                response = client.post('/api/tasks/', {'title': f'Task {i}', 'task_list': task_list.id})
+                if response.status_code != status.HTTP_201_CREATED:
+                    errors.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            sorted(task_list.tasks.values_list('position', flat=True)),
+            [(i + 1) * POSITION_GAP for i in range(self.WORKERS)]
+        )
+
+class TaskImportTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.member = User.objects.create_user(username='member', password='testpass123')
+        self.other = User.objects.create_user(username='otheruser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.project.members.add(self.member)
+        self.task_list = TaskList.objects.create(name='Backlog', project=self.project, position=POSITION_GAP)
+        Task.objects.create(title='Existing', created_by=self.user, task_list=self.task_list, position=POSITION_GAP)
+
+    def _upload(self, name, content, project=None):
+        return self.client.post(
+            f'/api/projects/{(project or self.project).id}/import/',
+            {'file': SimpleUploadedFile(name, content.encode())}, format='multipart'
+        )
+
+    def test_csv_import_reports_row_errors(self):
+        content = (
+            'ref,title,task_list,status,priority,assigned_to,due_date,dependencies\n'
+            'a,Design,Backlog,In Progress,HIGH,member,2030-01-15,\n'
+            'b,Build,Backlog,TODO,LOW,,,a\n'
+            'c,Ship,Release,DONE,,testuser,2030-02-01T10:00:00,a|b\n'
+            'd,Broken,Backlog,TODO,URGENT,,,\n'
+            'e,Stranger,Backlog,,,otheruser,,\n'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self._upload('tasks.csv', content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual([error['line'] for error in response.data['errors']], [5, 6])
+        self.assertIn('priority', response.data['errors'][0]['errors'])
+        self.assertIn('assigned_to', response.data['errors'][1]['errors'])
+
+        design = Task.objects.get(title='Design')
+        self.assertEqual((design.status, design.assigned_to_id), ('IN_PROGRESS', self.member.id))
+        self.assertEqual(design.position, 2 * POSITION_GAP)
+        ship = Task.objects.get(title='Ship')
+        self.assertEqual(ship.task_list.name, 'Release')
+        self.assertEqual(ship.task_list.position, 2 * POSITION_GAP)
+        self.assertEqual(
+            set(ship.dependencies.values_list('title', flat=True)), {'Design', 'Build'}
+        )
+        self.assertTrue(ActivityLog.objects.filter(action='CREATE', project=self.project).exists())
+
+    def test_unreadable_file_reports_the_rows_already_created(self):
+        # Well past the first chunk and the text decoder's first read, then invalid UTF-8
+        content = ('title,task_list\n' + ''.join(f'Task {i},Backlog\n' for i in range(1500))).encode()
+        upload = SimpleUploadedFile('tasks.csv', content + b'\xff\xfe,Backlog\n')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f'/api/projects/{self.project.id}/import/', {'file': upload}, format='multipart'
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Unreadable file', response.data['error'])
+        self.assertGreaterEqual(response.data['created'], 1000)
+        self.assertEqual(Task.objects.filter(title__startswith='Task ').count(), response.data['created'])
+        self.assertTrue(ActivityLog.objects.filter(action='CREATE', project=self.project).exists())
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tasks.csv')
+            with open(path, 'wb') as file:
+                file.write(content + b'\xff\xfe,Backlog\n')
+            with self.assertRaisesMessage(CommandError, 'Unreadable file'):
+                call_command('import_tasks', self.project.id, path, stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_import_queries_do_not_grow_with_rows(self):
+        def count(rows):
+            content = 'title,task_list\n' + ''.join(f'Task {i},Backlog\n' for i in range(rows))
+            with CaptureQueriesContext(connection) as queries:
+                response = self._upload('tasks.csv', content)
+            self.assertEqual(response.data['created'], rows)
+            return len(queries)
+
+        count(1)  # warm the project access map
+        self.assertEqual(count(5), count(50))
+
+    def test_command_imports_ndjson_in_chunks(self):
+        rows = [
+            {'ref': 'x', 'title': 'First', 'task_list': 'Backlog', 'dependencies': ['z']},
+            {'ref': 'y', 'title': 'Second', 'task_list': 'Backlog', 'dependencies': ['x']},
+            {'ref': 'z', 'title': 'Third', 'task_list': 'Backlog', 'dependencies': ['y']},
+            {'ref': 'w', 'title': 'Fourth', 'task_list': 'Backlog', 'dependencies': ['missing']},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tasks.ndjson.gz')
+            with gzip.open(path, 'wt') as archive:
+                archive.write('\n'.join(json.dumps(row) for row in rows) + '\n{not json\n')
+            output, errors = io.StringIO(), io.StringIO()
+            call_command(
+                'import_tasks', self.project.id, path, chunk_size=2, user='member',
+                stdout=output, stderr=errors
+            )
+        self.assertIn('Imported 4 tasks', output.getvalue())
+        self.assertIn('line 5:', errors.getvalue())
+        # x -> z and y -> x are imported; z -> y would close the cycle and is reported
+        self.assertIn("line 3: {'dependencies'", errors.getvalue())
+        self.assertIn("Unknown dependency ref 'missing'", errors.getvalue())
+        first = Task.objects.get(title='First')
+        self.assertEqual(first.created_by, self.member)
+        self.assertEqual(list(first.dependencies.values_list('title', flat=True)), ['Third'])
+        self.assertFalse(Task.objects.get(title='Third').dependencies.exists())
+
+    def test_import_requires_project_access(self):
+        foreign = Project.objects.create(name='Foreign', owner=self.other)
+        response = self._upload('tasks.csv', 'title,task_list\nTask,Backlog\n', project=foreign)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(user=self.member)
+        self.assertEqual(self._upload('tasks.csv', 'title,task_list\nTask,Backlog\n').data['created'], 1)
+
+class ProjectExportTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.other = User.objects.create_user(username='otheruser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        task_list = TaskList.objects.create(name='List', project=self.project)
+        self.first = Task.objects.create(title='First', created_by=self.user, task_list=task_list, position=1)
+        self.second = Task.objects.create(
+            title='Second', created_by=self.user, task_list=task_list, position=2, assigned_to=self.user
+        )
+        self.second.dependencies.add(self.first)
+        Comment.objects.create(task=self.first, author=self.user, content='Hello')
+        other_project = Project.objects.create(name='Other', owner=self.user)
+        Task.objects.create(
+            title='Elsewhere', created_by=self.user,
+            task_list=TaskList.objects.create(name='List', project=other_project)
+        )
+
+    def _records(self, content):
+        return [json.loads(line) for line in content.decode().splitlines()]
+
+    def test_export_streams_every_record(self):
+        response = self.client.get(f'/api/projects/{self.project.id}/export/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        records = self._records(b''.join(response.streaming_content))
+        self.assertEqual(
+            [record['type'] for record in records],
+            ['project', 'task_list', 'task', 'task', 'dependency', 'comment']
+        )
+        self.assertEqual([r['title'] for r in records if r['type'] == 'task'], ['First', 'Second'])
+        self.assertEqual(records[3]['assigned_to__username'], 'testuser')
+        self.assertEqual(records[4], {'type': 'dependency', 'from_task_id': self.second.id, 'to_task_id': self.first.id})
+        self.assertEqual(records[5]['content'], 'Hello')
+
+    def test_export_queries_do_not_grow_with_rows(self):
+        def count():
+            with CaptureQueriesContext(connection) as queries:
+                b''.join(self.client.get(f'/api/projects/{self.project.id}/export/').streaming_content)
+            return len(queries)
+
+        count()  # warm the project access map
+        before = count()
+        Comment.objects.bulk_create([
+            Comment(task=self.second, author=self.user, content=f'Comment {i}') for i in range(50)
+        ])
+        self.assertEqual(count(), before)
+
+    def test_gzip_export_and_command(self):
+        response = self.client.get(f'/api/projects/{self.project.id}/export/', {'compress': 'gzip'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        compressed = self._records(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual(len(compressed), 6)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'project.ndjson.gz')
+            call_command('export_project', self.project.id, output=path, stderr=io.StringIO())
+            with gzip.open(path, 'rb') as archive:
+                self.assertEqual(self._records(archive.read()), compressed)
+
+    def test_export_requires_project_access(self):
+        self.client.force_authenticate(user=self.other)
+        response = self.client.get(f'/api/projects/{self.project.id}/export/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class SparseFieldsetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.member = User.objects.create_user(username='member', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Test Project', owner=self.user)
+        self.project.members.add(self.member)
+        self.task_list = TaskList.objects.create(name='List', project=self.project)
+        for i in range(3):
+            task = Task.objects.create(title=f'Task {i}', created_by=self.user, task_list=self.task_list)
+            Comment.objects.create(task=task, author=self.member, content='A comment')
+        # warm the project access map
+        self.client.get('/api/projects/', {'fields': 'id'})
+
+    def _get(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data, [q['sql'] for q in queries.captured_queries]
+
+    def test_project_list_is_shallow(self):
+        data, queries = self._get('/api/projects/')
+        project = data['results'][0]
+        self.assertNotIn('task_lists', project)
+        self.assertNotIn('members', project)
+        self.assertEqual((project['member_count'], project['task_list_count']), (1, 1))
+        self.assertEqual(project['owner']['username'], 'testuser')
+        self.assertFalse([q for q in queries if '"tasks_task"' in q])
+
+    def test_expand_adds_nested_fields(self):
+        data, _ = self._get('/api/projects/', {'expand': 'task_lists,members'})
+        project = data['results'][0]
+        self.assertEqual([member['username'] for member in project['members']], ['member'])
+        self.assertEqual(len(project['task_lists'][0]['tasks']), 3)
+
+    def test_detail_keeps_the_full_representation(self):
+        data, _ = self._get(f'/api/projects/{self.project.id}/')
+        self.assertEqual(len(data['task_lists'][0]['tasks'][0]['comments']), 1)
+        self.assertEqual(data['members'][0]['username'], 'member')
+
+    def test_fields_select_nested_fields_and_skip_their_queries(self):
+        data, queries = self._get(f'/api/projects/{self.project.id}/', {'fields': 'id,task_lists.name'})
+        self.assertEqual(data, {'id': self.project.id, 'task_lists': [{'name': 'List'}]})
+        self.assertFalse([q for q in queries if '"tasks_task"' in q or 'COUNT(' in q])
+
+        data, queries = self._get('/api/tasks/', {'fields': 'id,title'})
+        self.assertEqual(set(data['results'][0]), {'id', 'title'})
+        # Only the keyset page: no comment, attachment or dependency prefetches
+        self.assertEqual(len(queries), 1)
+
+        data, queries = self._get('/api/tasks/', {'fields': 'id,comments.content,comments.author.username'})
+        self.assertEqual(data['results'][0]['comments'], [{'content': 'A comment', 'author': {'username': 'member'}}])
+        self.assertEqual(len(queries), 2)
+
+    def test_writes_ignore_sparse_parameters(self):
+        response = self.client.post('/api/projects/?fields=id', {'name': 'New'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['name'], 'New')
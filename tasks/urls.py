@@ -14,6 +14,7 @@ router.register(r'tasklists', views.TaskListViewSet, basename='tasklist')
 router.register(r'tasks', views.TaskViewSet, basename='task')
 router.register(r'comments', views.CommentViewSet, basename='comment')
 router.register(r'attachments', views.TaskAttachmentViewSet, basename='attachment')
+router.register(r'activity', views.ActivityLogViewSet, basename='activity')
 
 urlpatterns = [
     # API routes
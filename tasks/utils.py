@@ -1,73 +1,189 @@
 from django.core.cache import cache
 from django.conf import settings
+from django.db import models
 from django.utils.encoding import force_str
+from collections import Counter
+import functools
 import hashlib
+import random
 import time
 
-def generate_cache_key(prefix, args=None, kwargs=None):
-    """Generate a unique cache key based on the prefix and arguments"""
-    h = hashlib.md5()
-    
+# Marker for cache misses, so that None can be cached like any other value
+_MISSING = object()
+
+# How often a worker waiting on another worker's recomputation polls the cache
+LOCK_POLL_INTERVAL = 0.05
+
+def _cache_key_part(value):
+    """Cheap, stable key fragment; model instances contribute only their label and pk"""
+    if isinstance(value, models.Model):
+        return f"{value._meta.label_lower}:{value.pk}"
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return str(value)
+    return force_str(value)
+
+def generate_cache_key(prefix, args=None, kwargs=None, versions=()):
+    """
+    Generate a unique cache key based on the prefix and arguments. The key
+    also carries the prefix version bumped by invalidate_cache and the version
+    of every (scope, object_id) pair in `versions`, all read in one round trip.
+    """
     # Add prefix to key
     key_parts = [prefix]
     
     # Add args to key if provided
     if args:
         for arg in args:
-            key_parts.append(force_str(arg))
+            key_parts.append(_cache_key_part(arg))
     
     # Add kwargs to key if provided
     if kwargs:
         for k, v in sorted(kwargs.items()):
-            key_parts.append(f"{k}={force_str(v)}")
+            key_parts.append(f"{k}={_cache_key_part(v)}")
     
     key_string = ":".join(key_parts)
-    h.update(key_string.encode('utf-8'))
+    digest = hashlib.md5(key_string.encode('utf-8'), usedforsecurity=False).hexdigest()
     
-    # Add version to the key
     version = getattr(settings, 'CACHE_VERSION', 1)
-    return f"{prefix}:{h.hexdigest()}:{version}"
+    scope_versions = get_cache_versions([('prefix', prefix), *versions])
+    return ":".join([prefix, digest, str(version), *map(str, scope_versions)])
+
+def cache_result(timeout=300, prefix=None, stale_ttl=60, jitter=0.1, lock_timeout=10, versions=None):
+    """
+    Decorator for caching function results.
+
+    - None results are cached like any other value (negative caching).
+    - The timeout is jittered by +/- jitter so that hot keys do not expire together.
+    - Once an entry is older than its timeout it is still served for up to
+      stale_ttl seconds while a single worker recomputes it.
+    - On a miss only the worker holding the lock recomputes; the others wait up
+      to lock_timeout seconds for its result instead of hitting the database.
+    - versions(*args, **kwargs) may return (scope, object_id) pairs, e.g.
+      [('project', project_id)]; entries go stale when one of them is bumped.
 
-def cache_result(timeout=300, prefix=None):
-    """Decorator for caching function results"""
+    Per-process counters are exposed as wrapper.cache_stats.
+    """
     def decorator(func):
-        def wrapper(*args, **kwargs):
-            # Generate a unique cache key
-            cache_prefix = prefix or f"cache:{func.__module__}:{func.__name__}"
-            cache_key = generate_cache_key(cache_prefix, args, kwargs)
-            
-            # Try to get the result from cache
-            result = cache.get(cache_key)
-            
-            # If not in cache, call the function and cache the result
-            if result is None:
-                result = func(*args, **kwargs)
-                cache.set(cache_key, result, timeout)
-            
+        cache_prefix = prefix or f"cache:{func.__module__}:{func.__qualname__}"
+        stats = Counter()
+
+        def recompute(cache_key, args, kwargs):
+            stats['recomputes'] += 1
+            result = func(*args, **kwargs)
+            fresh_for = timeout * random.uniform(1 - jitter, 1 + jitter)
+            cache.set(cache_key, (result, time.time() + fresh_for), fresh_for + stale_ttl)
             return result
+
+        def make_key(args, kwargs):
+            scopes = versions(*args, **kwargs) if versions else ()
+            return generate_cache_key(cache_prefix, args, kwargs, scopes)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = make_key(args, kwargs)
+            lock_key = f"{cache_key}:lock"
+            entry = cache.get(cache_key, _MISSING)
+
+            if entry is not _MISSING:
+                result, fresh_until = entry
+                if time.time() < fresh_until:
+                    stats['hits'] += 1
+                    return result
+
+                # Stale: one worker refreshes it, everybody else keeps serving the old value
+                stats['stale_hits'] += 1
+                if cache.add(lock_key, 1, lock_timeout):
+                    try:
+                        return recompute(cache_key, args, kwargs)
+                    finally:
+                        cache.delete(lock_key)
+                return result
+
+            stats['misses'] += 1
+            if cache.add(lock_key, 1, lock_timeout):
+                try:
+                    return recompute(cache_key, args, kwargs)
+                finally:
+                    cache.delete(lock_key)
+
+            # Another worker is rebuilding this key, so wait for its result
+            stats['lock_waits'] += 1
+            deadline = time.time() + lock_timeout
+            while time.time() < deadline:
+                time.sleep(LOCK_POLL_INTERVAL)
+                entry = cache.get(cache_key, _MISSING)
+                if entry is not _MISSING:
+                    return entry[0]
+
+            # The lock holder is gone or too slow; compute the value ourselves
+            return recompute(cache_key, args, kwargs)
+
+        wrapper.cache_stats = stats
+        wrapper.cache_key = lambda *args, **kwargs: make_key(args, kwargs)
         return wrapper
     return decorator
 
 def invalidate_cache(prefix):
-    """Invalidate all cache entries with the given prefix"""
-    # This is a simplistic implementation - in production with Redis, 
-    # you'd use pattern matching to find and delete keys
-    if hasattr(cache, 'delete_pattern'):
-        # Redis-specific implementation
-        cache.delete_pattern(f"{prefix}:*")
-    else:
-        # Fallback for other cache backends - less efficient
-        # For a real implementation, consider using a registry of keys
-        pass
+    """
+    Invalidate all cache entries generated with the given prefix. Works on every
+    backend by bumping the prefix version instead of deleting keys by pattern;
+    the orphaned entries simply expire.
+    """
+    bump_cache_version('prefix', prefix)
 
 def task_cache_key(task_id):
-    """Generate a cache key for a specific task"""
-    return f"task:{task_id}:{settings.CACHE_VERSION}"
+    """Generate a cache key for a specific task, scoped to its current version"""
+    version = get_cache_version('task', task_id)
+    return f"task:{task_id}:{settings.CACHE_VERSION}:{version}"
 
 def project_cache_key(project_id):
-    """Generate a cache key for a specific project"""
-    return f"project:{project_id}:{settings.CACHE_VERSION}"
+    """Generate a cache key for a specific project, scoped to its current version"""
+    version = get_cache_version('project', project_id)
+    return f"project:{project_id}:{settings.CACHE_VERSION}:{version}"
 
 def user_tasks_cache_key(user_id):
-    """Generate a cache key for a user's tasks"""
-    return f"user:{user_id}:tasks:{settings.CACHE_VERSION}"
\ No newline at end of file
+    """Generate a cache key for a user's tasks, scoped to the user's current version"""
+    version = get_cache_version('user', user_id)
+    return f"user:{user_id}:tasks:{settings.CACHE_VERSION}:{version}"
+
+def user_projects_cache_key(user_id):
+    """Generate a cache key for the projects a user can access, scoped to the user's current version"""
+    version = get_cache_version('user', user_id)
+    return f"user:{user_id}:projects:{settings.CACHE_VERSION}:{version}"
+
+def get_cache_version(scope, object_id):
+    """
+    Return the version counter for a cached scope, e.g. ('dependency_graph', 42).
+    Keys built from the version go stale in O(1) when the counter is bumped.
+    """
+    key = f"version:{scope}:{object_id}"
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so that a lost counter never revives stale entries
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, time.time_ns())
+    return version
+
+def get_cache_versions(scopes):
+    """Return the versions of several (scope, object_id) pairs with a single get_many"""
+    keys = [f"version:{scope}:{object_id}" for scope, object_id in scopes]
+    found = cache.get_many(keys)
+    return [
+        found[key] if key in found else get_cache_version(scope, object_id)
+        for key, (scope, object_id) in zip(keys, scopes)
+    ]
+
+def bump_cache_version(scope, object_id):
+    """Invalidate every key built from the scope's version counter"""
+    key = f"version:{scope}:{object_id}"
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(key, version, None)
+        return version
+
+def dependency_graph_cache_key(project_id):
+    """Generate a cache key for a project's dependency graph summary"""
+    version = get_cache_version('dependency_graph', project_id)
+    return f"project:{project_id}:dependency_graph:{settings.CACHE_VERSION}:{version}"
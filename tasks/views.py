@@ -1,13 +1,18 @@
 # views.py
+import io
 from rest_framework import viewsets, permissions, filters, status, generics
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound
+from rest_framework.parsers import MultiPartParser
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q, Count, Case, When, IntegerField, F, Avg
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.cache import cache
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.core.mail import send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
@@ -19,11 +24,12 @@ from .models import (
     EmailVerification
 )
 from .serializers import (
-    ProjectSerializer, TaskListSerializer, TaskSerializer,
-    CommentSerializer, TaskAttachmentSerializer, UserSerializer
+    ProjectSerializer, ProjectListSerializer, TaskListSerializer, TaskSerializer,
+    CommentSerializer, TaskAttachmentSerializer, UserSerializer, TaskSummarySerializer,
+    ActivityLogSerializer, TaskReorderSerializer
 )
-from .forms import CustomUserCreationForm
-from .filters import ProjectFilter, TaskListFilter, TaskFilter
+from .forms import CustomUserCreationForm, TaskBulkUpdateForm
+from .filters import ProjectFilter, TaskListFilter, TaskFilter, ActivityLogFilter
 from .permissions import (
     IsOwnerOrReadOnly, IsProjectOwnerOrMember, IsTaskListProjectOwnerOrMember,
     IsTaskProjectOwnerOrMember, IsCommentAuthorOrProjectMember, IsAttachmentUploaderOrProjectMember
@@ -32,6 +38,18 @@ from .throttling import (
     LoginRateThrottle, RegistrationRateThrottle,
     ProjectDetailRateThrottle, TaskDetailRateThrottle
 )
+from .utils import project_cache_key
+from .access import get_project_access, project_scope_q, scope_to_projects
+from .activity import activity_batch, log_activity
+from .ordering import append_position, apply_order, lock_parent
+from .pagination import KeysetPagination
+from .exporters import export_activity_log, export_project
+from .importers import csv_rows, import_tasks, ndjson_rows
+from .graph import DependencyGraph, get_project_dependency_summary
+from .metrics import (
+    get_project_metrics, get_user_task_summary,
+    USER_SUMMARY_BUCKET_LIMIT, USER_SUMMARY_MAX_BUCKET_LIMIT
+)
 
 # User Registration and Management Views
 class UserRegisterView(generics.CreateAPIView):
@@ -62,12 +80,21 @@ class ProjectViewSet(viewsets.ModelViewSet):
     filterset_class = ProjectFilter
     search_fields = ['name', 'description']
     ordering_fields = ['created_at', 'name']
+    # Explicit, since Meta.ordering is dropped from the grouped list queries
+    ordering = ['-created_at', 'id']
     throttle_classes = [ProjectDetailRateThrottle]
 
+    def get_serializer_class(self):
+        # Lists are shallow: members and task lists are only added with ?expand=
+        if self.action == 'list':
+            return ProjectListSerializer
+        return ProjectSerializer
+
     def get_queryset(self):
-        return Project.objects.filter(
-            Q(owner=self.request.user) | Q(members=self.request.user)
-        ).distinct()
+        queryset = scope_to_projects(Project.objects.all(), self.request, 'id')
+        if self.action in ('list', 'retrieve'):
+            queryset = ProjectSerializer.setup_eager_loading(queryset, self.get_serializer().fields)
+        return queryset
 
     @action(detail=True, methods=['post'])
     def add_member(self, request, pk=None):
@@ -80,6 +107,65 @@ class ProjectViewSet(viewsets.ModelViewSet):
         except User.DoesNotExist:
             return Response({'error': 'user not found'}, status=404)
 
+    @action(
+        detail=True, methods=['post'], url_path='import', parser_classes=[MultiPartParser],
+        permission_classes=[permissions.IsAuthenticated, IsProjectOwnerOrMember]
+    )
+    def import_tasks(self, request, pk=None):
+        """
+        Import tasks from an uploaded CSV or NDJSON `file` (chosen with ?input=,
+        or by the file extension). Valid rows are created; the others are
+        reported with their line number. A file that cannot be decoded part way
+        is a 400 that still carries the summary of the rows created before it.
+        """
+        project = self.get_object()
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        input_format = request.query_params.get('input') or (
+            'csv' if upload.name.lower().endswith('.csv') else 'ndjson'
+        )
+        if input_format not in ('csv', 'ndjson'):
+            return Response({'error': 'input must be csv or ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+
+        reader = csv_rows if input_format == 'csv' else ndjson_rows
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='' if input_format == 'csv' else None)
+        result = import_tasks(project, request.user, reader(lines))
+        if 'read_error' in result:
+            return Response(
+                {'error': result.pop('read_error'), **result}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(result)
+
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """
+        Stream the project with its task lists, tasks, dependencies and comments
+        as NDJSON records, gzip-compressed with ?compress=gzip
+        """
+        project = self.get_object()
+        compress = request.query_params.get('compress')
+        if compress not in (None, 'gzip'):
+            return Response({'error': 'compress must be gzip'}, status=status.HTTP_400_BAD_REQUEST)
+
+        content_type = 'application/gzip' if compress else 'application/x-ndjson'
+        response = StreamingHttpResponse(export_project(project, compress=bool(compress)), content_type=content_type)
+        extension = 'ndjson.gz' if compress else 'ndjson'
+        response['Content-Disposition'] = f'attachment; filename="project-{project.id}.{extension}"'
+        return response
+
+    @action(detail=True, methods=['get'])
+    def dependency_graph(self, request, pk=None):
+        """Get the whole dependency DAG with topological order, critical path and blockers"""
+        project = self.get_object()
+        summary = get_project_dependency_summary(project.id, access=get_project_access(request))
+        if summary['cycle']:
+            return Response(
+                {'error': 'dependency graph contains a cycle', 'cycle': summary['cycle']},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(summary)
+
 class TaskListViewSet(viewsets.ModelViewSet):
     serializer_class = TaskListSerializer
     permission_classes = [permissions.IsAuthenticated, IsTaskListProjectOwnerOrMember]
@@ -89,11 +175,8 @@ class TaskListViewSet(viewsets.ModelViewSet):
     ordering_fields = ['position', 'created_at']
 
     def get_queryset(self):
-        return TaskList.objects.filter(
-            project__in=Project.objects.filter(
-                Q(owner=self.request.user) | Q(members=self.request.user)
-            )
-        )
+        queryset = scope_to_projects(TaskList.objects.all(), self.request)
+        return TaskListSerializer.setup_eager_loading(queryset, self.get_serializer().fields)
 
 class TaskViewSet(viewsets.ModelViewSet):
     serializer_class = TaskSerializer
@@ -102,14 +185,14 @@ class TaskViewSet(viewsets.ModelViewSet):
     filterset_class = TaskFilter
     search_fields = ['title', 'description']
     ordering_fields = ['due_date', 'priority', 'status', 'position']
+    # Matches the (task_list, position) index; pages are fetched by keyset
+    ordering = ['task_list_id', 'position']
+    pagination_class = KeysetPagination
     throttle_classes = [TaskDetailRateThrottle]
 
     def get_queryset(self):
-        return Task.objects.filter(
-            task_list__project__in=Project.objects.filter(
-                Q(owner=self.request.user) | Q(members=self.request.user)
-            )
-        )
+        queryset = scope_to_projects(Task.objects.all(), self.request, 'task_list__project_id')
+        return TaskSerializer.setup_eager_loading(queryset, self.get_serializer().fields)
 
     @action(detail=True, methods=['post'])
     def assign(self, request, pk=None):
@@ -126,10 +209,136 @@ class TaskViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def update_position(self, request, pk=None):
         task = self.get_object()
-        new_position = request.data.get('position')
+        try:
+            new_position = int(request.data.get('position'))
+        except (TypeError, ValueError):
+            return Response({'error': 'position must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
         task.position = new_position
         task.save()
         return Response({'status': 'position updated'})
+
+    @action(detail=False, methods=['post'], url_path='bulk-update')
+    def bulk_update_tasks(self, request):
+        """Apply a status, priority and/or assignee change to several tasks of a project at once"""
+        project_id = request.data.get('project')
+        if not str(project_id).isdigit() or not get_project_access(request).can_access(int(project_id)):
+            raise NotFound('Project not found')
+        project = Project.objects.get(id=project_id)
+
+        form = TaskBulkUpdateForm(request.data, project=project)
+        if not form.is_valid():
+            return Response(form.errors, status=status.HTTP_400_BAD_REQUEST)
+        updates = {
+            field: form.cleaned_data[field] for field in ('status', 'priority', 'assigned_to')
+            if form.cleaned_data[field]
+        }
+        if not updates:
+            return Response(
+                {'error': 'Provide at least one of status, priority or assigned_to'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        status_labels = dict(Task.STATUS_CHOICES)
+        priority_labels = dict(Task.PRIORITY_CHOICES)
+        with transaction.atomic(), activity_batch():
+            tasks = list(
+                form.cleaned_data['tasks'].select_related('assigned_to').select_for_update(of=('self',))
+            )
+            for task in tasks:
+                if 'status' in updates and task.status != updates['status']:
+                    log_activity(
+                        request.user.id, 'STATUS', task_id=task.id, project_id=project.id,
+                        description=f"Changed status from '{status_labels[task.status]}' to '{status_labels[updates['status']]}'",
+                        old_value=task.status, new_value=updates['status']
+                    )
+                    task.status = updates['status']
+                if 'priority' in updates and task.priority != updates['priority']:
+                    log_activity(
+                        request.user.id, 'UPDATE', task_id=task.id, project_id=project.id,
+                        description=(
+                            f"Updated task '{task.title}': changed priority from "
+                            f"'{priority_labels[task.priority]}' to '{priority_labels[updates['priority']]}'"
+                        ),
+                        old_value=f"priority: {priority_labels[task.priority]}",
+                        new_value=f"priority: {priority_labels[updates['priority']]}"
+                    )
+                    task.priority = updates['priority']
+                if 'assigned_to' in updates and task.assigned_to_id != updates['assigned_to'].id:
+                    previous = task.assigned_to.username if task.assigned_to else 'Nobody'
+                    log_activity(
+                        request.user.id, 'ASSIGN', task_id=task.id, project_id=project.id,
+                        description=f"Assigned task from '{previous}' to '{updates['assigned_to'].username}'",
+                        old_value=previous, new_value=updates['assigned_to'].username
+                    )
+                    task.assigned_to = updates['assigned_to']
+            updated = Task.objects.bulk_update_changed(tasks, list(updates))
+
+        return Response({
+            'updated': updated,
+            'tasks': [
+                {
+                    'id': task.id, 'status': task.status, 'priority': task.priority,
+                    'assigned_to': task.assigned_to_id, 'task_list': task.task_list_id,
+                    'position': task.position,
+                }
+                for task in tasks
+            ],
+        })
+
+    @action(detail=False, methods=['post'])
+    def reorder(self, request):
+        """
+        Set the order of a task list from the complete list of its task ids.
+        Tasks of other lists in the same project are moved into the list.
+        Tasks that are already in order keep their position, so moving one
+        task writes one row.
+        """
+        serializer = TaskReorderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        task_list = serializer.validated_data['task_list']
+        task_ids = serializer.validated_data['tasks']
+        if not get_project_access(request).can_access(task_list.project_id):
+            raise NotFound('Task list not found')
+
+        with transaction.atomic(), activity_batch():
+            lock_parent(task_list)
+            tasks = {
+                task.id: task for task in Task.objects.select_for_update().filter(
+                    Q(task_list=task_list) | Q(id__in=task_ids, task_list__project_id=task_list.project_id)
+                )
+            }
+            unknown = set(task_ids) - tasks.keys()
+            missing = {
+                task.id for task in tasks.values() if task.task_list_id == task_list.id
+            } - set(task_ids)
+            if unknown or missing:
+                errors = {}
+                if unknown:
+                    errors['unknown'] = sorted(unknown)
+                if missing:
+                    errors['missing'] = sorted(missing)
+                return Response(
+                    {'error': 'tasks must list every task of the list, and only tasks of its project', **errors},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            ordered = [tasks[task_id] for task_id in task_ids]
+            for task in ordered:
+                if task.task_list_id != task_list.id:
+                    log_activity(
+                        request.user.id, 'UPDATE', task_id=task.id, project_id=task_list.project_id,
+                        description=f"Moved task '{task.title}' to list '{task_list.name}'"
+                    )
+                    task.task_list = task_list
+                    # Positions from another list say nothing about this one
+                    task.position = None
+            apply_order(ordered)
+            Task.objects.bulk_update_changed(ordered, ['task_list', 'position'])
+
+        return Response({
+            'task_list': task_list.id,
+            'positions': [{'id': task_id, 'position': tasks[task_id].position} for task_id in task_ids],
+        })
     
     @action(detail=True, methods=['post'])
     def add_dependency(self, request, pk=None):
@@ -141,7 +350,7 @@ class TaskViewSet(viewsets.ModelViewSet):
             return Response({'error': 'dependency_id is required'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            dependency = Task.objects.get(id=dependency_id)
+            dependency = scope_to_projects(Task.objects.all(), request, 'task_list__project_id').get(id=dependency_id)
             
             # Check for circular dependencies
             if dependency.id == task.id:
@@ -150,9 +359,11 @@ class TaskViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
                 
-            if dependency.dependencies.filter(id=task.id).exists():
+            graph = DependencyGraph.for_tasks([task.id, dependency.id])
+            cycle = graph.cycle_for_edge(task.id, dependency.id)
+            if cycle:
                 return Response(
-                    {'error': 'This would create a circular dependency'},
+                    {'error': 'This would create a circular dependency', 'cycle': cycle},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
@@ -178,7 +389,7 @@ class TaskViewSet(viewsets.ModelViewSet):
             return Response({'error': 'dependency_id is required'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            dependency = Task.objects.get(id=dependency_id)
+            dependency = scope_to_projects(Task.objects.all(), request, 'task_list__project_id').get(id=dependency_id)
             if task.dependencies.filter(id=dependency.id).exists():
                 task.dependencies.remove(dependency)
                 return Response({
@@ -194,10 +405,10 @@ class TaskViewSet(viewsets.ModelViewSet):
     def dependencies(self, request, pk=None):
         """Get all dependencies for this task"""
         task = self.get_object()
-        dependencies = task.dependencies.all()
+        dependencies = TaskSerializer.setup_eager_loading(task.dependencies.all())
         serializer = TaskSerializer(dependencies, many=True, context={'request': request})
         return Response({
-            'is_blocked': task.is_blocked(),
+            'is_blocked': any(dep['status'] != 'DONE' for dep in serializer.data),
             'dependencies': serializer.data
         })
     
@@ -205,31 +416,66 @@ class TaskViewSet(viewsets.ModelViewSet):
     def dependent_tasks(self, request, pk=None):
         """Get all tasks that depend on this task"""
         task = self.get_object()
-        dependent_tasks = task.dependent_tasks.all()
+        dependent_tasks = TaskSerializer.setup_eager_loading(task.dependent_tasks.all())
         serializer = TaskSerializer(dependent_tasks, many=True, context={'request': request})
         return Response(serializer.data)
 
 class CommentViewSet(viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated, IsCommentAuthorOrProjectMember]
+    # Filtered by task, the (task, created_at) index serves the keyset pages
+    filterset_fields = ['task']
+    ordering = ['-created_at']
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        return Comment.objects.filter(
-            task__task_list__project__in=Project.objects.filter(
-                Q(owner=self.request.user) | Q(members=self.request.user)
-            )
-        )
+        # The project id is annotated from the join the filter needs anyway,
+        # so that the object permission check does not walk task -> task list
+        return scope_to_projects(
+            Comment.objects.all(), self.request, 'task__task_list__project_id'
+        ).select_related('author').annotate(project_id=F('task__task_list__project_id'))
 
 class TaskAttachmentViewSet(viewsets.ModelViewSet):
     serializer_class = TaskAttachmentSerializer
     permission_classes = [permissions.IsAuthenticated, IsAttachmentUploaderOrProjectMember]
 
     def get_queryset(self):
-        return TaskAttachment.objects.filter(
-            task__task_list__project__in=Project.objects.filter(
-                Q(owner=self.request.user) | Q(members=self.request.user)
-            )
-        )
+        return scope_to_projects(
+            TaskAttachment.objects.all(), self.request, 'task__task_list__project_id'
+        ).select_related('uploaded_by').annotate(project_id=F('task__task_list__project_id'))
+
+class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Activity of the projects the user can access, newest first. Filter with
+    ?project=, ?task=, ?user=, ?action= and the ?since= / ?until= time range.
+    """
+    serializer_class = ActivityLogSerializer
+    filterset_class = ActivityLogFilter
+    ordering_fields = ['timestamp']
+    ordering = ['-timestamp']
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        # Logs are visible through their project or their task's project
+        accessible_tasks = scope_to_projects(
+            Task.objects.all(), self.request, 'task_list__project_id'
+        ).values('id')
+        return ActivityLog.objects.filter(
+            project_scope_q(self.request) | Q(task_id__in=accessible_tasks)
+        ).select_related('user')
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream the filtered activity log as NDJSON (default) or CSV with ?output=csv"""
+        output = request.query_params.get('output', 'ndjson')
+        if output not in ('ndjson', 'csv'):
+            return Response({'error': 'output must be ndjson or csv'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        content_type = 'text/csv' if output == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(export_activity_log(queryset, output), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="activity.{output}"'
+        return response
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
@@ -239,152 +485,58 @@ def project_metrics(request, project_id):
     """
     try:
         # Fix: Using filter with a Q object and then get the first object
-        project = Project.objects.filter(
-            id=project_id
-        ).filter(
-            Q(owner=request.user) | Q(members=request.user)
-        ).first()
+        project = None
+        if get_project_access(request).can_access(int(project_id)):
+            project = Project.objects.filter(id=project_id).only('id', 'name').first()
         
         if not project:
             return Response({"error": "Project not found"}, status=status.HTTP_404_NOT_FOUND)
     except Exception:
         return Response({"error": "Project not found"}, status=status.HTTP_404_NOT_FOUND)
     
-    # Get all tasks for this project
-    tasks = Task.objects.filter(task_list__project=project)
-    
-    # Count tasks by status
-    status_counts = tasks.values('status').annotate(count=Count('status'))
-    
-    # Count tasks by priority
-    priority_counts = tasks.values('priority').annotate(count=Count('priority'))
-    
-    # Count tasks by assigned user
-    assigned_counts = tasks.values(
-        'assigned_to__username', 
-        'assigned_to__id'
-    ).annotate(count=Count('assigned_to'))
-    
-    # Calculate overdue tasks
-    overdue_count = tasks.filter(
-        status__in=['TODO', 'IN_PROGRESS', 'REVIEW'],
-        due_date__lt=timezone.now()
-    ).count()
-    
-    # Calculate completion rate
-    total_tasks = tasks.count()
-    completed_tasks = tasks.filter(status='DONE').count()
-    completion_rate = (completed_tasks / total_tasks) * 100 if total_tasks > 0 else 0
-    
-    # Count tasks due in the next week
-    upcoming_tasks = tasks.filter(
-        due_date__gte=timezone.now(),
-        due_date__lte=timezone.now() + timezone.timedelta(days=7)
-    ).count()
-    
-    # Average time to completion (for completed tasks with created_at)
-    completed_tasks_with_dates = tasks.filter(
-        status='DONE'
-    ).exclude(updated_at=None)
-    
-    avg_completion_days = 0
-    if completed_tasks_with_dates.exists():
-        avg_completion_time_seconds = completed_tasks_with_dates.annotate(
-            completion_time=F('updated_at') - F('created_at')
-        ).aggregate(avg=Avg('completion_time'))['avg'].total_seconds()
-        avg_completion_days = avg_completion_time_seconds / (60 * 60 * 24)
-    
+    # Served from the project's metrics summary, recomputed once per project version
     return Response({
         "project_name": project.name,
-        "total_tasks": total_tasks,
-        "status_breakdown": status_counts,
-        "priority_breakdown": priority_counts,
-        "assigned_user_breakdown": assigned_counts,
-        "overdue_tasks": overdue_count,
-        "completion_rate": completion_rate,
-        "upcoming_tasks": upcoming_tasks,
-        "avg_completion_days": round(avg_completion_days, 1),
+        **get_project_metrics(project.id),
     })
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def user_task_summary(request):
     """
-    Get a summary of tasks for the current user
+    Get a summary of tasks for the current user. Each bucket reports its full
+    count and at most `limit` compact task rows.
     """
-    # Get all projects the user is a member of or owns
-    projects = Project.objects.filter(
-        Q(owner=request.user) | Q(members=request.user)
-    )
-    
-    # Get all tasks assigned to the user
-    assigned_tasks = Task.objects.filter(
-        assigned_to=request.user,
-        task_list__project__in=projects
-    )
-    
-    # Get assigned tasks by status
-    assigned_by_status = assigned_tasks.values('status').annotate(count=Count('status'))
-    
-    # Get overdue tasks
-    overdue_tasks = assigned_tasks.filter(
-        status__in=['TODO', 'IN_PROGRESS', 'REVIEW'],
-        due_date__lt=timezone.now()
-    )
-    
-    # Get tasks due today
-    today_start = timezone.now().replace(hour=0, minute=0, second=0)
-    today_end = today_start + timezone.timedelta(days=1)
-    due_today = assigned_tasks.filter(
-        due_date__gte=today_start,
-        due_date__lt=today_end
-    )
-    
-    # Get tasks due this week
-    week_end = today_start + timezone.timedelta(days=7)
-    due_this_week = assigned_tasks.filter(
-        due_date__gte=today_end,
-        due_date__lt=week_end
-    )
-    
-    # Get recently completed tasks (last 7 days)
-    recently_completed = assigned_tasks.filter(
-        status='DONE',
-        updated_at__gte=timezone.now() - timezone.timedelta(days=7)
-    )
-    
-    return Response({
-        "total_assigned": assigned_tasks.count(),
-        "status_breakdown": assigned_by_status,
-        "overdue_tasks": {
-            "count": overdue_tasks.count(),
-            "tasks": TaskSerializer(overdue_tasks, many=True).data
-        },
-        "due_today": {
-            "count": due_today.count(),
-            "tasks": TaskSerializer(due_today, many=True).data
-        },
-        "due_this_week": {
-            "count": due_this_week.count(),
-            "tasks": TaskSerializer(due_this_week, many=True).data
-        },
-        "recently_completed": {
-            "count": recently_completed.count(),
-            "tasks": TaskSerializer(recently_completed, many=True).data
-        }
-    })
+    try:
+        limit = int(request.query_params.get('limit', USER_SUMMARY_BUCKET_LIMIT))
+    except ValueError:
+        limit = USER_SUMMARY_BUCKET_LIMIT
+    limit = max(0, min(limit, USER_SUMMARY_MAX_BUCKET_LIMIT))
+
+    summary = get_user_task_summary(request.user, limit=limit)
+    for bucket in ('overdue_tasks', 'due_today', 'due_this_week', 'recently_completed'):
+        summary[bucket]['tasks'] = TaskSummarySerializer(summary[bucket]['tasks'], many=True).data
+    return Response(summary)
 
 # Template View Handlers - These functions render the HTML templates with appropriate context
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login, logout
-from django.db.models import Count, F, Q, Case, When, IntegerField
+from django.db.models import Count, F, Q, Case, When, IntegerField, FloatField, Value
+from django.db.models.functions import Cast
+from django.core.paginator import Paginator
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404
 from django.urls import reverse
 import json
 
+# Number of project cards rendered per page on the project list
+PROJECTS_PER_PAGE = 12
+
+# Board entries are keyed by the project version, so they can live long
+PROJECT_BOARD_CACHE_TIMEOUT = 60 * 60
+
 @login_required
 def project_list_view(request):
     """Handle project listing and creation"""
@@ -405,77 +557,112 @@ def project_list_view(request):
         else:
             messages.error(request, 'Project name is required.')
     
-    # Get all projects for the user
-    projects = Project.objects.filter(
-        Q(owner=request.user) | Q(members=request.user)
-    ).distinct()
+    # Get all projects for the user with their task statistics in a single query.
+    # Scoping by project id keeps the members join out of the task counts.
+    projects = scope_to_projects(Project.objects.all(), request, 'id').annotate(
+        task_count=Count('task_lists__tasks'),
+        completed_tasks=Count('task_lists__tasks', filter=Q(task_lists__tasks__status='DONE')),
+    ).annotate(
+        completion_percentage=Case(
+            When(task_count=0, then=Value(0.0)),
+            default=Cast('completed_tasks', FloatField()) * 100 / F('task_count'),
+            output_field=FloatField()
+        )
+    ).order_by('-created_at', '-id')
     
-    # Get task statistics
-    for project in projects:
-        # Get all task lists for this project
-        task_lists = TaskList.objects.filter(project=project)
-        
-        # Count all tasks
-        task_count = Task.objects.filter(task_list__in=task_lists).count()
-        
-        # Count completed tasks
-        completed_tasks = Task.objects.filter(
-            task_list__in=task_lists,
-            status='DONE'
-        ).count()
-        
-        # Calculate completion percentage
-        project.task_count = task_count
-        project.completed_tasks = completed_tasks
-        project.completion_percentage = (completed_tasks / task_count * 100) if task_count > 0 else 0
+    paginator = Paginator(projects, PROJECTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
     
     return render(request, 'projects/project_list.html', {
-        'projects': projects
+        'projects': page_obj.object_list,
+        'page_obj': page_obj,
+        'is_paginated': page_obj.has_other_pages(),
     })
 
+def get_project_board(project_id):
+    """
+    Build the project board as plain data (project header, members, task lists
+    with their tasks and counts) in a fixed number of queries. Returns None if
+    the project does not exist.
+    """
+    project = Project.objects.filter(id=project_id).values(
+        'id', 'name', 'description', 'created_at', 'owner_id', 'owner__username'
+    ).first()
+    if project is None:
+        return None
+    project['owner_username'] = project.pop('owner__username')
+
+    members = [
+        {'id': user_id, 'username': username}
+        for user_id, username in Project.members.through.objects.filter(
+            project_id=project_id
+        ).values_list('user_id', 'user__username').order_by('user__username')
+    ]
+
+    task_lists = {
+        task_list['id']: dict(task_list, tasks=[], task_count=0, completed_count=0)
+        for task_list in TaskList.objects.filter(project_id=project_id).values(
+            'id', 'name', 'position'
+        )
+    }
+    priority_display = dict(Task.PRIORITY_CHOICES)
+    tasks = Task.objects.filter(
+        task_list__project_id=project_id
+    ).with_blocked_state().values(
+        'id', 'task_list_id', 'title', 'status', 'priority', 'due_date',
+        'assigned_to_id', 'assigned_to__username', 'unfinished_dependency_count'
+    ).order_by('position', 'id')
+
+    for task in tasks:
+        task_list = task_lists[task['task_list_id']]
+        task_list['tasks'].append({
+            'id': task['id'],
+            'title': task['title'],
+            'status': task['status'],
+            'priority': task['priority'],
+            'priority_display': priority_display.get(task['priority'], task['priority']),
+            'due_date': task['due_date'],
+            'assigned_to': {
+                'id': task['assigned_to_id'],
+                'username': task['assigned_to__username'],
+            } if task['assigned_to_id'] else None,
+            'is_blocked': task['unfinished_dependency_count'] > 0,
+        })
+        task_list['task_count'] += 1
+        if task['status'] == 'DONE':
+            task_list['completed_count'] += 1
+
+    total_tasks = sum(task_list['task_count'] for task_list in task_lists.values())
+    completed_tasks = sum(task_list['completed_count'] for task_list in task_lists.values())
+
+    return {
+        'project': project,
+        'members': members,
+        'member_ids': {member['id'] for member in members},
+        'task_lists': list(task_lists.values()),
+        'completion_percentage': (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0,
+    }
+
 @login_required
 def project_detail_view(request, pk):
     """Handle project detail view with caching"""
-    project = get_object_or_404(Project, id=pk)
+    # The board is cached as plain data under the project's version, so a warm
+    # cache renders without touching the database
+    cache_key = project_cache_key(pk)
+    board = cache.get(cache_key)
+    
+    if board is None:
+        board = get_project_board(pk)
+        if board is None:
+            raise Http404('Project not found')
+        cache.set(cache_key, board, PROJECT_BOARD_CACHE_TIMEOUT)
     
     # Check if user has access to this project
-    if not (project.owner == request.user or project.members.filter(id=request.user.id).exists()):
+    if not (board['project']['owner_id'] == request.user.id or request.user.id in board['member_ids']):
         messages.error(request, 'You do not have access to this project.')
         return redirect('project-list')
     
-    # Try to get from cache first
-    cache_key = project_cache_key(pk)
-    cached_data = cache.get(cache_key)
-    
-    if cached_data is None:
-        # Data not in cache, calculate it
-        task_lists = project.task_lists.all().prefetch_related('tasks')
-        
-        # Calculate completion percentage
-        total_tasks = 0
-        completed_tasks = 0
-        
-        for task_list in task_lists:
-            task_list_total = task_list.tasks.count()
-            task_list_completed = task_list.tasks.filter(status='DONE').count()
-            
-            total_tasks += task_list_total
-            completed_tasks += task_list_completed
-        
-        completion_percentage = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-        
-        # Store data to cache (5 minutes)
-        cached_data = {
-            'task_lists': task_lists,
-            'completion_percentage': completion_percentage
-        }
-        cache.set(cache_key, cached_data, 300)  # Cache for 5 minutes
-    
-    return render(request, 'projects/project_detail.html', {
-        'project': project,
-        'task_lists': cached_data['task_lists'],
-        'completion_percentage': cached_data['completion_percentage']
-    })
+    return render(request, 'projects/project_detail.html', board)
 
 @login_required
 def project_update_view(request, pk):
@@ -483,7 +670,7 @@ def project_update_view(request, pk):
     project = get_object_or_404(Project, id=pk)
     
     # Only project owner can update
-    if project.owner != request.user:
+    if project.owner_id != request.user.id:
         messages.error(request, 'Only the project owner can update project details.')
         return redirect('project-detail', pk=project.id)
     
@@ -507,7 +694,7 @@ def project_delete_view(request, pk):
     project = get_object_or_404(Project, id=pk)
     
     # Only project owner can delete
-    if project.owner != request.user:
+    if project.owner_id != request.user.id:
         messages.error(request, 'Only the project owner can delete the project.')
         return redirect('project-detail', pk=project.id)
     
@@ -524,7 +711,7 @@ def project_add_member_view(request, pk):
     project = get_object_or_404(Project, id=pk)
     
     # Only project owner can add members
-    if project.owner != request.user:
+    if project.owner_id != request.user.id:
         messages.error(request, 'Only the project owner can add members.')
         return redirect('project-detail', pk=project.id)
     
@@ -560,21 +747,18 @@ def tasklist_create_view(request):
                 project = Project.objects.get(id=project_id)
                 
                 # Check if user has access to this project
-                if not (project.owner == request.user or project.members.filter(id=request.user.id).exists()):
+                if not get_project_access(request).can_access(project.id):
                     messages.error(request, 'You do not have access to this project.')
                     return redirect('project-list')
                 
-                # Get max position for new list
-                max_position = TaskList.objects.filter(project=project).aggregate(max_pos=models.Max('position'))
-                position = 1
-                if max_position['max_pos'] is not None:
-                    position = max_position['max_pos'] + 1
-                
-                TaskList.objects.create(
-                    name=name,
-                    project=project,
-                    position=position
-                )
+                # Append after the last list; the project row is locked so
+                # concurrent creations get distinct positions
+                with transaction.atomic():
+                    TaskList.objects.create(
+                        name=name,
+                        project=project,
+                        position=append_position(project, project.task_lists.all())
+                    )
                 
                 messages.success(request, f'Task list "{name}" created successfully.')
                 return redirect('project-detail', pk=project_id)
@@ -588,11 +772,11 @@ def tasklist_create_view(request):
 @login_required
 def task_detail_view(request, pk):
     """Handle task detail view"""
-    task = get_object_or_404(Task, id=pk)
+    task = get_object_or_404(Task.objects.select_related('task_list__project'), id=pk)
     
     # Check if user has access to this task's project
     project = task.task_list.project
-    if not (project.owner == request.user or project.members.filter(id=request.user.id).exists()):
+    if not get_project_access(request).can_access(project.id):
         messages.error(request, 'You do not have access to this task.')
         return redirect('project-list')
     
@@ -609,11 +793,11 @@ def task_detail_view(request, pk):
 @login_required
 def task_update_view(request, pk):
     """Handle task updates"""
-    task = get_object_or_404(Task, id=pk)
+    task = get_object_or_404(Task.objects.select_related('task_list__project'), id=pk)
     
     # Check if user has access to this task's project
     project = task.task_list.project
-    if not (project.owner == request.user or project.members.filter(id=request.user.id).exists()):
+    if not get_project_access(request).can_access(project.id):
         messages.error(request, 'You do not have access to this task.')
         return redirect('project-list')
     
@@ -636,31 +820,32 @@ def task_update_view(request, pk):
                 # Store changes for activity logging
                 changes = []
                 
-                if hasattr(task, '_previous_values'):
-                    if task._previous_values['title'] != title:
-                        changes.append(('title', task._previous_values['title'], title))
-                    
-                    if task._previous_values['description'] != description:
-                        changes.append(('description', 
-                                      task._previous_values['description'][:50] + ('...' if len(task._previous_values['description']) > 50 else ''), 
-                                      description[:50] + ('...' if len(description) > 50 else '')))
-                    
-                    if task._previous_values['status'] != status:
-                        changes.append(('status', 
-                                      dict(Task.STATUS_CHOICES).get(task._previous_values['status'], task._previous_values['status']), 
-                                      dict(Task.STATUS_CHOICES).get(status, status)))
-                    
-                    if task._previous_values['priority'] != priority:
-                        changes.append(('priority', 
-                                      dict(Task.PRIORITY_CHOICES).get(task._previous_values['priority'], task._previous_values['priority']), 
-                                      dict(Task.PRIORITY_CHOICES).get(priority, priority)))
-                    
-                    if str(task._previous_values['due_date']) != str(due_date):
-                        changes.append(('due date', task._previous_values['due_date'], due_date))
-                    
-                    if task._previous_values['task_list'] != task_list:
-                        changes.append(('task list', task._previous_values['task_list'].name, task_list.name))
+                # The task still holds its stored values at this point
+                if task.title != title:
+                    changes.append(('title', task.title, title))
+                
+                if task.description != description:
+                    changes.append(('description', 
+                                  task.description[:50] + ('...' if len(task.description) > 50 else ''), 
+                                  description[:50] + ('...' if len(description) > 50 else '')))
+                
+                if task.status != status:
+                    changes.append(('status', 
+                                  dict(Task.STATUS_CHOICES).get(task.status, task.status), 
+                                  dict(Task.STATUS_CHOICES).get(status, status)))
                 
+                if task.priority != priority:
+                    changes.append(('priority', 
+                                  dict(Task.PRIORITY_CHOICES).get(task.priority, task.priority), 
+                                  dict(Task.PRIORITY_CHOICES).get(priority, priority)))
+                
+                if str(task.due_date) != str(due_date):
+                    changes.append(('due date', task.due_date, due_date))
+                
+                if task.task_list != task_list:
+                    changes.append(('task list', task.task_list.name, task_list.name))
+                
+                previous_status = task.status
                 task.title = title
                 task.description = description
                 task.status = status
@@ -717,32 +902,28 @@ def task_update_view(request, pk):
                     change_descriptions = [f"changed {field} from '{old}' to '{new}'" for field, old, new in changes]
                     description = f"Updated task '{task.title}': " + ", ".join(change_descriptions)
                     
-                    ActivityLog.objects.create(
-                        user=request.user,
-                        task=task,
-                        action='UPDATE',
-                        description=description,
+                    log_activity(
+                        request.user.id, 'UPDATE', description,
+                        task_id=task.id, project_id=task.task_list.project_id,
                         old_value=", ".join([f"{field}: {old}" for field, old, new in changes]),
                         new_value=", ".join([f"{field}: {new}" for field, old, new in changes])
                     )
                 
                 # Special case for status change
-                if hasattr(task, '_previous_values') and task._previous_values['status'] != status:
-                    ActivityLog.objects.create(
-                        user=request.user,
-                        task=task,
-                        action='STATUS',
-                        description=f"Changed status from '{dict(Task.STATUS_CHOICES).get(task._previous_values['status'])}' to '{dict(Task.STATUS_CHOICES).get(status)}'",
-                        old_value=task._previous_values['status'],
+                if previous_status != status:
+                    log_activity(
+                        request.user.id, 'STATUS',
+                        task_id=task.id, project_id=task.task_list.project_id,
+                        description=f"Changed status from '{dict(Task.STATUS_CHOICES).get(previous_status)}' to '{dict(Task.STATUS_CHOICES).get(status)}'",
+                        old_value=previous_status,
                         new_value=status
                     )
                 
                 # Special case for assignment change
                 if previous_assignee != new_assignee:
-                    ActivityLog.objects.create(
-                        user=request.user,
-                        task=task,
-                        action='ASSIGN',
+                    log_activity(
+                        request.user.id, 'ASSIGN',
+                        task_id=task.id, project_id=task.task_list.project_id,
                         description=f"Assigned task from '{previous_assignee.username if previous_assignee else 'Nobody'}' to '{new_assignee.username if new_assignee else 'Nobody'}'",
                         old_value=previous_assignee.username if previous_assignee else 'Nobody',
                         new_value=new_assignee.username if new_assignee else 'Nobody'
@@ -759,11 +940,11 @@ def task_update_view(request, pk):
 @login_required
 def task_delete_view(request, pk):
     """Handle task deletion"""
-    task = get_object_or_404(Task, id=pk)
+    task = get_object_or_404(Task.objects.select_related('task_list__project'), id=pk)
     
     # Check if user has access to this task's project
     project = task.task_list.project
-    if not (project.owner == request.user or project.members.filter(id=request.user.id).exists()):
+    if not get_project_access(request).can_access(project.id):
         messages.error(request, 'You do not have access to this task.')
         return redirect('project-list')
     
@@ -779,11 +960,11 @@ def task_delete_view(request, pk):
 @login_required
 def task_add_comment_view(request, pk):
     """Handle adding comments to a task"""
-    task = get_object_or_404(Task, id=pk)
+    task = get_object_or_404(Task.objects.select_related('task_list__project'), id=pk)
     
     # Check if user has access to this task's project
     project = task.task_list.project
-    if not (project.owner == request.user or project.members.filter(id=request.user.id).exists()):
+    if not get_project_access(request).can_access(project.id):
         messages.error(request, 'You do not have access to this task.')
         return redirect('project-list')
     
@@ -946,18 +1127,16 @@ def profile_view(request):
 @login_required
 def user_tasks_view(request):
     """Handle user task summary view"""
-    # Get API response data
-    response_data = user_task_summary(request).data
+    # Same summary as the API, rendered from the task instances directly
+    summary = get_user_task_summary(request.user)
     
     # Calculate percentages for status breakdown
-    status_breakdown = response_data.get('status_breakdown', [])
-    total_tasks = response_data.get('total_assigned', 0)
-    
+    total_tasks = summary['total_assigned']
     if total_tasks > 0:
-        for status in status_breakdown:
+        for status in summary['status_breakdown']:
             status['percentage'] = (status['count'] / total_tasks) * 100
     
-    return render(request, 'tasks/user_task_summary.html', response_data)
+    return render(request, 'tasks/user_task_summary.html', summary)
 
 def login_view(request):
     """Handle user login"""